@@ -2,6 +2,9 @@
     "use strict";
 
     const TRACK_MODES = ["full", "tail", "off"];
+    // a level of detail is used while its tolerance is at most this many screen pixels
+    const LOD_PIXEL_TOLERANCE = 1;
+    const EARTH_CIRCUMFERENCE = 40075016.686;
 
     function registry() {
         window.gpxPlayerPlayback = window.gpxPlayerPlayback || {};
@@ -30,9 +33,14 @@
         state.isPlaying = false;
         state.playbackInterval = null;
         state.trackTimeValues = initializeTrackTimeValues(state);
+        state.trackUntilValues = initializeTrackUntilValues(state);
+        state.timestampValues = state.timestamps.map((timestamp) => new Date(timestamp).getTime());
+        state.timelinePositions = initializeTimelinePositions(state);
         state.currentPointIndexes = state.points.map(() => 0);
         state.trackModes = state.points.map(() => "full");
         state.fullTrackLayers = initializeFullTrackLayers(state);
+        state.liveTrackLines = initializeLiveTrackLines(state);
+        state.lodLayers = initializeLodLayers(state);
         state.trackHeadings = initializeTrackHeadings(state);
 
         const slider = createSlider(state);
@@ -64,6 +72,12 @@
 
         slider.dispatchEvent(new Event('input'));
         state.trackModes.forEach((_mode, trackIndex) => applyTrackMode(state, trackIndex));
+        if (state.lodLayers.some((levels) => levels.length) && typeof map.on === 'function') {
+            map.on('zoomend', () => {
+                state.trackModes.forEach((_mode, trackIndex) => applyTrackMode(state, trackIndex));
+            });
+        }
+        connectLiveUpdates(state);
     }
 
     function createSlider(state) {
@@ -224,6 +238,72 @@ ${sliderSelector}::-moz-range-thumb {
         return state.points.map((track) => track.map((point) => new Date(point.time).getTime()));
     }
 
+    // for every timeline entry, the last point of each track at or before it (one merge pass per track)
+    function initializeTimelinePositions(state) {
+        return state.trackTimeValues.map((times) => {
+            // live timelines grow, see extendTimeline
+            const positions = state.liveUrl
+                ? new Array(state.timestampValues.length).fill(0)
+                : new Int32Array(state.timestampValues.length);
+            let position = -1;
+            state.timestampValues.forEach((timestamp, timeIndex) => {
+                while (position + 1 < times.length && times[position + 1] <= timestamp) {
+                    position += 1;
+                }
+                positions[timeIndex] = Math.max(0, position);
+            });
+            return positions;
+        });
+    }
+
+    function searchSorted(values, target, right) {
+        let low = 0;
+        let high = values.length;
+        while (low < high) {
+            const middle = (low + high) >> 1;
+            if (values[middle] < target || (right && values[middle] === target)) {
+                low = middle + 1;
+            } else {
+                high = middle;
+            }
+        }
+        return low;
+    }
+
+    // re-merge the timeline from `fromTime` on; live fixes only ever change its end
+    function extendTimeline(state, fromTime) {
+        const cut = searchSorted(state.timestampValues, fromTime, false);
+        const added = new Set();
+        state.trackTimeValues.forEach((times) => {
+            for (let i = searchSorted(times, fromTime, false); i < times.length; i++) {
+                added.add(times[i]);
+            }
+        });
+        const times = Array.from(added).sort((a, b) => a - b);
+        state.timestamps.length = cut;
+        state.timestampValues.length = cut;
+        times.forEach((timestamp) => {
+            state.timestamps.push(timestamp);
+            state.timestampValues.push(timestamp);
+        });
+        state.timelinePositions.forEach((positions, trackIndex) => {
+            const trackTimes = state.trackTimeValues[trackIndex];
+            let position = searchSorted(trackTimes, fromTime, false) - 1;
+            positions.length = cut;
+            times.forEach((timestamp) => {
+                while (position + 1 < trackTimes.length && trackTimes[position + 1] <= timestamp) {
+                    position += 1;
+                }
+                positions.push(Math.max(0, position));
+            });
+        });
+    }
+
+    // a point with `until` stands for a stationary run of fixes that ends at that time
+    function initializeTrackUntilValues(state) {
+        return state.points.map((track) => track.map((point) => (point.until ? new Date(point.until).getTime() : null)));
+    }
+
     function initializeFullTrackLayers(state) {
         const names = state.fullTrackLayerNames || [];
         return state.points.map((_track, index) => {
@@ -233,21 +313,136 @@ ${sliderSelector}::-moz-range-thumb {
         });
     }
 
+    // in live mode, tracks without a drawn full layer get a plain line that grows with the fixes
+    function initializeLiveTrackLines(state) {
+        return state.points.map((track, index) => {
+            if (!state.liveUrl || state.fullTrackLayers[index]) {
+                return null;
+            }
+            const line = L.polyline(track.map((point) => [point.lat, point.lon]), {
+                color: state.colors[index % state.colors.length],
+                weight: 2.5,
+                opacity: 1,
+                interactive: false
+            });
+            state.fullTrackLayers[index] = line;
+            return line;
+        });
+    }
+
+    function connectLiveUpdates(state) {
+        if (!state.liveUrl || typeof window.EventSource !== 'function') {
+            return;
+        }
+        const source = new window.EventSource(state.liveUrl);
+        source.addEventListener('fixes', (event) => applyLiveFixes(state, JSON.parse(event.data)));
+        source.addEventListener('reload', () => window.location.reload());
+        state.liveSource = source;
+    }
+
+    // append pushed fixes to the tracks; the slider keeps following the newest fix if it was at its end
+    function applyLiveFixes(state, deltas) {
+        const trackIds = state.liveTrackIds || [];
+        if (deltas.some((delta) => trackIds.indexOf(delta.track) < 0)) {
+            // a boat that had no fixes yet when the page was rendered
+            window.location.reload();
+            return;
+        }
+        const following = parseInt(state.slider.value, 10) >= parseInt(state.slider.max, 10);
+        const shownTime = state.currentTime;
+        let fromTime = Infinity;
+        deltas.forEach((delta) => {
+            const trackIndex = trackIds.indexOf(delta.track);
+            const line = state.liveTrackLines[trackIndex];
+            delta.points.forEach((point, i) => {
+                const time = new Date(point.time).getTime();
+                fromTime = Math.min(fromTime, time);
+                state.points[trackIndex].push(point);
+                state.trackTimeValues[trackIndex].push(time);
+                state.trackUntilValues[trackIndex].push(null);
+                state.speeds[trackIndex].push(delta.speeds[i]);
+                state.distances[trackIndex].push(delta.distances[i]);
+                state.avgSpeeds[trackIndex].push(delta.avgSpeeds[i]);
+                if (line) {
+                    line.addLatLng([point.lat, point.lon]);
+                }
+            });
+        });
+        if (fromTime === Infinity) {
+            return;
+        }
+        extendTimeline(state, fromTime);
+        const lastIndex = state.timestamps.length - 1;
+        const timeIndex = following
+            ? lastIndex
+            : Math.max(0, searchSorted(state.timestampValues, shownTime, true) - 1);
+        state.slider.value = lastIndex > 0 ? Math.ceil(timeIndex / lastIndex * 1000) : 0;
+        state.slider.dispatchEvent(new Event('input'));
+    }
+
+    function initializeLodLayers(state) {
+        const tolerances = state.lodTolerances || [];
+        const names = state.lodLayerNames || [];
+        return state.points.map((_track, index) => {
+            const trackTolerances = tolerances[index] || [];
+            const trackNames = names[index] || [];
+            return trackTolerances
+                .map((tolerance, level) => ({tolerance: tolerance, layer: window[trackNames[level]]}))
+                .filter((level) => isLeafletLayer(level.layer))
+                .sort((a, b) => b.tolerance - a.tolerance);
+        });
+    }
+
+    function metersPerPixel(map) {
+        if (typeof map.getZoom !== 'function' || typeof map.getCenter !== 'function') {
+            return 0;
+        }
+        const latitude = map.getCenter().lat * Math.PI / 180;
+        return EARTH_CIRCUMFERENCE * Math.cos(latitude) / Math.pow(2, map.getZoom() + 8);
+    }
+
+    function fullLayerAtZoom(state, trackIndex) {
+        const limit = metersPerPixel(state.map) * LOD_PIXEL_TOLERANCE;
+        const level = (state.lodLayers[trackIndex] || []).find((candidate) => candidate.tolerance <= limit);
+        return level ? level.layer : state.fullTrackLayers[trackIndex];
+    }
+
+    function showFullLayer(state, trackIndex, visibleLayer) {
+        const map = state.map;
+        const levels = (state.lodLayers[trackIndex] || []).map((level) => level.layer);
+        [state.fullTrackLayers[trackIndex], ...levels].forEach((layer) => {
+            if (!layer) {
+                return;
+            }
+            if (layer === visibleLayer) {
+                if (!map.hasLayer(layer)) {
+                    layer.addTo(map);
+                }
+            } else if (map.hasLayer(layer)) {
+                map.removeLayer(layer);
+            }
+        });
+    }
+
     function isLeafletLayer(candidate) {
         return candidate && typeof candidate.addTo === 'function';
     }
 
     function initializeTrackMarkers(map, state) {
-        return state.points.map((track, index) => {
-            const color = state.colors[index % state.colors.length];
-            const marker = L.marker([track[0].lat, track[0].lon], {
-                icon: createTrackMarkerIcon(color, state.trackHeadings[index] || 0),
-                interactive: false,
-                keyboard: false
-            }).addTo(map);
-            marker._gpxPlayerColor = color;
-            return marker;
-        });
+        // a track without points gets its marker once it has one
+        return state.points.map((track, index) => (track.length ? createTrackMarker(map, state, index) : null));
+    }
+
+    function createTrackMarker(map, state, index) {
+        const track = state.points[index];
+        const color = state.colors[index % state.colors.length];
+        const marker = L.marker([track[0].lat, track[0].lon], {
+            icon: createTrackMarkerIcon(color, state.trackHeadings[index] || 0),
+            interactive: false,
+            keyboard: false
+        }).addTo(map);
+        marker._gpxPlayerColor = color;
+        return marker;
     }
 
     function createTrackMarkerIcon(color, heading) {
@@ -408,37 +603,23 @@ ${sliderSelector}::-moz-range-thumb {
     }
 
     function currentSliderTime(state) {
-        const timeIndex = sliderTimeIndex(state);
-        return new Date(state.timestamps[timeIndex]).getTime();
-    }
-
-    function pointIndexAtTime(times, currentTime) {
-        if (!times.length || currentTime < times[0]) {
-            return 0;
-        }
-        let low = 0;
-        let high = times.length - 1;
-        while (low <= high) {
-            const mid = Math.floor((low + high) / 2);
-            if (times[mid] <= currentTime) {
-                low = mid + 1;
-            } else {
-                high = mid - 1;
-            }
-        }
-        return Math.max(0, high);
+        return state.timestampValues[sliderTimeIndex(state)];
     }
 
     function updateCurrentPointIndexes(state) {
-        const currentTime = currentSliderTime(state);
-        state.currentTime = currentTime;
-        state.currentPointIndexes = state.trackTimeValues.map((times) => pointIndexAtTime(times, currentTime));
+        const timeIndex = sliderTimeIndex(state);
+        state.currentTime = state.timestampValues[timeIndex];
+        state.currentPointIndexes = state.timelinePositions.map((positions) => positions[timeIndex] || 0);
     }
 
     function updateTrackMarkers(state) {
         const map = state.map;
-        state.trackMarkers.forEach((marker, trackIndex) => {
+        state.trackMarkers.forEach((trackMarker, trackIndex) => {
             const track = state.points[trackIndex];
+            if (!track.length) {
+                return;
+            }
+            const marker = trackMarker || (state.trackMarkers[trackIndex] = createTrackMarker(map, state, trackIndex));
             const pointIndex = state.currentPointIndexes[trackIndex] || 0;
             const closestPoint = track[pointIndex] || track[0];
             const heading = trackHeadingAtIndex(track, pointIndex, state.trackHeadings[trackIndex] || 0);
@@ -534,12 +715,30 @@ ${sliderSelector}::-moz-range-thumb {
             const dists = state.distances[idx];
             const avgs = state.avgSpeeds[idx];
             const pointIndex = state.currentPointIndexes[idx] || 0;
+            let speed = speeds[pointIndex];
+            let avgSpeed = avgs[pointIndex];
+            const stationaryTime = stationaryTimeAt(state, idx, pointIndex);
+            if (stationaryTime !== null) {
+                const hours = (stationaryTime - state.trackTimeValues[idx][0]) / 3600000;
+                speed = 0;
+                avgSpeed = hours > 0 ? dists[pointIndex] / hours : 0;
+            }
             entry.querySelector('.distance').textContent = `${dists[pointIndex].toFixed(1)} nm`;
-            entry.querySelector('.speed').textContent = `${speeds[pointIndex].toFixed(1)} kt`;
-            entry.querySelector('.avg-speed').textContent = `${avgs[pointIndex].toFixed(1)} kt`;
+            entry.querySelector('.speed').textContent = `${speed.toFixed(1)} kt`;
+            entry.querySelector('.avg-speed').textContent = `${avgSpeed.toFixed(1)} kt`;
         });
     }
 
+    function stationaryTimeAt(state, trackIndex, pointIndex) {
+        const untilValues = state.trackUntilValues[trackIndex] || [];
+        const until = untilValues[pointIndex];
+        const currentTime = state.currentTime;
+        if (until === null || until === undefined || !(currentTime > state.trackTimeValues[trackIndex][pointIndex])) {
+            return null;
+        }
+        return Math.min(currentTime, until);
+    }
+
     function setTrackMode(state, trackIndex, mode) {
         if (!TRACK_MODES.includes(mode)) {
             return;
@@ -552,14 +751,11 @@ ${sliderSelector}::-moz-range-thumb {
     function applyTrackMode(state, trackIndex) {
         const map = state.map;
         const mode = state.trackModes[trackIndex];
-        const fullLayer = state.fullTrackLayers[trackIndex];
         const tailLayer = state.tailLayers[trackIndex];
         const marker = state.trackMarkers[trackIndex];
 
         if (mode === 'full') {
-            if (fullLayer && !map.hasLayer(fullLayer)) {
-                fullLayer.addTo(map);
-            }
+            showFullLayer(state, trackIndex, fullLayerAtZoom(state, trackIndex));
             if (tailLayer) {
                 tailLayer.setLatLngs([]);
                 if (map.hasLayer(tailLayer)) {
@@ -572,9 +768,7 @@ ${sliderSelector}::-moz-range-thumb {
             return;
         }
 
-        if (fullLayer && map.hasLayer(fullLayer)) {
-            map.removeLayer(fullLayer);
-        }
+        showFullLayer(state, trackIndex, null);
 
         if (mode === 'tail') {
             if (marker && !map.hasLayer(marker)) {
@@ -0,0 +1,114 @@
+"""Offline raster basemaps for video mode, read from local MBTiles files.
+
+MBTiles is a SQLite container of Web Mercator map tiles
+(https://github.com/mapbox/mbtiles-spec). The video renderer draws tracks in
+plain longitude/latitude axes, so the tiles are stitched together and
+resampled row-wise onto a linear latitude grid before being shown.
+"""
+import math
+import sqlite3
+from contextlib import closing
+from io import BytesIO
+from typing import Tuple
+
+import numpy as np
+from PIL import Image
+
+_MAX_TILES = 256
+_BACKGROUND = 255
+
+
+def _lon_to_tile_x(lon, zoom):
+    return (np.asarray(lon, dtype=float) + 180.0) / 360.0 * 2 ** zoom
+
+
+def _lat_to_tile_y(lat, zoom):
+    lat_rad = np.radians(np.asarray(lat, dtype=float))
+    return (1.0 - np.arcsinh(np.tan(lat_rad)) / math.pi) / 2.0 * 2 ** zoom
+
+
+def _pick_zoom(lon_span: float, width_px: int, min_zoom: int, max_zoom: int, tile_size: int = 256) -> int:
+    """Smallest zoom level whose tiles are at least as detailed as the output."""
+    wanted = math.ceil(math.log2(max(width_px, 1) * 360.0 / (tile_size * lon_span)))
+    return int(min(max(wanted, min_zoom), max_zoom))
+
+
+def _tile_range(lon_min, lon_max, lat_min, lat_max, zoom):
+    x0, x1 = (int(v) for v in _lon_to_tile_x([lon_min, lon_max], zoom))
+    y0, y1 = (int(v) for v in _lat_to_tile_y([lat_max, lat_min], zoom))
+    last = 2 ** zoom - 1
+    return max(x0, 0), min(x1, last), max(y0, 0), min(y1, last)
+
+
+def read_mbtiles_basemap(
+    path: str,
+    lon_min: float,
+    lon_max: float,
+    lat_min: float,
+    lat_max: float,
+    width_px: int,
+    height_px: int,
+) -> Tuple[np.ndarray, Tuple[float, float, float, float]]:
+    """Return an RGB image covering the given bounds and its ``imshow`` extent.
+
+    The image has ``height_px`` rows spaced linearly in latitude and
+    ``width_px`` columns spaced linearly in longitude. Tiles missing from the
+    file are left white.
+    """
+    if lon_max <= lon_min or lat_max <= lat_min:
+        raise ValueError("basemap bounds must have a positive extent")
+    with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+        min_zoom, max_zoom = conn.execute("SELECT MIN(zoom_level), MAX(zoom_level) FROM tiles").fetchone()
+        if min_zoom is None:
+            raise ValueError(f"MBTiles file '{path}' contains no tiles")
+        zoom = _pick_zoom(lon_max - lon_min, width_px, min_zoom, max_zoom)
+        x0, x1, y0, y1 = _tile_range(lon_min, lon_max, lat_min, lat_max, zoom)
+        while zoom > min_zoom and (x1 - x0 + 1) * (y1 - y0 + 1) > _MAX_TILES:
+            zoom -= 1
+            x0, x1, y0, y1 = _tile_range(lon_min, lon_max, lat_min, lat_max, zoom)
+
+        records = conn.execute(
+            "SELECT tile_column, tile_row, tile_data FROM tiles "
+            "WHERE zoom_level = ? AND tile_column BETWEEN ? AND ? AND tile_row BETWEEN ? AND ?",
+            # MBTiles uses TMS row numbering, i.e. row 0 is the southernmost one
+            (zoom, x0, x1, 2 ** zoom - 1 - y1, 2 ** zoom - 1 - y0),
+        ).fetchall()
+
+    tiles = {}
+    tile_size = 256
+    for column, tms_row, data in records:
+        tile = np.asarray(Image.open(BytesIO(data)).convert("RGB"))
+        tile_size = tile.shape[0]
+        tiles[(column, 2 ** zoom - 1 - tms_row)] = tile
+
+    mosaic = np.full(((y1 - y0 + 1) * tile_size, (x1 - x0 + 1) * tile_size, 3), _BACKGROUND, dtype=np.uint8)
+    for (column, row), tile in tiles.items():
+        top, left = (row - y0) * tile_size, (column - x0) * tile_size
+        mosaic[top:top + tile_size, left:left + tile_size] = tile[:tile_size, :tile_size]
+
+    # pixel centres of the output grid, mapped to mosaic pixels (nearest neighbour)
+    lons = lon_min + (np.arange(width_px) + 0.5) / width_px * (lon_max - lon_min)
+    lats = lat_max - (np.arange(height_px) + 0.5) / height_px * (lat_max - lat_min)
+    cols = ((_lon_to_tile_x(lons, zoom) - x0) * tile_size).astype(int)
+    rows = ((_lat_to_tile_y(lats, zoom) - y0) * tile_size).astype(int)
+    cols = np.clip(cols, 0, mosaic.shape[1] - 1)
+    rows = np.clip(rows, 0, mosaic.shape[0] - 1)
+    image = mosaic[rows[:, None], cols[None, :]]
+    return image, (lon_min, lon_max, lat_min, lat_max)
+
+
+def add_basemap(ax, path: str):
+    """Draw an MBTiles basemap under everything else in ``ax``.
+
+    The current axes limits are kept. Returns the ``AxesImage``.
+    """
+    (lon_min, lon_max), (lat_min, lat_max) = ax.get_xlim(), ax.get_ylim()
+    bbox = ax.get_window_extent()
+    image, extent = read_mbtiles_basemap(
+        path, lon_min, lon_max, lat_min, lat_max,
+        max(int(round(bbox.width)), 1), max(int(round(bbox.height)), 1),
+    )
+    artist = ax.imshow(image, extent=extent, origin='upper', aspect='auto', zorder=0)
+    ax.set_xlim(lon_min, lon_max)
+    ax.set_ylim(lat_min, lat_max)
+    return artist
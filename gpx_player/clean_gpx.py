@@ -1,16 +1,63 @@
 import argparse
+import logging
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
-from gpx_player.validator import validate_gpx, GPXValidationError
-from gpx_player.gpx_utils import remove_extensions_tags
+from gpx_player.validator import (
+    GPXValidationError, expand_gpx_paths, parse_gpx, validate_cached, validate_stream, validate_tree,
+)
+from gpx_player.gpx_utils import (
+    ExtensionStrippingEventWriter, atomic_write, cleaned_file_path, gpx_writer, remove_extensions_from_tree,
+    strip_extensions, write_gpx_tree,
+)
 
 
-def clean_gpx_file(gpx_file: str, overwrite: bool = False) -> tuple[str, int]:
+def _validate_and_strip_tree(gpx_file: str, dst: str, compress: bool) -> int:
+    """Parse ``gpx_file`` once, validate it strictly, drop extensions and write it to ``dst``."""
+    parsed = {}
+
+    def parse_and_validate(file_path, strict):
+        parsed["tree"] = parse_gpx(file_path)
+        return validate_tree(parsed["tree"], strict)
+
+    # raises GPXValidationError on failure
+    validate_cached(gpx_file, True, parse_and_validate)
+    # without "tree" the file is known to be valid from the validation cache
+    tree = parsed["tree"] if "tree" in parsed else parse_gpx(gpx_file)
+    removed = remove_extensions_from_tree(tree)
+    write_gpx_tree(tree, dst, compress)
+    return removed
+
+
+def _validate_and_strip_streaming(gpx_file: str, dst: str, compress: bool) -> int:
+    """Validate ``gpx_file`` strictly and write it to ``dst`` without extensions, in one streaming pass."""
+    written = {}
+
+    def validate_and_write(file_path, strict):
+        with gpx_writer(dst, compress) as xf:
+            writer = ExtensionStrippingEventWriter(xf)
+            stats = validate_stream(file_path, strict, on_event=writer)
+        written["removed"] = writer.removed
+        return stats
+
+    # raises GPXValidationError on failure
+    validate_cached(gpx_file, True, validate_and_write)
+    if "removed" in written:
+        return written["removed"]
+    # the file is known to be valid from the validation cache: only strip it
+    return strip_extensions(gpx_file, dst, compress=compress)
+
+
+def clean_gpx_file(
+    gpx_file: str, overwrite: bool = False, compress: bool = False, stream: bool = False
+) -> tuple[str, int]:
     """Validate and clean up a GPX file.
 
-    The file is first validated using :func:`validator.validate_gpx`. If the
-    validation succeeds, all ``<extensions>`` blocks are removed using
-    :func:`gpx_utils.remove_extensions_tags`.
+    The file is parsed once, validated in strict mode as by
+    :func:`validator.validate_gpx`, and written back without its
+    ``<extensions>`` blocks. The result only replaces the target file if
+    validation succeeds.
 
     Parameters
     ----------
@@ -21,28 +68,104 @@ def clean_gpx_file(gpx_file: str, overwrite: bool = False) -> tuple[str, int]:
         If ``True`` the input file will be modified in place instead of
         creating a new file. Default is ``False``.
 
+    compress : bool, optional
+        If ``True`` the cleaned file is gzip-compressed. Default is ``False``.
+
+    stream : bool, optional
+        If ``True`` the file is validated (as by
+        :func:`validator.validate_gpx_streaming`) and written in one streaming
+        pass with bounded memory. This is slower, but suits files that are too
+        large to hold in memory. Default is ``False``.
+
     Returns
     -------
     tuple[str, int]
         The path to the cleaned file and the number of removed blocks.
     """
-    # Validate the file; this will raise GPXValidationError on failure
-    validate_gpx(gpx_file, strict=True)
-    return remove_extensions_tags(gpx_file, overwrite=overwrite)
+    new_path = cleaned_file_path(gpx_file, overwrite, compress)
+    with atomic_write(new_path, mode_from=gpx_file) as tmp_name:
+        clean = _validate_and_strip_streaming if stream else _validate_and_strip_tree
+        removed = clean(gpx_file, tmp_name, compress)
+    return str(new_path), removed
+
+
+def _clean_file_job(job):
+    gpx_file, overwrite, compress, stream = job
+    try:
+        cleaned, removed = clean_gpx_file(gpx_file, overwrite=overwrite, compress=compress, stream=stream)
+    except (GPXValidationError, OSError) as exc:
+        return gpx_file, None, 0, str(exc)
+    return gpx_file, cleaned, removed, None
+
+
+def clean_gpx_files(gpx_files, overwrite=False, compress=False, stream=False, jobs=1):
+    """Clean many files with :func:`clean_gpx_file`, ``jobs`` at a time in a process pool.
+
+    Yields ``(gpx_file, cleaned_path, removed, error)`` per file in input
+    order; ``error`` is the validation or I/O error message, or ``None``
+    on success.
+    """
+    job_args = [(gpx_file, overwrite, compress, stream) for gpx_file in gpx_files]
+    if jobs <= 1 or len(job_args) <= 1:
+        yield from map(_clean_file_job, job_args)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(_clean_file_job, job_args, chunksize=max(1, len(job_args) // (jobs * 4)))
+
+
+def _batch_main(args) -> None:
+    # earlier results next to their sources are not cleaned again
+    paths = [path for path in expand_gpx_paths(args.gpx_files) if not path.endswith(("_noext.gpx", "_noext.gpx.gz"))]
+    failed = 0
+    for gpx_file, cleaned, removed, error in clean_gpx_files(paths, args.overwrite, args.gzip, args.stream, args.jobs):
+        if error is None:
+            print(f"{gpx_file}: removed {removed} <extensions> blocks -> {cleaned}")
+        else:
+            failed += 1
+            print(f"{gpx_file}: failed: {error}", file=sys.stderr)
+    print(f"Cleaned {len(paths) - failed} of {len(paths)} files.")
+    if failed:
+        sys.exit(1)
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description="Validate and clean a GPX file")
-    parser.add_argument("gpx_file", help="Path to the GPX file to clean")
+    parser = argparse.ArgumentParser(description="Validate and clean GPX files")
+    parser.add_argument("gpx_files", nargs="+", metavar="gpx_file",
+                        help="GPX file(s) to clean, or directories (searched recursively) and glob patterns")
     parser.add_argument(
         "--overwrite",
         action="store_true",
         help="Overwrite the original GPX file instead of creating a copy",
     )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Write the cleaned copy gzip-compressed (<name>_noext.gpx.gz)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Validate and clean in one streaming pass with bounded memory (for very large files)",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes when cleaning several files (default: number of CPUs)",
+    )
     args = parser.parse_args()
+    if args.overwrite and args.gzip:
+        parser.error("--gzip cannot be combined with --overwrite")
+
+    if len(args.gpx_files) > 1 or not os.path.isfile(args.gpx_files[0]):
+        _batch_main(args)
+        return
 
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
     try:
-        cleaned, removed = clean_gpx_file(args.gpx_file, overwrite=args.overwrite)
+        cleaned, removed = clean_gpx_file(
+            args.gpx_files[0], overwrite=args.overwrite, compress=args.gzip, stream=args.stream
+        )
     except GPXValidationError as exc:
         print(f"Validation failed: {exc}", file=sys.stderr)
         sys.exit(1)
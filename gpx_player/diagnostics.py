@@ -0,0 +1,132 @@
+"""Aggregated data-quality diagnostics for GPS tracks.
+
+Instead of printing a line for every suspicious sample, processing code
+records events in a :class:`TrackDiagnostics` (one per track): a counter per
+kind of problem, a histogram of the offending values and the first few
+examples. A :class:`DataQualityReport` groups the tracks of one run and logs a
+short summary at the end.
+"""
+import logging
+from bisect import bisect_right
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+SPEED_OUTLIER = "speed_outlier"
+NON_POSITIVE_TIME_STEP = "non_positive_time_step"
+EMPTY_WINDOW = "empty_window"
+TIMESTAMPS_REPAIRED = "timestamps_repaired"
+SPIKES_REMOVED = "spikes_removed"
+
+# histogram edges for speed outliers, as multiples of max_speed
+OUTLIER_RATIO_EDGES = (1.0, 1.5, 2.0, 5.0, 10.0)
+
+# summary templates; ``n`` is the count and ``first`` the first example
+_DESCRIPTIONS = {
+    SPEED_OUTLIER: "{n} segments faster than max speed (speed set to 0)",
+    NON_POSITIVE_TIME_STEP: "{n} segments with a non-positive time step (speed set to 0)",
+    EMPTY_WINDOW: "no points in the time window, skipped",
+    TIMESTAMPS_REPAIRED: "timestamps repaired ({first[summary]})",
+    SPIKES_REMOVED: "{first[count]} position spikes removed",
+}
+
+
+class TrackDiagnostics:
+    """Data-quality counters, outlier histogram and sample events for one track.
+
+    ``record`` is O(1) per event and keeps at most ``max_examples`` examples
+    per kind, so it can be called for every sample of a noisy track.
+    """
+
+    def __init__(self, track: str, max_examples: int = 5, ratio_edges: Sequence[float] = OUTLIER_RATIO_EDGES):
+        self.track = track
+        self.max_examples = max_examples
+        self.ratio_edges = tuple(ratio_edges)
+        self.counts = Counter()
+        self.histogram = [0] * len(self.ratio_edges)
+        self.examples: Dict[str, List[dict]] = {}
+
+    def record(self, kind: str, ratio: Optional[float] = None, **example) -> None:
+        """Count one event of ``kind``.
+
+        ``ratio`` (e.g. speed / max speed) goes into the outlier histogram;
+        the keyword arguments are kept as an example while there are fewer
+        than ``max_examples`` of this kind.
+        """
+        self.counts[kind] += 1
+        if ratio is not None:
+            self.histogram[max(0, bisect_right(self.ratio_edges, ratio) - 1)] += 1
+        examples = self.examples.setdefault(kind, [])
+        if len(examples) < self.max_examples:
+            examples.append(example)
+
+    def __bool__(self) -> bool:
+        return bool(self.counts)
+
+    def histogram_labels(self) -> List[str]:
+        edges = self.ratio_edges
+        return [f"{lo:g}-{hi:g}x" for lo, hi in zip(edges, edges[1:])] + [f">{edges[-1]:g}x"]
+
+    def to_dict(self) -> dict:
+        """Return the diagnostics as plain, JSON-serializable data."""
+        return {
+            "track": self.track,
+            "counts": dict(self.counts),
+            "outlier_histogram": dict(zip(self.histogram_labels(), self.histogram)),
+            "examples": {kind: [{k: str(v) for k, v in e.items()} for e in examples]
+                         for kind, examples in self.examples.items()},
+        }
+
+    def summary(self) -> str:
+        parts = []
+        for kind, count in sorted(self.counts.items()):
+            first = (self.examples.get(kind) or [{}])[0]
+            try:
+                parts.append(_DESCRIPTIONS[kind].format(n=count, first=first))
+            except (KeyError, IndexError):
+                parts.append(f"{count} x {kind}")
+        if any(self.histogram):
+            parts.append("outliers by speed / max speed: " + ", ".join(
+                f"{label}: {n}" for label, n in zip(self.histogram_labels(), self.histogram) if n))
+        return f"track '{self.track}': " + "; ".join(parts)
+
+
+class DataQualityReport:
+    """Diagnostics of all tracks processed in one run."""
+
+    def __init__(self, max_examples: int = 5):
+        self.max_examples = max_examples
+        self.tracks: Dict[str, TrackDiagnostics] = {}
+
+    def track(self, name: str) -> TrackDiagnostics:
+        """Return the diagnostics of track ``name``, creating them on first use."""
+        if name not in self.tracks:
+            self.tracks[name] = TrackDiagnostics(name, self.max_examples)
+        return self.tracks[name]
+
+    @property
+    def counts(self) -> Counter:
+        total = Counter()
+        for diagnostics in self.tracks.values():
+            total.update(diagnostics.counts)
+        return total
+
+    def __bool__(self) -> bool:
+        return any(self.tracks.values())
+
+    def to_dict(self) -> dict:
+        return {
+            "counts": dict(self.counts),
+            "tracks": [d.to_dict() for d in self.tracks.values() if d],
+        }
+
+    def log(self, log: logging.Logger = logger, level: int = logging.WARNING) -> None:
+        """Log one summary line per track with problems, and the examples at DEBUG level."""
+        for diagnostics in self.tracks.values():
+            if not diagnostics:
+                continue
+            log.log(level, "Data quality: %s", diagnostics.summary())
+            for kind, examples in diagnostics.examples.items():
+                for example in examples:
+                    log.debug("  %s in track '%s': %s", kind, diagnostics.track, example)
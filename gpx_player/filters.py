@@ -0,0 +1,206 @@
+"""Vectorized cleaning of raw GPS fixes before speeds and distances are computed.
+
+All functions work on whole NumPy columns (latitude, longitude, seconds) and
+take O(n) time per track, so they are cheap enough to run on every track.
+"""
+import argparse
+from typing import Optional, Tuple
+
+import numpy as np
+
+from gpx_player.utils import EARTH_RADIUS, MS_TO_KNOTS, haversine_between, haversine_distances
+
+
+def _speeds(distances: np.ndarray, time_diff: np.ndarray) -> np.ndarray:
+    """Speeds in m/s; a non-positive time step gives ``inf`` (or 0 if the point did not move)."""
+    speeds = np.where(distances > 0, np.inf, 0.0)
+    moving = time_diff > 0
+    speeds[moving] = distances[moving] / time_diff[moving]
+    return speeds
+
+
+def _detour(v_in, v_out, v_bypass, dt_in, dt_out, limit, max_acceleration):
+    """Where a detour is implausible but the bypass is not; see :func:`spike_mask`."""
+    suspicious = (v_in > limit) & (v_out > limit)
+    if max_acceleration is not None:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            jerk_in = (v_in - v_bypass) / dt_in > max_acceleration
+            jerk_out = (v_out - v_bypass) / dt_out > max_acceleration
+        suspicious |= jerk_in & jerk_out
+    return suspicious & (v_bypass <= limit)
+
+
+def spike_mask(lat, lon, seconds, max_speed: float, max_acceleration: Optional[float] = None) -> np.ndarray:
+    """Return a boolean mask of the fixes that are position spikes of one or two fixes.
+
+    A run of one or two fixes is a spike if the track is plausible without
+    it -- the speed from the fix before straight to the fix after is at most
+    ``max_speed`` (knots) -- but not with it: both the speed into and out of
+    the run exceed ``max_speed``, or, with ``max_acceleration`` (m/s²),
+    entering and leaving the run implies more than that acceleration compared
+    with skipping it. The first and last fix are never flagged.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    seconds = np.asarray(seconds, dtype=float)
+    n = len(lat)
+    mask = np.zeros(n, dtype=bool)
+    if n < 3:
+        return mask
+
+    limit = max_speed / MS_TO_KNOTS
+    time_diff = np.diff(seconds)
+    speeds = _speeds(haversine_distances(lat, lon), time_diff)
+    for run in (1, 2):
+        if n < run + 2:
+            break
+        # runs start at fix 1 .. n-1-run; the bypass goes from the fix before to the fix after
+        dt_in, dt_out = time_diff[:n - 1 - run], time_diff[run:]
+        span = seconds[run + 1:] - seconds[:n - 1 - run]
+        v_bypass = _speeds(haversine_between(lat[:-run - 1], lon[:-run - 1], lat[run + 1:], lon[run + 1:]), span)
+        spikes = _detour(speeds[:n - 1 - run], speeds[run:], v_bypass, dt_in, dt_out, limit, max_acceleration)
+        for offset in range(run):
+            mask[1 + offset:n - run + offset] |= spikes
+    return mask
+
+
+def reject_spikes(lat, lon, seconds, max_speed: float, max_acceleration: Optional[float] = None,
+                  passes: int = 2) -> np.ndarray:
+    """Return the indices of the fixes to keep after removing spikes.
+
+    :func:`spike_mask` is applied up to ``passes`` times to the remaining
+    fixes, so spikes hidden next to other spikes are removed as well.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    seconds = np.asarray(seconds, dtype=float)
+    keep = np.arange(len(lat))
+    for _ in range(passes):
+        spikes = spike_mask(lat[keep], lon[keep], seconds[keep], max_speed, max_acceleration)
+        if not spikes.any():
+            break
+        keep = keep[~spikes]
+    return keep
+
+
+def median_smooth(values, window: int) -> np.ndarray:
+    """Running median of ``values`` over ``window`` fixes (odd, edges padded with the end values)."""
+    values = np.asarray(values, dtype=float)
+    if window < 3 or len(values) < 3:
+        return values.copy()
+    if window % 2 == 0:
+        raise ValueError(f"median_smooth: window must be odd, got {window}")
+    half = window // 2
+    padded = np.pad(values, half, mode="edge")
+    return np.median(np.lib.stride_tricks.sliding_window_view(padded, window), axis=1)
+
+
+def parse_median_window(value: str) -> int:
+    """Parse a ``--median-window`` argument: 0 (no smoothing) or an odd window of at least 3."""
+    try:
+        window = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid window: {value!r}") from None
+    if window != 0 and (window < 3 or window % 2 == 0):
+        raise argparse.ArgumentTypeError(f"the window must be 0 or odd and at least 3, got {window}")
+    return window
+
+
+def simplify_indices(lat, lon, tolerance: float) -> np.ndarray:
+    """Return the indices of the fixes kept by Douglas-Peucker simplification.
+
+    ``tolerance`` is the largest allowed distance in metres between a dropped
+    fix and the simplified line, measured on a local equirectangular
+    projection. The result is sorted and always contains the first and last
+    fix, so a simplified track keeps its timestamps in order. Distances to
+    each candidate segment are computed for all its fixes at once.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    n = len(lat)
+    if n < 3 or tolerance <= 0:
+        return np.arange(n)
+    y = EARTH_RADIUS * np.radians(lat)
+    x = EARTH_RADIUS * np.radians(lon) * np.cos(np.radians(np.mean(lat)))
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        length2 = dx * dx + dy * dy
+        # distance to the segment (not the infinite line), so turns and tacks are kept
+        t = np.clip((px * dx + py * dy) / length2, 0.0, 1.0) if length2 > 0 else 0.0
+        distances = np.hypot(px - t * dx, py - t * dy)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
+
+
+def stationary_groups(lat, lon, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Group consecutive fixes that stay within ``radius`` metres of the group's first fix.
+
+    Return the index of the first and of the last fix of every group; moving
+    fixes form groups of their own. Only stretches where every step is within
+    ``radius`` are examined fix by fix, in chunks, so a track that moves all
+    the time costs a single vectorized pass.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    n = len(lat)
+    starts = np.ones(n, dtype=bool)
+    if n >= 2 and radius > 0:
+        close = np.concatenate(([False], haversine_distances(lat, lon) <= radius, [False]))
+        # stretches of close steps: fix edges[2k] up to fix edges[2k + 1]
+        edges = np.flatnonzero(np.diff(close.astype(np.int8)))
+        for anchor, last in zip(edges[::2], edges[1::2]):
+            while anchor < last:
+                end, chunk = anchor + 1, 64
+                while end <= last:
+                    stop = min(last, end + chunk - 1)
+                    far = np.flatnonzero(haversine_between(lat[anchor], lon[anchor],
+                                                           lat[end:stop + 1], lon[end:stop + 1]) > radius)
+                    if far.size:
+                        end += int(far[0])
+                        break
+                    end, chunk = stop + 1, chunk * 2
+                starts[anchor + 1:end] = False
+                anchor = end
+    first = np.flatnonzero(starts)
+    return first, np.append(first[1:] - 1, n - 1)
+
+
+def filter_track(track: dict, max_speed: float, max_acceleration: Optional[float] = None,
+                 median_window: int = 0, passes: int = 2) -> Tuple[dict, int]:
+    """Return a copy of ``track`` without position spikes, and the number of removed points.
+
+    Spikes are found by :func:`reject_spikes`; with ``median_window`` (odd,
+    at least 3) the remaining positions are then smoothed by
+    :func:`median_smooth`. Point dicts of unchanged points are shared with the
+    input; tracks with points lacking a time are returned unchanged.
+    """
+    points = track.get('points', [])
+    new_track = {k: v for k, v in track.items() if k != 'points'}
+    if len(points) < 3 or any(p.get('time') is None for p in points):
+        new_track['points'] = list(points)
+        return new_track, 0
+
+    lat = np.array([p['lat'] for p in points], dtype=float)
+    lon = np.array([p['lon'] for p in points], dtype=float)
+    seconds = np.array([p['time'].timestamp() for p in points])
+    keep = reject_spikes(lat, lon, seconds, max_speed, max_acceleration, passes)
+    kept = [points[i] for i in keep]
+    if median_window >= 3:
+        smooth_lat = median_smooth(lat[keep], median_window)
+        smooth_lon = median_smooth(lon[keep], median_window)
+        kept = [dict(p, lat=float(la), lon=float(lo)) for p, la, lo in zip(kept, smooth_lat, smooth_lon)]
+    new_track['points'] = kept
+    return new_track, len(points) - len(kept)
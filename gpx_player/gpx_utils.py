@@ -1,8 +1,20 @@
+import gzip
+import os
+import shutil
+import tempfile
+from bisect import bisect_left, bisect_right
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
 import gpxpy
 import gpxpy.gpx
-from datetime import datetime
+import numpy as np
 from lxml import etree as ET
-from pathlib import Path
+
+from gpx_player.validator import parse_timestamp
+
 
 def cut_gpx_file(file_path, timestamp, cut_type):
     """
@@ -40,48 +52,604 @@ def cut_gpx_file(file_path, timestamp, cut_type):
     return new_file_path
 
 
-def _ensure_aware(ts: datetime, name: str) -> None:
-    if ts.tzinfo is None:
+_AWARENESS_MISMATCH = (
+    "trim_track: point timestamps and start/end_time must both be "
+    "timezone-aware or both be naive"
+)
+
+
+def _ensure_aware(ts: Optional[datetime], name: str) -> None:
+    if ts is not None and ts.tzinfo is None:
         raise ValueError(f"trim_track: {name} must be timezone-aware")
 
 
-def trim_track(track: dict, start_time: datetime, end_time: datetime) -> dict:
-    """Return a new track with only points in ``[start_time, end_time]``.
+def time_window(times, start_time=None, end_time=None) -> slice:
+    """Return the ``slice`` of the sorted ``times`` that lies in ``[start_time, end_time]``.
 
-    The input ``track`` is not mutated. All point fields (including any
-    extension keys) and track metadata (``name``, ``description``, ...) are
-    preserved. A ``ValueError`` is raised if the bounds are naive or if point
-    timestamps and bounds disagree on timezone awareness.
+    ``times`` must be non-decreasing: a sequence of datetimes (searched with
+    :mod:`bisect`) or a NumPy array (searched with ``np.searchsorted``) whose
+    values are comparable with the bounds. Either bound may be ``None`` for an
+    open window. Both ends are found in O(log n).
     """
-    _ensure_aware(start_time, "start_time")
-    _ensure_aware(end_time, "end_time")
-
-    filtered = []
-    for p in track.get('points', []):
-        t = p.get('time')
-        if t is None:
-            continue
-        if (t.tzinfo is None) != (start_time.tzinfo is None):
-            raise ValueError(
-                "trim_track: point timestamps and start/end_time must both be "
-                "timezone-aware or both be naive"
+    if isinstance(times, np.ndarray):
+        lo = 0 if start_time is None else int(np.searchsorted(times, start_time, side='left'))
+        hi = len(times) if end_time is None else int(np.searchsorted(times, end_time, side='right'))
+    else:
+        lo = 0 if start_time is None else bisect_left(times, start_time)
+        hi = len(times) if end_time is None else bisect_right(times, end_time)
+    return slice(lo, max(lo, hi))
+
+
+class TrackTimeIndex:
+    """Time index of one track for repeated windowing.
+
+    Timezone awareness and ordering of the point timestamps are checked once,
+    when the index is built. For time-sorted points :meth:`trim` then finds
+    both window ends by binary search and slices the point list; unsorted
+    points (or points without a time) fall back to a linear scan. Trimmed
+    tracks share the point dicts with the indexed track.
+    """
+
+    def __init__(self, track: dict):
+        self.track = track
+        self.points = track.get('points', [])
+        self.times = [p.get('time') for p in self.points]
+        first = next((t for t in self.times if t is not None), None)
+        self.aware = None if first is None else first.tzinfo is not None
+        try:
+            self.sorted = None not in self.times and all(
+                previous <= current for previous, current in zip(self.times, self.times[1:])
             )
-        if start_time <= t <= end_time:
-            filtered.append(dict(p))
+        except TypeError:
+            # naive and aware timestamps cannot be compared
+            raise ValueError(_AWARENESS_MISMATCH) from None
 
-    new_track = {k: v for k, v in track.items() if k != 'points'}
-    new_track['points'] = filtered
-    return new_track
+    def window(self, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> slice:
+        """Return the slice of sorted points in ``[start_time, end_time]``; see :func:`time_window`."""
+        if not self.sorted:
+            raise ValueError("TrackTimeIndex.window: point timestamps are not sorted")
+        return time_window(self.times, start_time, end_time)
+
+    def trim(self, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> dict:
+        """Return a new track with only the points in ``[start_time, end_time]``.
+
+        Either bound may be ``None``. Bounds must be timezone-aware and agree
+        with the point timestamps on awareness, else ``ValueError`` is raised.
+        """
+        _ensure_aware(start_time, "start_time")
+        _ensure_aware(end_time, "end_time")
+        if self.aware is False and (start_time is not None or end_time is not None):
+            raise ValueError(_AWARENESS_MISMATCH)
 
+        if self.sorted:
+            filtered = self.points[self.window(start_time, end_time)]
+        else:
+            try:
+                filtered = [
+                    p for p in self.points
+                    if p.get('time') is not None
+                    and (start_time is None or start_time <= p['time'])
+                    and (end_time is None or p['time'] <= end_time)
+                ]
+            except TypeError:
+                raise ValueError(_AWARENESS_MISMATCH) from None
 
-def trim_tracks(tracks, start_time: datetime, end_time: datetime):
+        new_track = {k: v for k, v in self.track.items() if k != 'points'}
+        new_track['points'] = filtered
+        return new_track
+
+
+def trim_track(track: dict, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> dict:
+    """Return a new track with only points in ``[start_time, end_time]``.
+
+    The input ``track`` is not mutated; the returned track shares its point
+    dicts. All point fields (including any extension keys) and track metadata
+    (``name``, ``description``, ...) are preserved. Either bound may be
+    ``None`` for an open window. A ``ValueError`` is raised if the bounds are
+    naive or if point timestamps and bounds disagree on timezone awareness.
+
+    Time-sorted tracks are trimmed by binary search. To cut several windows
+    from the same track, build a :class:`TrackTimeIndex` once and call its
+    :meth:`~TrackTimeIndex.trim`.
+    """
+    return TrackTimeIndex(track).trim(start_time, end_time)
+
+
+def trim_tracks(tracks, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None):
     """Apply :func:`trim_track` to each track and return a new list."""
     return [trim_track(t, start_time, end_time) for t in tracks]
 
 
-def remove_extensions_tags(file_path: str, overwrite: bool = False) -> tuple[str, int]:
+REPAIR_BACKWARD_POLICIES = ("sort", "drop", "flag")
+REPAIR_DUPLICATE_POLICIES = ("first", "average")
+
+
+class TimestampRepair(NamedTuple):
+    """Result of :func:`repair_timestamps`.
+
+    ``index`` lists the source positions of the kept fixes in output order;
+    ``starts`` are the positions in ``index`` where each output fix begins
+    (exact duplicates share one output fix). ``flagged`` marks output fixes
+    that jump back in time (only with ``backward="flag"``). The counts say how
+    many fixes the sort moved, how many fixes jumped back in time (and were
+    sorted into place, dropped or flagged) and how many duplicates were merged.
+    """
+    index: np.ndarray
+    starts: np.ndarray
+    flagged: np.ndarray
+    total: int
+    reordered: int
+    backward: int
+    duplicates: int
+
+    @property
+    def kept(self) -> int:
+        return len(self.starts)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.reordered or self.backward or self.duplicates)
+
+    def apply(self, column, average: bool = False) -> np.ndarray:
+        """Return ``column`` (one value per source fix) in output order.
+
+        Duplicates take the value of their first fix, or the mean of the group
+        with ``average=True`` (for numeric columns such as coordinates).
+        """
+        values = np.asarray(column)[self.index]
+        if not average or len(values) == 0:
+            return values[self.starts]
+        sizes = np.diff(np.append(self.starts, len(values)))
+        return np.add.reduceat(values.astype(float), self.starts) / sizes
+
+    def __str__(self) -> str:
+        return (f"{self.total} fixes: {self.reordered} reordered, {self.backward} backwards jumps, "
+                f"{self.duplicates} duplicates merged, {self.kept} kept")
+
+
+def repair_timestamps(seconds, backward: str = "sort") -> TimestampRepair:
+    """Plan the repair of a fix sequence with duplicate or out-of-order times.
+
+    ``seconds`` is the time column (e.g. POSIX seconds) in recording order.
+    Backwards jumps are handled by ``backward``:
+
+    * ``"sort"`` -- stably sort the fixes by time;
+    * ``"drop"`` -- drop every fix older than a fix recorded before it;
+    * ``"flag"`` -- keep the order and mark those fixes in ``flagged``.
+
+    Consecutive fixes with exactly the same time are then collapsed into one
+    (see :meth:`TimestampRepair.apply`). Everything is computed with array
+    operations over the whole column; nothing is logged per point.
+    """
+    if backward not in REPAIR_BACKWARD_POLICIES:
+        raise ValueError(f"repair_timestamps: backward must be one of {REPAIR_BACKWARD_POLICIES}, got {backward!r}")
+    t = np.asarray(seconds, dtype=float)
+    n = len(t)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.intp)
+        return TimestampRepair(empty, empty, np.zeros(0, dtype=bool), 0, 0, 0, 0)
+
+    # a fix jumps back if it is older than the latest fix recorded before it
+    latest_before = np.maximum.accumulate(np.concatenate(([-np.inf], t[:-1])))
+    jumps_back = t < latest_before
+    reordered = 0
+    if backward == "sort":
+        index = np.argsort(t, kind="stable")
+        reordered = int(np.count_nonzero(index != np.arange(n)))
+        flagged = np.zeros(n, dtype=bool)
+    elif backward == "drop":
+        index = np.flatnonzero(~jumps_back)
+        flagged = np.zeros(len(index), dtype=bool)
+    else:
+        index = np.arange(n)
+        flagged = jumps_back
+
+    ordered = t[index]
+    is_duplicate = np.concatenate(([False], ordered[1:] == ordered[:-1]))
+    starts = np.flatnonzero(~is_duplicate)
+    return TimestampRepair(
+        index=index,
+        starts=starts,
+        flagged=flagged[starts],
+        total=n,
+        reordered=reordered,
+        backward=int(np.count_nonzero(jumps_back)),
+        duplicates=len(index) - len(starts),
+    )
+
+
+def repair_track(track: dict, backward: str = "sort", duplicates: str = "first") -> Tuple[dict, TimestampRepair]:
+    """Return a copy of ``track`` with its timestamps repaired, and the repair report.
+
+    See :func:`repair_timestamps` for ``backward``. Exact duplicates keep their
+    first fix (``duplicates="first"``) or the mean position of the group
+    (``duplicates="average"``). With ``backward="flag"`` the kept point dicts of
+    backwards jumps get ``'time_flagged': True``. Points without a time are
+    dropped. The input track is not mutated.
+    """
+    if duplicates not in REPAIR_DUPLICATE_POLICIES:
+        raise ValueError(f"repair_track: duplicates must be one of {REPAIR_DUPLICATE_POLICIES}, got {duplicates!r}")
+    points = [p for p in track.get('points', []) if p.get('time') is not None]
+    repair = repair_timestamps([p['time'].timestamp() for p in points], backward)
+    kept = [points[i] for i in repair.apply(np.arange(len(points)))]
+    if duplicates == "average" and repair.duplicates:
+        averaged = {key: repair.apply([p[key] for p in points], average=True)
+                    for key in ('lat', 'lon', 'ele') if points and all(p.get(key) is not None for p in points)}
+        kept = [dict(p, **{key: float(values[i]) for key, values in averaged.items()}) for i, p in enumerate(kept)]
+    if repair.flagged.any():
+        kept = [dict(p, time_flagged=True) if flag else p for p, flag in zip(kept, repair.flagged)]
+
+    new_track = {k: v for k, v in track.items() if k != 'points'}
+    new_track['points'] = kept
+    return new_track, repair
+
+
+def parse_point_time(text: str) -> datetime:
+    """Parse a GPX ``<time>`` value into an aware datetime; times without an offset are UTC."""
+    try:
+        return parse_timestamp(text).replace(tzinfo=timezone.utc)
+    except ValueError:
+        parsed = datetime.fromisoformat(text.strip().replace('Z', '+00:00'))
+        return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+class _WindowOutput:
+    """One output document of :func:`extract_windows`, written incrementally."""
+
+    def __init__(self, xf, root_nsmap):
+        self.xf = xf
+        self.root_nsmap = root_nsmap
+        self.open_elements = []
+        self.track_open = False
+        self.segment_open = False
+        self.points = 0
+
+    def open(self, node):
+        self._indent()
+        nsmap = node.nsmap if not self.open_elements else None
+        element = self.xf.element(node.tag, node.attrib, nsmap=nsmap)
+        element.__enter__()
+        self.open_elements.append(element)
+
+    def close(self):
+        self.xf.write("\n" + "  " * (len(self.open_elements) - 1))
+        self.open_elements.pop().__exit__(None, None, None)
+
+    def copy(self, node):
+        """Write ``node`` with its subtree (but not its tail) into the current element."""
+        self._indent()
+        self._copy(node, self.root_nsmap)
+
+    def _copy(self, node, parent_nsmap):
+        if not isinstance(node.tag, str):
+            self.xf.write(ET.Comment(node.text) if node.tag is ET.Comment
+                          else ET.ProcessingInstruction(node.target, node.text))
+            return
+        nsmap = node.nsmap
+        declared = {prefix: uri for prefix, uri in nsmap.items() if parent_nsmap.get(prefix) != uri}
+        with self.xf.element(node.tag, node.attrib, nsmap=declared or None):
+            if node.text:
+                self.xf.write(node.text)
+            for child in node:
+                self._copy(child, nsmap)
+                if child.tail:
+                    self.xf.write(child.tail)
+
+    def _indent(self):
+        if self.open_elements:
+            self.xf.write("\n" + "  " * len(self.open_elements))
+
+
+def extract_windows(file_path, windows, output_paths, compress=False) -> List[int]:
+    """Write the points of ``file_path`` inside each time window to its own GPX file.
+
+    ``windows`` is a sequence of ``(start, end)`` timezone-aware datetimes and
+    ``output_paths`` the matching output files (gzip-compressed if
+    ``compress`` or if a name ends with ``.gz``). The source is read once, in
+    a single streaming pass, however many windows there are; windows may
+    overlap. Every output keeps the root element, ``<metadata>``, waypoints
+    and routes of the source, and the tracks and segments that have points
+    in its window, with the segment structure preserved. Points without a
+    time are dropped.
+
+    Returns the number of points written to each output.
+    """
+    windows = list(windows)
+    output_paths = list(output_paths)
+    if len(windows) != len(output_paths):
+        raise ValueError("extract_windows: need one output path per window")
+    for start, end in windows:
+        _ensure_aware(start, "start_time")
+        _ensure_aware(end, "end_time")
+        if start > end:
+            raise ValueError(f"extract_windows: window start {start} is after its end {end}")
+    # candidate windows for a time t are the ones starting at or before t
+    order = sorted(range(len(windows)), key=lambda i: windows[i][0])
+    starts = [windows[i][0] for i in order]
+
+    with ExitStack() as stack:
+        writers = [stack.enter_context(gpx_writer(path, compress)) for path in output_paths]
+        outputs = []
+        in_segments = False  # track children before the first segment are written once the track has a point
+        trk_tag = trkseg_tag = trkpt_tag = None
+        depth = 0
+        source = stack.enter_context(_open_gpx_for_reading(file_path))
+        for event, node in ET.iterparse(source, events=("start", "end"), huge_tree=True):
+            if event == "start":
+                depth += 1
+                if depth == 1:
+                    namespace = node.tag[:-len("gpx")]
+                    trk_tag, trkseg_tag, trkpt_tag = namespace + "trk", namespace + "trkseg", namespace + "trkpt"
+                    outputs = [_WindowOutput(xf, node.nsmap) for xf in writers]
+                    for output in outputs:
+                        output.open(node)
+                elif depth == 2 and node.tag == trk_tag:
+                    in_segments = False
+                elif depth == 3 and node.tag == trkseg_tag:
+                    in_segments = True
+                continue
+
+            depth -= 1
+            if depth == 0:
+                for output in outputs:
+                    output.close()
+                continue
+            if depth == 3 and node.tag == trkpt_tag:
+                time_elem = node.find("{*}time")
+                if time_elem is not None and time_elem.text:
+                    t = parse_point_time(time_elem.text)
+                    track = node.getparent().getparent()
+                    for i in order[:bisect_right(starts, t)]:
+                        if t > windows[i][1]:
+                            continue
+                        output = outputs[i]
+                        if not output.track_open:
+                            output.open(track)
+                            for child in track.iterchildren(tag=ET.Element):
+                                if child.tag == trkseg_tag:
+                                    break
+                                output.copy(child)
+                            output.track_open = True
+                        if not output.segment_open:
+                            output.open(node.getparent())
+                            output.segment_open = True
+                        output.copy(node)
+                        output.points += 1
+                node.clear()
+                while node.getprevious() is not None:
+                    del node.getparent()[0]
+            elif depth == 2 and node.tag == trkseg_tag:
+                for output in outputs:
+                    if output.segment_open:
+                        output.close()
+                        output.segment_open = False
+                node.clear()
+            elif depth == 2:
+                # trailing track children (e.g. <extensions>) go to the outputs that have this track
+                if in_segments:
+                    for output in outputs:
+                        if output.track_open:
+                            output.copy(node)
+            elif depth == 1:
+                if node.tag == trk_tag:
+                    for output in outputs:
+                        if output.track_open:
+                            output.close()
+                            output.track_open = False
+                else:
+                    for output in outputs:
+                        output.copy(node)
+                node.clear()
+                while node.getprevious() is not None:
+                    del node.getparent()[0]
+    return [output.points for output in outputs]
+
+
+_STREAM_CHUNK_SIZE = 1 << 16
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+class _ExtensionStripper:
+    """lxml parser target that copies SAX events to an ``etree.xmlfile``
+    writer, leaving out ``<extensions>`` subtrees and the text that follows
+    them (the same text that ``parent.remove(node)`` drops)."""
+
+    def __init__(self, xf):
+        self.xf = xf
+        self.open_elements = []
+        self.skip_depth = 0
+        self.drop_tail = False
+        self.removed = 0
+
+    def start(self, tag, attrib, nsmap=None):
+        self.drop_tail = False
+        if self.skip_depth or tag.rpartition("}")[2] == "extensions":
+            self.skip_depth += 1
+            return
+        # parser targets report the default namespace with an empty prefix
+        nsmap = {prefix or None: uri for prefix, uri in nsmap.items()} if nsmap else None
+        element = self.xf.element(tag, attrib, nsmap=nsmap)
+        element.__enter__()
+        self.open_elements.append(element)
+
+    def end(self, tag):
+        if self.skip_depth:
+            self.skip_depth -= 1
+            if not self.skip_depth:
+                self.removed += 1
+                self.drop_tail = True
+            return
+        self.drop_tail = False
+        self.open_elements.pop().__exit__(None, None, None)
+
+    def data(self, data):
+        if not (self.skip_depth or self.drop_tail):
+            self.xf.write(data)
+
+    def comment(self, text):
+        self.drop_tail = False
+        if not self.skip_depth:
+            self.xf.write(ET.Comment(text))
+
+    def pi(self, target, data=None):
+        self.drop_tail = False
+        if not self.skip_depth:
+            self.xf.write(ET.ProcessingInstruction(target, data))
+
+    def close(self):
+        return self.removed
+
+
+class ExtensionStrippingEventWriter(_ExtensionStripper):
+    """Write a document from ``iterparse`` events, without ``<extensions>``.
+
+    Call it as ``writer(event, element)`` for every ``start``, ``end``,
+    ``comment`` and ``pi`` event; the events are passed on to the
+    :class:`_ExtensionStripper` target methods. Text is written once it is
+    known to be complete, and elements are freed as soon as they have been
+    written, so the parsed tree stays small. ``removed`` counts the dropped
+    blocks.
+    """
+
+    def _text_before(self, node):
+        parent = node.getparent()
+        if parent is None:
+            return
+        previous = node.getprevious()
+        text = parent.text if previous is None else previous.tail
+        if text:
+            self.data(text)
+
+    @staticmethod
+    def _free_previous(node):
+        parent = node.getparent()
+        if parent is not None:
+            while node.getprevious() is not None:
+                del parent[0]
+
+    def __call__(self, event, node):
+        if event == "start":
+            self._text_before(node)
+            parent = node.getparent()
+            nsmap = node.nsmap
+            if parent is not None:
+                parent_nsmap = parent.nsmap
+                nsmap = {prefix: uri for prefix, uri in nsmap.items() if parent_nsmap.get(prefix) != uri}
+            self.start(node.tag, node.attrib, nsmap)
+        elif event == "end":
+            text = node[-1].tail if len(node) else node.text
+            if text:
+                self.data(text)
+            self.end(node.tag)
+            # keep the element itself: its tail is written before the next sibling
+            node.clear(keep_tail=True)
+            self._free_previous(node)
+        else:
+            self._text_before(node)
+            if event == "comment":
+                self.comment(node.text)
+            else:
+                self.pi(node.target, node.text)
+            self._free_previous(node)
+
+
+def _open_gpx_for_reading(path):
+    """Open ``path`` for binary reading, decompressing it if it is gzip data."""
+    with open(path, "rb") as f:
+        compressed = f.read(2) == _GZIP_MAGIC
+    return gzip.open(path, "rb") if compressed else open(path, "rb")
+
+
+def _open_gpx_for_writing(dst, compress=False):
+    """Open ``dst`` for binary writing, gzip-compressed if ``compress`` or its name ends with ``.gz``."""
+    return gzip.open(dst, "wb") if compress or str(dst).endswith(".gz") else open(dst, "wb")
+
+
+@contextmanager
+def gpx_writer(dst, compress=False):
+    """Open an ``etree.xmlfile`` writer on ``dst`` with the XML declaration written.
+
+    The output is gzip-compressed if ``compress`` is ``True`` or the name of
+    ``dst`` ends with ``.gz``.
+    """
+    with _open_gpx_for_writing(dst, compress) as out, ET.xmlfile(out, encoding="utf-8") as xf:
+        xf.write_declaration()
+        yield xf
+
+
+def remove_extensions_from_tree(tree) -> int:
+    """Remove all ``<extensions>`` elements from a parsed document; return how many."""
+    extensions = tree.xpath('//*[local-name()="extensions"]')
+    for node in extensions:
+        parent = node.getparent()
+        if parent is not None:
+            parent.remove(node)
+    return len(extensions)
+
+
+def write_gpx_tree(tree, dst, compress=False) -> None:
+    """Write a parsed document to ``dst`` as UTF-8, gzip-compressed as in :func:`gpx_writer`."""
+    with _open_gpx_for_writing(dst, compress) as out:
+        tree.write(out, encoding="utf-8", xml_declaration=True)
+
+
+def cleaned_file_path(file_path, overwrite=False, compress=False) -> Path:
+    """Return where the cleaned copy of ``file_path`` is written: the file
+    itself if ``overwrite``, else ``<name>_noext.gpx`` (``.gpx.gz`` if
+    ``compress``) next to it."""
+    path = Path(file_path)
+    if overwrite and compress:
+        raise ValueError("cannot overwrite the original file with compressed output")
+    if overwrite:
+        return path
+    return path.with_name(path.stem + "_noext.gpx" + (".gz" if compress else ""))
+
+
+@contextmanager
+def atomic_write(target, mode_from=None):
+    """Yield a temporary path next to ``target`` that replaces ``target`` on success.
+
+    If the block raises, the temporary file is removed and ``target`` is left
+    untouched. ``mode_from`` names a file whose permissions are copied.
+    """
+    target = Path(target)
+    fd, tmp_name = tempfile.mkstemp(prefix=target.name, suffix=".tmp", dir=str(target.parent))
+    os.close(fd)
+    try:
+        yield tmp_name
+        if mode_from is not None:
+            shutil.copymode(mode_from, tmp_name)
+        os.replace(tmp_name, target)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def strip_extensions(src, dst, compress=False) -> int:
+    """Copy the GPX file ``src`` to ``dst`` without ``<extensions>`` blocks.
+
+    The document is streamed through a SAX-style filter and written
+    incrementally, so memory use does not depend on the file size. ``dst`` is
+    gzip-compressed if ``compress`` is ``True`` or its name ends with ``.gz``;
+    gzip-compressed ``src`` is decompressed on the fly. ``dst`` must not be
+    ``src``.
+
+    Returns the number of removed ``<extensions>`` blocks.
+    """
+    with _open_gpx_for_reading(src) as fin, gpx_writer(dst, compress) as xf:
+        parser = ET.XMLParser(target=_ExtensionStripper(xf), huge_tree=True)
+        for chunk in iter(lambda: fin.read(_STREAM_CHUNK_SIZE), b""):
+            parser.feed(chunk)
+        removed = parser.close()
+    return removed
+
+
+def remove_extensions_tags(file_path: str, overwrite: bool = False, compress: bool = False) -> tuple[str, int]:
     """Remove all ``<extensions>...</extensions>`` blocks from a GPX file.
 
+    The file is processed with :func:`strip_extensions`, i.e. in constant
+    memory.
+
     Parameters
     ----------
     file_path : str
@@ -92,29 +660,17 @@ def remove_extensions_tags(file_path: str, overwrite: bool = False) -> tuple[str
         file with ``_noext`` appended to the name will be created. Default is
         ``False``.
 
+    compress : bool, optional
+        If ``True``, the new file is gzip-compressed and gets a ``.gz``
+        suffix. Cannot be combined with ``overwrite``. Default is ``False``.
+
     Returns
     -------
     tuple[str, int]
         A tuple containing the path to the cleaned GPX file and the number of
         ``<extensions>`` tags removed.
     """
-
-    tree = ET.parse(file_path)
-    root = tree.getroot()
-
-    extensions = root.xpath('//*[local-name()="extensions"]')
-    removed = len(extensions)
-    for node in extensions:
-        parent = node.getparent()
-        if parent is not None:
-            parent.remove(node)
-
-    path = Path(file_path)
-    if overwrite:
-        new_path = path
-    else:
-        new_name = path.stem + "_noext.gpx"
-        new_path = path.with_name(new_name)
-
-    tree.write(str(new_path), encoding="utf-8", xml_declaration=True)
+    new_path = cleaned_file_path(file_path, overwrite, compress)
+    with atomic_write(new_path, mode_from=file_path) as tmp_name:
+        removed = strip_extensions(file_path, tmp_name, compress=compress)
     return str(new_path), removed
@@ -0,0 +1,185 @@
+"""Incremental kinematics of a growing track.
+
+:class:`TrackAccumulator` takes the fixes of one track in time order, one at
+a time or in batches, and keeps the values the renderers show -- cumulative
+distance, current speed, average speed since the first fix, top speed and
+heading -- from a handful of running totals, so appending a fix never looks
+at the earlier ones again. Its state is plain data (:meth:`~TrackAccumulator.to_dict`),
+so a track can be resumed later, e.g. when a log file has grown.
+"""
+import math
+from typing import NamedTuple, Optional
+
+import gpxpy.geo
+import numpy as np
+
+from gpx_player.diagnostics import NON_POSITIVE_TIME_STEP, SPEED_OUTLIER, TrackDiagnostics
+from gpx_player.utils import MS_TO_KNOTS, from_epoch_ms, haversine_distances
+
+METRES_PER_NM = 1852.0
+
+
+class Kinematics(NamedTuple):
+    """Per-fix columns of a batch of fixes, see :meth:`TrackAccumulator.extend`.
+
+    ``speeds`` is the speed in knots of the segment ending at each fix (0 at
+    the first fix of a track), ``distances`` the distance in nm since the
+    first fix, ``avg_speeds`` the average speed in knots since the first fix
+    and ``headings`` the course in degrees of the last segment that moved
+    (NaN until the track has moved).
+    """
+    speeds: np.ndarray
+    distances: np.ndarray
+    avg_speeds: np.ndarray
+    headings: np.ndarray
+
+
+def _bearings(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Initial great-circle bearing in degrees from the first to the second points."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+def _bearing(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Scalar :func:`_bearings`, for one fix at a time."""
+    lat1, lat2, dlon = math.radians(lat1), math.radians(lat2), math.radians(lon2 - lon1)
+    y = math.sin(dlon) * math.cos(lat2)
+    x = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(dlon)
+    return math.degrees(math.atan2(y, x)) % 360.0
+
+
+class TrackAccumulator:
+    """Running kinematics of one track, updated in O(1) per fix.
+
+    The rules are those of :func:`gpx_player.openseamap.calculate_speeds`,
+    :func:`~gpx_player.openseamap.accumulate_distances` and
+    :func:`~gpx_player.openseamap.calculate_average_speeds`: a segment with a
+    non-positive time step, or faster than ``max_speed`` knots, gets speed 0
+    (and is recorded in ``diagnostics``), but its distance still counts.
+    ``top_speed`` is the highest speed that was not nullified.
+    """
+
+    _STATE = ('max_speed', 'count', 'first_time_ms', 'last_lat', 'last_lon', 'last_time_ms',
+              'distance', 'speed', 'top_speed', 'heading')
+
+    def __init__(self, max_speed: float = math.inf, diagnostics: Optional[TrackDiagnostics] = None):
+        self.max_speed = max_speed
+        self.diagnostics = diagnostics
+        self.count = 0
+        self.first_time_ms: Optional[int] = None
+        self.last_lat: Optional[float] = None
+        self.last_lon: Optional[float] = None
+        self.last_time_ms: Optional[int] = None
+        self.distance = 0.0
+        self.speed = 0.0
+        self.top_speed = 0.0
+        self.heading: Optional[float] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def average_speed(self) -> float:
+        """Average speed in knots since the first fix."""
+        if not self.count:
+            return 0.0
+        hours = (self.last_time_ms - self.first_time_ms) / 3600000.0
+        return self.distance / hours if hours > 0 else 0.0
+
+    def _record(self, speed: float, time_diff: float, time_ms: int) -> float:
+        """Return the speed to use for a segment, recording it if it is implausible."""
+        if time_diff <= 0:
+            if self.diagnostics is not None:
+                self.diagnostics.record(NON_POSITIVE_TIME_STEP, time=from_epoch_ms(time_ms), dt=time_diff)
+            return 0.0
+        if speed > self.max_speed:
+            if self.diagnostics is not None:
+                self.diagnostics.record(SPEED_OUTLIER, speed / self.max_speed if self.max_speed > 0 else None,
+                                        time=from_epoch_ms(time_ms), speed=round(speed, 2), dt=time_diff)
+            return 0.0
+        return speed
+
+    def add(self, lat: float, lon: float, time_ms: int) -> None:
+        """Add one fix; the new values are in ``speed``, ``distance``, ``average_speed`` and ``heading``."""
+        if self.count:
+            step = gpxpy.geo.haversine_distance(self.last_lat, self.last_lon, lat, lon)
+            time_diff = (time_ms - self.last_time_ms) / 1000
+            speed = step / time_diff * MS_TO_KNOTS if time_diff > 0 else 0.0
+            self.speed = self._record(speed, time_diff, self.last_time_ms)
+            self.top_speed = max(self.top_speed, self.speed)
+            self.distance += step / METRES_PER_NM
+            if step > 0:
+                self.heading = _bearing(self.last_lat, self.last_lon, lat, lon)
+        else:
+            self.first_time_ms = int(time_ms)
+        self.count += 1
+        self.last_lat, self.last_lon, self.last_time_ms = float(lat), float(lon), int(time_ms)
+
+    def extend(self, lat, lon, times_ms) -> Kinematics:
+        """Add a batch of fixes with NumPy and return their :class:`Kinematics` columns.
+
+        Equivalent to calling :meth:`add` for every fix, in O(len(batch)).
+        """
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        times_ms = np.asarray(times_ms, dtype=np.int64)
+        n = len(lat)
+        if not n:
+            return Kinematics(*(np.zeros(0) for _ in Kinematics._fields))
+        starting = not self.count
+        if starting:
+            # the first fix of a track ends a segment of length 0 from itself
+            self.first_time_ms = int(times_ms[0])
+            lat_all, lon_all, times_all = (np.concatenate((v[:1], v)) for v in (lat, lon, times_ms))
+        else:
+            lat_all = np.concatenate(([self.last_lat], lat))
+            lon_all = np.concatenate(([self.last_lon], lon))
+            times_all = np.concatenate(([self.last_time_ms], times_ms))
+
+        steps = haversine_distances(lat_all, lon_all)
+        time_diff = np.diff(times_all) / 1000
+        speeds = np.zeros(n)
+        moving = time_diff > 0
+        speeds[moving] = steps[moving] / time_diff[moving] * MS_TO_KNOTS
+        bad = ~moving | (speeds > self.max_speed)
+        bad[0] &= not starting
+        for i in np.flatnonzero(bad):
+            speeds[i] = self._record(speeds[i], time_diff[i], int(times_all[i]))
+
+        distances = self.distance + np.cumsum(steps / METRES_PER_NM)
+        hours = (times_ms - self.first_time_ms) / 3600000.0
+        avg_speeds = np.divide(distances, hours, out=np.zeros(n), where=hours > 0)
+        # carry the heading of the last segment that moved over the fixes that did not
+        bearings = _bearings(lat_all[:-1], lon_all[:-1], lat_all[1:], lon_all[1:])
+        last_moved = np.maximum.accumulate(np.where(steps > 0, np.arange(n), -1))
+        initial = np.nan if self.heading is None else self.heading
+        headings = np.where(last_moved >= 0, bearings[np.maximum(last_moved, 0)], initial)
+
+        self.count += n
+        self.last_lat, self.last_lon, self.last_time_ms = float(lat[-1]), float(lon[-1]), int(times_ms[-1])
+        self.distance = float(distances[-1])
+        self.speed = float(speeds[-1])
+        self.top_speed = max(self.top_speed, float(speeds.max()))
+        self.heading = None if np.isnan(headings[-1]) else float(headings[-1])
+        return Kinematics(speeds, distances, avg_speeds, headings)
+
+    def to_dict(self) -> dict:
+        """Return the state as JSON-serializable data; :meth:`from_dict` resumes from it.
+
+        The diagnostics are not part of the state.
+        """
+        state = {name: getattr(self, name) for name in self._STATE}
+        if math.isinf(self.max_speed):
+            state['max_speed'] = None
+        return state
+
+    @classmethod
+    def from_dict(cls, state: dict, diagnostics: Optional[TrackDiagnostics] = None) -> 'TrackAccumulator':
+        max_speed = state.get('max_speed')
+        accumulator = cls(math.inf if max_speed is None else max_speed, diagnostics)
+        for name in cls._STATE[1:]:
+            setattr(accumulator, name, state[name])
+        return accumulator
@@ -0,0 +1,630 @@
+"""Live tracking: tail growing GPX or NMEA logs and push new fixes to browsers.
+
+A :class:`LiveTracker` polls a set of sources -- GPX files that are still
+being written, NMEA logs or FIFOs, NMEA over TCP -- and parses only the bytes
+that arrived since the last poll. Every new fix updates the kinematics of its
+:class:`LiveTrack` in constant time. :class:`LiveServer` serves the usual
+playback map (see :func:`gpx_player.openseamap.add_playback_controls`) and
+streams the new fixes to it as Server-Sent Events, so the page follows the
+boats as they sail. ``python -m gpx_player.replay`` writes finished GPX files
+into such logs at an accelerated pace, for testing without a boat.
+
+Run it with ``python -m gpx_player.live LOG [LOG ...]``; a log ending in
+``.gpx`` is read as GPX, ``tcp://HOST:PORT`` is an NMEA stream, and anything
+else is a file or FIFO of NMEA sentences.
+"""
+import argparse
+import datetime as dt
+import json
+import logging
+import os
+import re
+import socket
+import stat
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from lxml import etree as ET
+
+from gpx_player.diagnostics import NON_POSITIVE_TIME_STEP, DataQualityReport, TrackDiagnostics
+from gpx_player.gpx_utils import parse_point_time
+from gpx_player.kinematics import TrackAccumulator
+from gpx_player.openseamap import _TAIL_LENGTH_PRESETS, add_playback_controls, base_map
+from gpx_player.utils import from_epoch_ms
+
+logger = logging.getLogger(__name__)
+
+_READ_SIZE = 65536
+# an idle event stream sends a comment this often, so proxies and browsers keep it open
+_KEEPALIVE_SECONDS = 15.0
+_TRKPT_START_RE = re.compile(rb'<(?:[\w.-]+:)?trkpt[\s/>]')
+_TRKPT_END_RE = re.compile(rb'</(?:[\w.-]+:)?trkpt\s*>')
+
+
+class Fix(NamedTuple):
+    """One position report: degrees and epoch milliseconds."""
+    lat: float
+    lon: float
+    time_ms: int
+
+
+class _TailReader:
+    """Read the bytes appended to a file, or written to a FIFO, since the last read.
+
+    The file is opened non-blocking, so a FIFO without a writer does not
+    block the poll loop. A regular file that shrinks or is replaced by a new
+    file under the same path is read again from the start.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._fd = None
+        self._identity = None
+        self._offset = 0
+
+    def read(self) -> Tuple[bytes, bool]:
+        """Return the new bytes, and whether reading started over from the beginning."""
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            return b'', False
+        restarted = False
+        if self._fd is not None:
+            replaced = (info.st_dev, info.st_ino) != self._identity
+            truncated = stat.S_ISREG(info.st_mode) and info.st_size < self._offset
+            if replaced or truncated:
+                self.close()
+                restarted = True
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDONLY | getattr(os, 'O_NONBLOCK', 0))
+            self._identity = (info.st_dev, info.st_ino)
+            self._offset = 0
+        chunks = []
+        while True:
+            try:
+                chunk = os.read(self._fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self._offset += len(chunk)
+        return b''.join(chunks), restarted
+
+    def seek(self, offset: int) -> None:
+        """Continue reading at ``offset``; raises ``OSError`` for a FIFO."""
+        os.lseek(self._fd, offset, os.SEEK_SET)
+        self._offset = offset
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class GpxSource:
+    """Fixes from a GPX file that is still being written.
+
+    The appended bytes are fed to an incremental ``lxml`` pull parser that
+    reports each ``<trkpt>`` once it is complete; parsed points are removed
+    from the tree again, so memory does not grow with the log.
+
+    Many loggers keep the file well-formed by writing the closing tags after
+    every fix and overwriting them with the next one. When the new bytes do
+    not continue the document, the file is therefore parsed again from the
+    end of the last complete ``<trkpt>``, after the opening tags of the file.
+    """
+
+    def __init__(self, path, name: Optional[str] = None):
+        self.name = name or Path(path).stem
+        self._reader = _TailReader(path)
+        self._parser = self._new_parser()
+        self._checkpoint = 0  # file offset just after the last complete </trkpt>
+        self._pending = b''  # the bytes read after it
+
+    @staticmethod
+    def _new_parser():
+        return ET.XMLPullParser(events=('end',), tag='{*}trkpt')
+
+    def read(self) -> List[Fix]:
+        data, restarted = self._reader.read()
+        if restarted:
+            self._parser = self._new_parser()
+            self._checkpoint, self._pending = 0, b''
+        if not data or self._parser is None:
+            return []
+        fixes = []
+        try:
+            self._feed(data, fixes)
+        except (ET.XMLSyntaxError, TypeError, ValueError) as exc:
+            try:
+                self._resume(fixes)
+            except (ET.XMLSyntaxError, TypeError, ValueError, OSError):
+                # the rest of the document cannot be parsed either; wait for the file to be replaced
+                logger.warning("Stopped reading %s: %s", self._reader.path, exc)
+                self._parser = None
+        return fixes
+
+    def _feed(self, data: bytes, fixes: List[Fix]) -> None:
+        """Parse ``data``; add its fixes to ``fixes`` only if all of it parses."""
+        self._parser.feed(data)
+        new_fixes = []
+        for _event, node in self._parser.read_events():
+            time_elem = node.find('{*}time')
+            if time_elem is not None and time_elem.text:
+                time_ms = round(parse_point_time(time_elem.text).timestamp() * 1000)
+                new_fixes.append(Fix(float(node.get('lat')), float(node.get('lon')), time_ms))
+            node.clear()
+            while node.getprevious() is not None:
+                del node.getparent()[0]
+        fixes.extend(new_fixes)
+        self._pending += data
+        last_end = None
+        for last_end in _TRKPT_END_RE.finditer(self._pending):
+            pass
+        if last_end is not None:
+            self._checkpoint += last_end.end()
+            self._pending = self._pending[last_end.end():]
+
+    def _resume(self, fixes: List[Fix]) -> None:
+        """Parse the file again from the checkpoint, e.g. after the closing tags were overwritten."""
+        self._parser = self._new_parser()
+        self._pending = b''
+        if self._checkpoint:
+            self._parser.feed(self._read_head())
+        self._reader.seek(self._checkpoint)
+        data, _restarted = self._reader.read()
+        self._feed(data, fixes)
+
+    def _read_head(self) -> bytes:
+        """Return the bytes of the file before its first ``<trkpt>``."""
+        head = b''
+        with open(self._reader.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_READ_SIZE), b''):
+                head += chunk
+                match = _TRKPT_START_RE.search(head)
+                if match:
+                    return head[:match.start()]
+        raise ValueError("no <trkpt> before the last complete one")
+
+    def close(self) -> None:
+        self._reader.close()
+
+
+def nmea_checksum(body: str) -> int:
+    """XOR of the characters of an NMEA sentence between ``$`` and ``*``."""
+    checksum = 0
+    for char in body:
+        checksum ^= ord(char)
+    return checksum
+
+
+def parse_nmea_rmc(line: str) -> Optional[Fix]:
+    """Return the fix of an NMEA RMC sentence (``$GPRMC``, ``$GNRMC``, ...), or ``None``.
+
+    Other sentences, void fixes and sentences with a wrong checksum give
+    ``None``. Two-digit years are taken as 2000-2099.
+    """
+    line = line.strip()
+    if not line.startswith('$'):
+        return None
+    body, _, checksum = line[1:].partition('*')
+    if checksum:
+        try:
+            if int(checksum[:2], 16) != nmea_checksum(body):
+                return None
+        except ValueError:
+            return None
+    fields = body.split(',')
+    if len(fields) < 10 or not fields[0].endswith('RMC') or fields[2] != 'A':
+        return None
+    clock, date, lat_text, lon_text = fields[1], fields[9], fields[3], fields[5]
+    try:
+        lat = int(lat_text[:2]) + float(lat_text[2:]) / 60
+        lon = int(lon_text[:3]) + float(lon_text[3:]) / 60
+        day, month, year = int(date[0:2]), int(date[2:4]), 2000 + int(date[4:6])
+        stamp = dt.datetime(year, month, day, int(clock[0:2]), int(clock[2:4]), tzinfo=dt.timezone.utc)
+        seconds = float(clock[4:])
+    except (ValueError, IndexError):
+        return None
+    if fields[4] == 'S':
+        lat = -lat
+    if fields[6] == 'W':
+        lon = -lon
+    return Fix(lat, lon, round((stamp.timestamp() + seconds) * 1000))
+
+
+class _SocketReader:
+    """Read what arrived on a TCP connection since the last call, without blocking.
+
+    The connection is (re-)established on the next :meth:`read` after it
+    drops; the read that connects reports a restart, like
+    :meth:`_TailReader.read` for a replaced file.
+    """
+
+    def __init__(self, host: str, port: int, connect_timeout: float = 1.0):
+        self._address = (host, port)
+        self._connect_timeout = connect_timeout
+        self._socket = None
+
+    def read(self) -> Tuple[bytes, bool]:
+        restarted = False
+        if self._socket is None:
+            try:
+                self._socket = socket.create_connection(self._address, timeout=self._connect_timeout)
+            except OSError:
+                return b'', False
+            self._socket.setblocking(False)
+            restarted = True
+        chunks = []
+        while True:
+            try:
+                chunk = self._socket.recv(_READ_SIZE)
+            except BlockingIOError:
+                break
+            except OSError:
+                chunk = b''
+            if not chunk:
+                self.close()
+                break
+            chunks.append(chunk)
+        return b''.join(chunks), restarted
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class _NmeaSource:
+    """Split the bytes of ``reader`` into sentences and parse the RMC fixes.
+
+    ``reader`` has the ``read()`` and ``close()`` of :class:`_TailReader`.
+    """
+
+    def __init__(self, reader, name: str):
+        self.name = name
+        self._reader = reader
+        self._pending = b''
+
+    def read(self) -> List[Fix]:
+        data, restarted = self._reader.read()
+        if restarted:
+            self._pending = b''
+        lines = (self._pending + data).split(b'\n')
+        # the last piece is an incomplete sentence, or empty
+        self._pending = lines.pop()
+        fixes = (parse_nmea_rmc(line.decode('ascii', 'replace')) for line in lines)
+        return [fix for fix in fixes if fix is not None]
+
+    def close(self) -> None:
+        self._reader.close()
+
+
+class NmeaFileSource(_NmeaSource):
+    """RMC fixes from an NMEA log file that is still being written, or from a FIFO."""
+
+    def __init__(self, path, name: Optional[str] = None):
+        super().__init__(_TailReader(path), name or Path(path).stem)
+
+
+class NmeaSocketSource(_NmeaSource):
+    """RMC fixes from an NMEA stream over TCP; the connection is re-established when it drops."""
+
+    def __init__(self, host: str, port: int, name: Optional[str] = None, connect_timeout: float = 1.0):
+        super().__init__(_SocketReader(host, port, connect_timeout), name or f"{host}:{port}")
+
+
+def make_source(spec: str, name: Optional[str] = None):
+    """Return the source for ``spec``: ``tcp://HOST:PORT``, a ``.gpx`` file, or an NMEA file/FIFO."""
+    if spec.startswith('tcp://'):
+        address = urlsplit(spec)
+        if not address.hostname or not address.port:
+            raise ValueError(f"expected tcp://HOST:PORT, got {spec!r}")
+        return NmeaSocketSource(address.hostname, address.port, name)
+    if spec.lower().endswith('.gpx'):
+        return GpxSource(spec, name)
+    return NmeaFileSource(spec, name)
+
+
+class LiveTrack:
+    """The fixes of one boat with the same kinematic columns as a :func:`create_map` track.
+
+    :meth:`add` updates the point speed, cumulative distance (nm) and
+    average speed since the first fix in O(1) with a
+    :class:`~gpx_player.kinematics.TrackAccumulator`, so the columns match
+    :func:`gpx_player.openseamap.create_map`. Fixes that are not later than
+    the last one are rejected, so the track stays sorted by time.
+    """
+
+    def __init__(self, name: str, max_speed: float, diagnostics: Optional[TrackDiagnostics] = None):
+        self.name = name
+        self.max_speed = max_speed
+        self.diagnostics = diagnostics if diagnostics is not None else TrackDiagnostics(name)
+        self.kinematics = TrackAccumulator(max_speed, self.diagnostics)
+        self.lat: List[float] = []
+        self.lon: List[float] = []
+        self.times_ms: List[int] = []
+        self.point_speeds: List[float] = []
+        self.distances: List[float] = []
+        self.avg_speeds: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.times_ms)
+
+    def add(self, fix: Fix) -> bool:
+        """Append ``fix`` and return ``True``, or return ``False`` if it is not later than the last fix."""
+        kinematics = self.kinematics
+        if kinematics.count and fix.time_ms <= kinematics.last_time_ms:
+            self.diagnostics.record(NON_POSITIVE_TIME_STEP, time=from_epoch_ms(fix.time_ms),
+                                    dt=(fix.time_ms - kinematics.last_time_ms) / 1000)
+            return False
+        kinematics.add(fix.lat, fix.lon, fix.time_ms)
+        self.lat.append(fix.lat)
+        self.lon.append(fix.lon)
+        self.times_ms.append(fix.time_ms)
+        self.point_speeds.append(kinematics.speed)
+        self.distances.append(kinematics.distance)
+        self.avg_speeds.append(kinematics.average_speed)
+        return True
+
+
+class LiveTracker:
+    """Poll a set of sources and keep one :class:`LiveTrack` per source.
+
+    Every accepted fix is appended to a log; its length is the sequence
+    number that clients pass to :meth:`deltas` to get what they have not
+    seen yet. All methods are thread-safe.
+    """
+
+    def __init__(self, sources: Sequence, names: Optional[Sequence[str]] = None, max_speed: float = 12.0,
+                 diagnostics: Optional[DataQualityReport] = None):
+        self.sources = list(sources)
+        self.max_speed = max_speed
+        self.diagnostics = diagnostics if diagnostics is not None else DataQualityReport()
+        self.tracks = []
+        for index, source in enumerate(self.sources):
+            name = names[index] if names and index < len(names) else source.name
+            self.tracks.append(LiveTrack(name, max_speed, self.diagnostics.track(name)))
+        self._log: List[Tuple[int, int]] = []
+        self._changed = threading.Condition()
+
+    @property
+    def sequence(self) -> int:
+        with self._changed:
+            return len(self._log)
+
+    def poll(self) -> int:
+        """Read all sources once and return the number of new fixes."""
+        added = 0
+        for track_id, source in enumerate(self.sources):
+            try:
+                fixes = source.read()
+            except OSError as exc:
+                logger.warning("Cannot read %s: %s", source.name, exc)
+                continue
+            if not fixes:
+                continue
+            track = self.tracks[track_id]
+            with self._changed:
+                for fix in fixes:
+                    if track.add(fix):
+                        self._log.append((track_id, len(track) - 1))
+                        added += 1
+                if added:
+                    self._changed.notify_all()
+        return added
+
+    def run(self, interval: float, stop: threading.Event) -> None:
+        """Poll every ``interval`` seconds until ``stop`` is set."""
+        while not stop.is_set():
+            self.poll()
+            stop.wait(interval)
+
+    def deltas(self, since: int, timeout: Optional[float] = None) -> Tuple[int, List[dict]]:
+        """Return the current sequence number and the fixes added after sequence number ``since``.
+
+        Waits up to ``timeout`` seconds for new fixes if there are none. The
+        fixes are grouped per track, as the playback script's columns:
+        ``{'track', 'points', 'speeds', 'distances', 'avgSpeeds'}``.
+        """
+        with self._changed:
+            if len(self._log) <= since and timeout:
+                self._changed.wait_for(lambda: len(self._log) > since, timeout)
+            sequence = len(self._log)
+            first: Dict[int, int] = {}
+            for track_id, index in self._log[since:]:
+                first.setdefault(track_id, index)
+            payloads = []
+            for track_id, start in first.items():
+                track = self.tracks[track_id]
+                payloads.append({
+                    'track': track_id,
+                    'points': [{'lat': lat, 'lon': lon, 'time': time_ms}
+                               for lat, lon, time_ms in zip(track.lat[start:], track.lon[start:],
+                                                            track.times_ms[start:])],
+                    'speeds': track.point_speeds[start:],
+                    'distances': track.distances[start:],
+                    'avgSpeeds': track.avg_speeds[start:],
+                })
+        return sequence, payloads
+
+    def snapshot(self) -> Tuple[int, List[dict]]:
+        """Return the current sequence number and the tracks with fixes, as :func:`create_map` tracks."""
+        with self._changed:
+            tracks = []
+            for track_id, track in enumerate(self.tracks):
+                if not len(track):
+                    continue
+                tracks.append({
+                    'name': track.name,
+                    'display_name': track.name,
+                    'live_id': track_id,
+                    'points': [{'lat': lat, 'lon': lon, 'time': from_epoch_ms(time_ms)}
+                               for lat, lon, time_ms in zip(track.lat, track.lon, track.times_ms)],
+                    'times_ms': list(track.times_ms),
+                    'point_speeds': list(track.point_speeds),
+                    'distances': list(track.distances),
+                    'avg_speeds': list(track.avg_speeds),
+                })
+            return len(self._log), tracks
+
+    def close(self) -> None:
+        for source in self.sources:
+            source.close()
+
+
+_WAITING_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><meta http-equiv="refresh" content="2"><title>{title}</title></head>
+<body><p>Waiting for the first fixes&hellip;</p></body></html>
+"""
+
+
+class _LiveRequestHandler(BaseHTTPRequestHandler):
+    server: 'LiveServer'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/':
+            self._send_page()
+        elif url.path == '/events':
+            self._send_events(url.query)
+        else:
+            self.send_error(404)
+
+    def _send(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_page(self) -> None:
+        self._send(self.server.render_page().encode('utf-8'), 'text/html; charset=utf-8')
+
+    def _send_events(self, query: str) -> None:
+        # a reconnecting EventSource sends the id of the last event it received
+        since = self.headers.get('Last-Event-ID') or parse_qs(query).get('since', ['0'])[0]
+        try:
+            since = int(since)
+        except ValueError:
+            self.send_error(400, "since must be an integer")
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        tracker = self.server.tracker
+        try:
+            if since > tracker.sequence:
+                # the server restarted since the page was loaded
+                self.wfile.write(b"event: reload\ndata: {}\n\n")
+                self.wfile.flush()
+                return
+            while not self.server.stopping.is_set():
+                since, payloads = tracker.deltas(since, timeout=self.server.keepalive)
+                if payloads:
+                    data = json.dumps(payloads, separators=(',', ':'))
+                    self.wfile.write(f"id: {since}\nevent: fixes\ndata: {data}\n\n".encode('utf-8'))
+                else:
+                    self.wfile.write(b": keepalive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class LiveServer(ThreadingHTTPServer):
+    """HTTP server for the live map of a :class:`LiveTracker`.
+
+    ``GET /`` renders the playback map of all fixes so far, and ``GET
+    /events?since=N`` is the Server-Sent Events stream of the fixes after
+    sequence number ``N``, one ``fixes`` event per batch.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, tracker: LiveTracker, *, title: Optional[str] = None,
+                 tail_length: str = "normal", keepalive: float = _KEEPALIVE_SECONDS):
+        super().__init__(address, _LiveRequestHandler)
+        self.tracker = tracker
+        self.title = title
+        self.tail_length = tail_length
+        self.keepalive = keepalive
+        self.stopping = threading.Event()
+
+    def render_page(self) -> str:
+        sequence, tracks = self.tracker.snapshot()
+        title = self.title or "GPX Player live"
+        if not tracks:
+            return _WAITING_PAGE.format(title=title)
+        folium_map = base_map()
+        latitudes = [p['lat'] for track in tracks for p in track['points']]
+        longitudes = [p['lon'] for track in tracks for p in track['points']]
+        folium_map.fit_bounds([[min(latitudes), min(longitudes)], [max(latitudes), max(longitudes)]])
+        add_playback_controls(
+            folium_map,
+            tracks,
+            max_speed=self.tracker.max_speed,
+            map_id=folium_map.get_name(),
+            title=title,
+            tail_length=self.tail_length,
+            live_url=f"/events?since={sequence}",
+        )
+        return folium_map.get_root().render()
+
+    def shutdown(self) -> None:
+        self.stopping.set()
+        super().shutdown()
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a live map of growing GPX/NMEA logs.")
+    parser.add_argument('sources', nargs='+', metavar='LOG',
+                        help='GPX file, NMEA file or FIFO, or tcp://HOST:PORT for an NMEA stream')
+    parser.add_argument('--names', '-n', nargs='+', help='Names of the participants')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on (default: 8000)')
+    parser.add_argument('--interval', type=float, default=0.5, metavar='SECONDS',
+                        help='How often the logs are polled for new fixes (default: 0.5)')
+    parser.add_argument('--max-speed', '-ms', type=float, default=12, help='Maximum speed in knots (default: 12)')
+    parser.add_argument('--title', '-t', help='The title of the page')
+    parser.add_argument('--tail-length', choices=tuple(_TAIL_LENGTH_PRESETS), default='normal',
+                        help='Tail length preset for the playback: short, normal, or long (default: normal)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+    try:
+        sources = [make_source(spec) for spec in args.sources]
+    except ValueError as exc:
+        sys.exit(str(exc))
+    tracker = LiveTracker(sources, args.names, args.max_speed)
+    server = LiveServer((args.host, args.port), tracker, title=args.title, tail_length=args.tail_length)
+    poller = threading.Thread(target=tracker.run, args=(args.interval, server.stopping), daemon=True)
+    poller.start()
+    host, port = server.server_address[:2]
+    print(f"Live map on http://{host}:{port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stopping.set()
+        server.server_close()
+        poller.join()
+        tracker.close()
+        tracker.diagnostics.log()
+
+
+if __name__ == "__main__":
+    main()
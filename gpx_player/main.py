@@ -1,18 +1,37 @@
 import argparse
 import datetime as dt
+import logging
 import os.path as op
+import sys
 from math import atan2, degrees
 
 import gpxpy
 import matplotlib.animation as animation
 import matplotlib.pyplot as plt
+import numpy as np
 import pytz
+from matplotlib.collections import LineCollection
 from matplotlib.ticker import FuncFormatter, MultipleLocator
 
-from gpx_player.utils import format_func, gen_arrow_head_marker, km_to_nm, slug, timedelta_to_hms
+from gpx_player.diagnostics import SPIKES_REMOVED, TIMESTAMPS_REPAIRED, DataQualityReport
+from gpx_player.filters import median_smooth, parse_median_window, reject_spikes
+from gpx_player.gpx_utils import REPAIR_BACKWARD_POLICIES, repair_timestamps, time_window
+from gpx_player.basemap import add_basemap
+from gpx_player.resample import resample_times, uniform_clock
+from gpx_player.timeline import merge_timeline
+from gpx_player.render import (ContactSheetSink, FanOutFrameSink, StaticBackgroundRenderer, open_frame_sink,
+                               parse_output_spec, render_animation)
+from gpx_player.utils import (cached_arrow_head_marker, epoch_ms, format_func, from_epoch_ms, haversine_distances,
+                              km_to_nm, segment_speeds, slug, timedelta_to_hms)
 
 base_path = '.'
 
+
+def fps_for(path):
+    # GIFs play at 1000/interval fps, as `ani.save` did; MP4 at 10 fps as below
+    return 1000 / 25 if path.lower().endswith('.gif') else 10
+
+
 # Define argument parser
 parser = argparse.ArgumentParser()
 parser.add_argument('files', nargs='+', help='GPX files to process')
@@ -25,33 +44,136 @@ parser.add_argument('--names', '-n', nargs='+', help='Names of the participants'
 parser.add_argument('--marks', '-m', help='The file with the static marks to put onto the map. One pair of coordinates per line')
 parser.add_argument('--gif', '-g', action='store_true', help='Save as GIF moving picture instead of MP4')
 parser.add_argument('--timezone', '-tz', default='Europe/Berlin', help='Timezone to use for processing timestamps')
+parser.add_argument('--arrow-resolution', type=float, default=2.0,
+                    help='Angular step in degrees used to quantize the boat arrow markers (default: 2)')
+parser.add_argument('--basemap', '-b', help='Offline raster basemap to draw under the tracks (MBTiles file)')
+parser.add_argument('--cache-background', action='store_true',
+                    help='Rasterize static content once and only redraw moving artists per frame '
+                         '(always on with --basemap)')
+parser.add_argument('--speed-colors', action='store_true', help='Colour the tracks by speed, as in map mode')
+parser.add_argument('--max-speed', '-ms', type=float, default=12,
+                    help='Maximum plausible speed in knots, used to remove position spikes and with --speed-colors '
+                         '(default: 12)')
+parser.add_argument('--preview', '-p', action='store_true',
+                    help='Quick draft: low DPI, every Nth frame, no antialiasing; saved as <title>-preview')
+parser.add_argument('--preview-step', type=int, default=10, help='Render every Nth frame in preview mode (default: 10)')
+parser.add_argument('--preview-dpi', type=float, default=50, help='Resolution of the preview (default: 50)')
+parser.add_argument('--contact-sheet', type=int, metavar='N',
+                    help='Write a PNG contact sheet of N evenly spaced frames instead of a video')
+parser.add_argument('--output', '-o', action='append', type=parse_output_spec, metavar='FILE[:WxH]',
+                    help='Output file with an optional size, e.g. race.mp4:1920x1080; repeat it to write '
+                         'several videos/GIFs from one rendering pass')
+parser.add_argument('--repair-timestamps', choices=REPAIR_BACKWARD_POLICIES,
+                    help='Repair duplicate and out-of-order timestamps: sort the fixes by time, '
+                         'or drop or flag fixes that jump back in time')
+parser.add_argument('--average-duplicates', action='store_true',
+                    help='With --repair-timestamps, merge fixes with the same time into their mean position '
+                         'instead of keeping the first one')
+parser.add_argument('--no-spike-filter', dest='spike_filter', action='store_false',
+                    help='Keep isolated position spikes (fixes implying more than --max-speed) in the tracks')
+parser.add_argument('--max-acceleration', type=float,
+                    help='Also remove fixes that imply more than this acceleration in m/s² (e.g. 3)')
+parser.add_argument('--median-window', type=parse_median_window, default=0, metavar='N',
+                    help='Smooth the positions with a running median over N fixes (odd, e.g. 5)')
+parser.add_argument('--resample', type=float, metavar='SECONDS',
+                    help='Interpolate all tracks onto one clock with this step, so that every frame shows all boats '
+                         'at the same instant (e.g. 1)')
+parser.add_argument('--max-gap', type=float, default=60, metavar='SECONDS',
+                    help='With --resample, do not interpolate across gaps between fixes longer than this '
+                         '(default: 60)')
 args = parser.parse_args()
+logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
 local_tz = pytz.timezone(args.timezone)
 
-start_time = args.start.astimezone(local_tz) if args.start else None
-end_time = args.end.astimezone(local_tz) if args.end else None
-race_start = args.race_start.astimezone(local_tz) if args.race_start else None
+if args.preview:
+    plt.rcParams.update({
+        'figure.dpi': args.preview_dpi,
+        'lines.antialiased': False,
+        'patch.antialiased': False,
+        'text.antialiased': False,
+    })
+
+# times are int64 milliseconds since the epoch; they become local datetimes only for display
+start_time = int(epoch_ms([args.start])[0]) if args.start else None
+end_time = int(epoch_ms([args.end])[0]) if args.end else None
+race_start = int(epoch_ms([args.race_start])[0]) if args.race_start else None
 
 tracks = []
 points_list = []
+data_quality = DataQualityReport()
 
 # Parse the GPX files
 for filename in args.files:
     with open(op.join(base_path, filename), 'r') as gpx_file:
         gpx = gpxpy.parse(gpx_file)
-    # all timestamps show the local time from this point on:
-    points = [(point.latitude, point.longitude, point.time.astimezone(local_tz)) for track in gpx.tracks for segment in track.segments for
-              point in segment.points]
-    if start_time:
-        points = [(lat, lon, time) for (lat, lon, time) in points if time >= start_time]
-    if end_time:
-        points = [(lat, lon, time) for (lat, lon, time) in points if time <= end_time]
-    points_list.append(points)
+    gpx_points = [point for track in gpx.tracks for segment in track.segments for point in segment.points]
+    point_lats = np.array([point.latitude for point in gpx_points], dtype=float)
+    point_lons = np.array([point.longitude for point in gpx_points], dtype=float)
+    point_times = epoch_ms(point.time for point in gpx_points)
+    if args.repair_timestamps:
+        repair = repair_timestamps(point_times / 1000, args.repair_timestamps)
+        if repair.changed:
+            point_lats = repair.apply(point_lats, args.average_duplicates)
+            point_lons = repair.apply(point_lons, args.average_duplicates)
+            point_times = repair.apply(point_times)
+            data_quality.track(filename).record(TIMESTAMPS_REPAIRED, summary=str(repair))
+    if args.spike_filter or args.median_window >= 3:
+        keep = reject_spikes(point_lats, point_lons, point_times / 1000,
+                             args.max_speed, args.max_acceleration, passes=2 if args.spike_filter else 0)
+        if len(keep) < len(point_times):
+            data_quality.track(filename).record(SPIKES_REMOVED, count=len(point_times) - len(keep))
+        point_lats = median_smooth(point_lats[keep], args.median_window)
+        point_lons = median_smooth(point_lons[keep], args.median_window)
+        point_times = point_times[keep]
+    if start_time or end_time:
+        if np.all(np.diff(point_times) >= 0):
+            window = time_window(point_times, start_time, end_time)
+        else:
+            window = ((start_time is None or point_times >= start_time)
+                      & (end_time is None or point_times <= end_time))
+        point_lats, point_lons, point_times = point_lats[window], point_lons[window], point_times[window]
+    points_list.append(list(zip(point_lats.tolist(), point_lons.tolist(), point_times.tolist())))
+data_quality.log()
+
+if args.resample:
+    # every track gets a point at each tick of one clock, so the timeline has duration / step frames
+    seconds_list = [np.array([time for (_lat, _lon, time) in points], dtype=np.int64) / 1000 for points in points_list]
+    clock = uniform_clock(seconds_list, args.resample)
+    resampled_list = []
+    for points, seconds in zip(points_list, seconds_list):
+        sampling = resample_times(seconds, clock, args.max_gap)
+        resampled_lats = sampling.interpolate([point[0] for point in points]).tolist()
+        resampled_lons = sampling.interpolate_longitude([point[1] for point in points]).tolist()
+        resampled_times = np.round(sampling.seconds * 1000).astype(np.int64).tolist()
+        resampled_list.append(list(zip(resampled_lats, resampled_lons, resampled_times)))
+    points_list = resampled_list
+
+# a track without points (e.g. none in the time window) cannot be drawn
+kept = [i for i, points in enumerate(points_list) if points]
+for i in sorted(set(range(len(points_list))) - set(kept)):
+    logging.warning("No points left in %s; leaving it out", args.files[i])
+points_list = [points_list[i] for i in kept]
+args.files = [args.files[i] for i in kept]
+if args.names:
+    args.names = [args.names[i] for i in kept if i < len(args.names)]
+if not points_list:
+    sys.exit("No points to play.")
+
+# Coordinate columns, so that the drawn tracks can be updated by slicing
+lons = [np.array([point[1] for point in points]) for points in points_list]
+lats = [np.array([point[0] for point in points]) for points in points_list]
 
 title = args.title if args.title else ''
 
 # Initialize the figure and axis
-fig, ax = plt.subplots()
+figure_kwargs = {}
+output_sizes = [size for _path, size in args.output or [] if size]
+if output_sizes:
+    # render once at the largest requested size; smaller outputs are scaled down
+    out_width, out_height = max(output_sizes, key=lambda size: size[0] * size[1])
+    figure_width = plt.rcParams['figure.figsize'][0]
+    figure_kwargs = {'figsize': (figure_width, figure_width * out_height / out_width), 'dpi': out_width / figure_width}
+fig, ax = plt.subplots(**figure_kwargs)
 ax.set_title(title)
 # Apply the custom formatter to the x and y axes
 ax.xaxis.set_major_formatter(FuncFormatter(format_func))
@@ -69,15 +191,32 @@ lon_max = max(point[1] for point in [point for points in points_list for point i
 ax.set_xlim(lon_min, lon_max)
 ax.set_ylim(lat_min, lat_max)
 
+if args.basemap:
+    add_basemap(ax, args.basemap)
+
 # Initialize the plot with the first data
 lines = [ax.plot(points[0][1], points[0][0], '-', linewidth='0.8', label=filename)[0]
          for points, filename in zip(points_list, args.files)]
 
-marker, scale = gen_arrow_head_marker(0)
+marker, scale = cached_arrow_head_marker(0, args.arrow_resolution)
 markersize = 10
 heads = [ax.plot(l[0][0], l[0][1], marker=marker, markersize=markersize, color=lines[i].get_color())[0]
             for i, l in enumerate(points_list)]
 
+# Speed-coloured tracks: one LineCollection per boat whose segments and colours
+# are slices of precomputed columns
+tails = None
+if args.speed_colors:
+    seg_speeds = [segment_speeds(lat, lon, np.array([point[2] for point in points]) / 1000, args.max_speed)
+                  for lat, lon, points in zip(lats, lons, points_list)]
+    positive_speeds = np.concatenate([np.zeros(0), *seg_speeds])
+    positive_speeds = positive_speeds[positive_speeds > 0]
+    color_scale = positive_speeds.max() if positive_speeds.size else args.max_speed
+    segments = [np.stack([np.column_stack([lon[:-1], lat[:-1]]), np.column_stack([lon[1:], lat[1:]])], axis=1)
+                for lat, lon in zip(lats, lons)]
+    segment_colors = [plt.cm.RdYlGn(np.minimum(speed / color_scale, 1.0)) for speed in seg_speeds]
+    tails = [ax.add_collection(LineCollection([], linewidths=0.8)) for _ in points_list]
+
 if args.names:
     for i, name in enumerate(args.names):
         lines[i].set_label(name)
@@ -96,33 +235,43 @@ if args.marks:
     for i, (lat, lon) in enumerate(marks, 1):
         ax.plot(float(lon), float(lat), marker='o', markersize=5, color='orange')
 
-# Initialize counters in number of input files
-counters = [0] * len(points_list)
-dist_counter = [0.0] * len(points_list)
-speeds = [0.0] * len(points_list)
-
 ax_dist = [ax.text(0.83, 0.95 - 0.03*i, '', fontsize=7, transform=ax.transAxes) for i in range(len(points_list))]
 ax_speed = [ax.text(0.93, 0.95 - 0.03*i, '', fontsize=7, transform=ax.transAxes) for i in range(len(points_list))]
 
+# Common timeline: all fix times, and for each of them the last fix of every track at or before it
+times_list = [np.array([point[2] for point in points], dtype=np.int64) for points in points_list]
+timeline = merge_timeline(times_list)
+
+# Distance and speed since the (race) start, as columns indexed by the last fix shown.
+# A segment counts if the fix it leads to is at or after the start.
+counted_distances = []  # km up to each fix
+pre_start_counts = []   # fixes before the start, not counting the first fix
+last_counted = []       # last counted fix up to each fix, or 0 if none
+segment_knots = []
+count_from = race_start or start_time
+for lat, lon, times in zip(lats, lons, times_list):
+    segment_km = haversine_distances(lat, lon) / 1000
+    counted = times[1:] >= count_from if count_from else np.zeros(len(segment_km), dtype=bool)
+    counted_distances.append(np.concatenate([[0.0], np.cumsum(np.where(counted, segment_km, 0.0))]))
+    pre_start_counts.append(np.concatenate([[0], np.cumsum(~counted)]))
+    last_counted.append(np.maximum.accumulate(np.concatenate([[0], np.where(counted, np.arange(1, len(times)), 0)])))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        segment_knots.append(km_to_nm(segment_km) / np.diff(times) * 3600000)
+
 # Update function for animation
-def update(current_time, points_list, lines, heads, time_text):
-    # Only advance in points_list if their time is less than or equal to the current time
+def update(frame, points_list, lines, heads, time_text):
+    current_time = timeline.times[frame]
     # iterate over points in each file
-    for idx, (points, counter, line) in enumerate(zip(points_list, counters, lines)):
+    for idx, (points, line) in enumerate(zip(points_list, lines)):
+        # number of points at or before the current time
+        counter = timeline.counts(idx)[frame]
         pre_start_counter = 0
-        while counter < len(points) and points[counter][2] <= current_time:
-            if race_start or start_time:
-                if counter > 0 and points[counter][2] >= (race_start or start_time):
-                    # Calculate the distance between two consecutive points and add it to dist_counter
-                    lat1, lon1, t1 = points[counter-1]
-                    lat2, lon2, t2 = points[counter]
-                    # gpxpy.geo.haversine_distance returns meters
-                    dst = gpxpy.geo.haversine_distance(lat1, lon1, lat2, lon2) / 1000  # in km
-                    dist_counter[idx] += dst
-                    speeds[idx] = km_to_nm(dst)/(t2-t1).total_seconds()*3600
-                elif counter > 0 and points[counter][2] < (race_start or start_time):
-                    pre_start_counter += 1
-            counter += 1
+        distance = speed = 0.0
+        if count_from and counter > 1:
+            distance = counted_distances[idx][counter - 1]
+            pre_start_counter = pre_start_counts[idx][counter - 1]
+            last = last_counted[idx][counter - 1]
+            speed = segment_knots[idx][last - 1] if last else 0.0
         # Update lines
         if race_start:
             try:
@@ -135,7 +284,13 @@ def update(current_time, points_list, lines, heads, time_text):
         else:
             start_counter = 0
 
-        line.set_data([point[1] for point in points[start_counter:counter]], [point[0] for point in points[start_counter:counter]])
+        if tails:
+            # segment `i` joins points `i` and `i+1`
+            end_segment = max(counter - 1, start_counter)
+            tails[idx].set_segments(segments[idx][start_counter:end_segment])
+            tails[idx].set_color(segment_colors[idx][start_counter:end_segment])
+        else:
+            line.set_data(lons[idx][start_counter:counter], lats[idx][start_counter:counter])
         # plot the marker
         heads[idx].set_data([points[counter-1][1]], [points[counter-1][0]])
         # Calculate the marker rotation angle
@@ -143,18 +298,20 @@ def update(current_time, points_list, lines, heads, time_text):
             y1, x1 = points[counter-2][1], points[counter-2][0]
             y2, x2 = points[counter-1][1], points[counter-1][0]
             theta = degrees(atan2(y2 - y1, x2 - x1))
-            marker, scale = gen_arrow_head_marker(90-theta)
-            heads[idx].set_marker(marker)
+            marker, scale = cached_arrow_head_marker(90-theta, args.arrow_resolution)
         except IndexError:
-            heads[idx].set_marker('o')
+            marker = 'o'
+        # markers are shared per angular bucket, so an identity check is enough
+        # to avoid re-deriving the marker transform on every frame
+        if heads[idx].get_marker() is not marker:
+            heads[idx].set_marker(marker)
         # Update distance/speed table
-        ax_dist[idx].set_text(f'{km_to_nm(dist_counter[idx]):.2f} nm')  # Update the displayed distance
-        ax_speed[idx].set_text(f'{speeds[idx]:.1f} kt')  # Update the displayed speed
-        dist_counter[idx] = 0.
+        ax_dist[idx].set_text(f'{km_to_nm(distance):.2f} nm')  # Update the displayed distance
+        ax_speed[idx].set_text(f'{speed:.1f} kt')  # Update the displayed speed
 
         # Update time text
         if race_start:
-            diff_time = current_time - race_start
+            diff_time = dt.timedelta(milliseconds=int(current_time - race_start))
             minutes = diff_time.total_seconds() / 60
             if minutes < 0:
                 time_text.set_text(f"Time to start: {timedelta_to_hms(-diff_time)}")
@@ -164,27 +321,36 @@ def update(current_time, points_list, lines, heads, time_text):
                 time_text.set_color('black')
 
         else:
-            time_text.set_text(f'Time: {points[counter-1][2]:%Y-%m-%d %H:%M:%S}' if counter > 0 else '')
-    return [*lines, *heads, time_text, *ax_dist, *ax_speed]
-
+            time_text.set_text(f'Time: {from_epoch_ms(points[counter-1][2], local_tz):%Y-%m-%d %H:%M:%S}'
+                               if counter > 0 else '')
+    return [*lines, *(tails or []), *heads, time_text, *ax_dist, *ax_speed]
 
-# Get common timeline
-# Flatten the list of points from all tracks
-flat_points = [point for points in points_list
-                      for point in points]
-# Extract timestamps
-timestamps = [point[2] for point in flat_points]
-# Create a sorted set of unique timestamps
-timeline = sorted(set(timestamps))
 
 ax.legend(loc='lower right', fontsize=8)
 
-ani = animation.FuncAnimation(fig, update, frames=timeline, fargs=[points_list, lines, heads, time_text],
+ani = animation.FuncAnimation(fig, update, frames=len(timeline), fargs=[points_list, lines, heads, time_text],
                               interval=25, blit=True)
 
 # # Save the animation as a movie
-if args.gif:
-    ani.save(f"{slug(title or 'untitled')}.gif")
+out_name = slug(title or 'untitled') + ('-preview' if args.preview else '')
+
+if args.gif or args.output or args.contact_sheet or args.preview or args.cache_background or args.basemap:
+    # the artists returned by `update` are the only ones that change between frames
+    dynamic_artists = update(0, points_list, lines, heads, time_text)
+    renderer = StaticBackgroundRenderer(fig, dynamic_artists)
+    frames = range(len(timeline))
+    if args.contact_sheet:
+        frames = np.linspace(0, len(timeline) - 1, args.contact_sheet).round().astype(int)
+        sink = ContactSheetSink(f"{out_name}.png")
+    else:
+        if args.preview:
+            frames = frames[::max(args.preview_step, 1)]
+        if args.output:
+            sink = FanOutFrameSink([(open_frame_sink(path, fps_for(path)), size) for path, size in args.output])
+        else:
+            out_path = f"{out_name}.{'gif' if args.gif else 'mp4'}"
+            sink = open_frame_sink(out_path, fps_for(out_path))
+    render_animation(renderer, update, frames, sink, fargs=[points_list, lines, heads, time_text])
 else:
     ani.save(f"{slug(title or 'untitled')}.mp4", fps=10)
 
@@ -1,7 +1,9 @@
 import argparse
 import datetime as dt
 import json
+import logging
 import re
+import sys
 from html import escape as html_escape
 from importlib import resources
 from typing import List, Optional, Sequence, Tuple
@@ -11,10 +13,19 @@ import gpxpy
 import gpxpy.gpx
 import jinja2
 import matplotlib.pyplot as plt
+import numpy as np
 from jinja2 import Environment, PackageLoader, select_autoescape
 
-from gpx_player.gpx_utils import trim_track
-from gpx_player.utils import track_serializer
+from gpx_player.diagnostics import (
+    EMPTY_WINDOW, NON_POSITIVE_TIME_STEP, SPEED_OUTLIER, SPIKES_REMOVED, TIMESTAMPS_REPAIRED, DataQualityReport,
+    TrackDiagnostics,
+)
+from gpx_player.filters import filter_track, parse_median_window, simplify_indices, stationary_groups
+from gpx_player.gpx_utils import REPAIR_BACKWARD_POLICIES, repair_track, trim_track
+from gpx_player.kinematics import TrackAccumulator
+from gpx_player.resample import resample_times, uniform_clock
+from gpx_player.timeline import merge_timeline
+from gpx_player.utils import epoch_ms, track_serializer
 
 _ASSET_PACKAGE = "gpx_player.assets"
 _TRACK_COLORS = ['red', 'green', 'blue', 'orange', 'purple', 'brown', 'pink', 'yellow', 'cyan', 'magenta']
@@ -113,6 +124,31 @@ def parse_arguments():
                         choices=tuple(_TAIL_LENGTH_PRESETS),
                         default='normal',
                         help='Tail length preset for map playback mode: short, normal, or long (default: normal)')
+    parser.add_argument('--repair-timestamps', choices=REPAIR_BACKWARD_POLICIES,
+                        help='Repair duplicate and out-of-order timestamps: sort the fixes by time, '
+                             'or drop or flag fixes that jump back in time')
+    parser.add_argument('--average-duplicates', action='store_true',
+                        help='With --repair-timestamps, merge fixes with the same time into their mean position '
+                             'instead of keeping the first one')
+    parser.add_argument('--no-spike-filter', dest='spike_filter', action='store_false',
+                        help='Keep isolated position spikes (fixes implying more than --max-speed) in the tracks')
+    parser.add_argument('--max-acceleration', type=float,
+                        help='Also remove fixes that imply more than this acceleration in m/s² (e.g. 3)')
+    parser.add_argument('--median-window', type=parse_median_window, default=0, metavar='N',
+                        help='Smooth the positions with a running median over N fixes (odd, e.g. 5)')
+    parser.add_argument('--simplify', type=float, metavar='METRES',
+                        help='Drop fixes within METRES of the simplified track (Douglas-Peucker, e.g. 2)')
+    parser.add_argument('--lod', type=float, nargs='+', default=(), metavar='METRES',
+                        help='Add coarser copies of the full tracks, simplified with these tolerances, '
+                             'that are shown when zoomed out (e.g. --lod 5 20 100)')
+    parser.add_argument('--stationary-radius', type=float, metavar='METRES',
+                        help='Store runs of fixes that stay within METRES of each other (e.g. at the dock) '
+                             'as one fix with a time range (e.g. 1)')
+    parser.add_argument('--resample', type=float, metavar='SECONDS',
+                        help='Interpolate the playback of all tracks onto one clock with this step (e.g. 1)')
+    parser.add_argument('--max-gap', type=float, default=60, metavar='SECONDS',
+                        help='With --resample, do not interpolate across gaps between fixes longer than this '
+                             '(default: 60)')
     return parser.parse_args()
 
 
@@ -134,27 +170,40 @@ def parse_gpx(file_path: str) -> List[dict]:
     return all_tracks
 
 
-def calculate_speeds(points: List[dict], max_speed: float) -> List[float]:
+def calculate_speeds(
+    points: List[dict], max_speed: float, diagnostics: Optional[TrackDiagnostics] = None,
+    times_ms: Optional[np.ndarray] = None,
+) -> List[float]:
     """
     Calculates the speed of each point in the list of points.
 
     The `max_speed` is used to control the dirty data: if the speed is larger
     than some reasonable value (max_speed), then usually this means zero division,
-    that's we simply nullify the speed.
+    that's we simply nullify the speed. Such segments, and segments with a
+    non-positive time step, are counted in `diagnostics` if given.
+    `times_ms` are the point times as epoch milliseconds (see
+    :func:`gpx_player.utils.epoch_ms`), computed from the points if not given.
     """
+    if times_ms is None:
+        times_ms = epoch_ms(p['time'] for p in points)
+    time_diffs = (np.diff(times_ms) / 1000).tolist()
     speeds = []
     for i in range(1, len(points)):
-        lat1, lon1, time1 = points[i - 1].values()
-        lat2, lon2, time2 = points[i].values()
+        lat1, lon1, time1 = points[i - 1]['lat'], points[i - 1]['lon'], points[i - 1]['time']
+        lat2, lon2 = points[i]['lat'], points[i]['lon']
         distance = gpxpy.geo.haversine_distance(lat1, lon1, lat2, lon2)
-        time_diff = (time2 - time1).total_seconds()
+        time_diff = time_diffs[i - 1]
         if time_diff > 0:
             speed = (distance / time_diff) * 1.94384  # Convert m/s to knots
             if speed > max_speed:
-                print(f"Warning: speed {speed:.2f} exceeds {max_speed} kn at time {time1} (dt = {time_diff:.2f}s)")
+                if diagnostics is not None:
+                    diagnostics.record(SPEED_OUTLIER, speed / max_speed if max_speed > 0 else None,
+                                       time=time1, speed=round(speed, 2), dt=time_diff)
                 speed = 0
             speeds.append(speed)
         else:
+            if diagnostics is not None:
+                diagnostics.record(NON_POSITIVE_TIME_STEP, time=time1, dt=time_diff)
             speeds.append(0)
     return speeds
 
@@ -171,17 +220,18 @@ def accumulate_distances(points: List[dict]) -> List[float]:
     return distances
 
 
-def calculate_average_speeds(points: List[dict], distances: List[float]) -> List[float]:
-    """Return average speed in knots for each point."""
-    avgs = [0.0]
-    start_time = points[0]['time']
-    for i in range(1, len(points)):
-        hours = (points[i]['time'] - start_time).total_seconds() / 3600.0
-        if hours > 0:
-            avgs.append(distances[i] / hours)
-        else:
-            avgs.append(0.0)
-    return avgs
+def calculate_average_speeds(points: List[dict], distances: List[float],
+                             times_ms: Optional[np.ndarray] = None) -> List[float]:
+    """Return average speed in knots for each point.
+
+    `times_ms` are the point times as epoch milliseconds, computed from the
+    points if not given.
+    """
+    if times_ms is None:
+        times_ms = epoch_ms(p['time'] for p in points)
+    hours = (np.asarray(times_ms) - times_ms[0]) / 3600000.0
+    avgs = np.divide(np.asarray(distances, dtype=float), hours, out=np.zeros(len(hours)), where=hours > 0)
+    return [0.0] + avgs[1:].tolist()
 
 
 def speed_to_color(speed: float, max_speed: float) -> str:
@@ -195,6 +245,20 @@ def speed_to_color(speed: float, max_speed: float) -> str:
     )
 
 
+def base_map() -> folium.Map:
+    """Return an empty map with the OpenStreetMap base layer and the OpenSeaMap seamarks."""
+    folium_map = folium.Map(location=[0, 0], zoom_start=12, control_scale=True, attributionControl=False, tiles=None)
+    folium.TileLayer('openstreetmap', control=False).add_to(folium_map)
+    # Add OpenSeaMap layer directly to the map, not to the layer control
+    folium.TileLayer(
+        tiles='https://tiles.openseamap.org/seamark/{z}/{x}/{y}.png',
+        attr='OpenSeaMap',
+        overlay=False,
+        control=False,  # Set control to `False` to exclude from layer control
+    ).add_to(folium_map)
+    return folium_map
+
+
 def create_map(
     gpx_files: List[str],
     names: Optional[List[str]],
@@ -203,30 +267,73 @@ def create_map(
     end_time: Optional[dt.datetime] = None,
     *,
     show_layer_control: bool = True,
+    repair: Optional[str] = None,
+    repair_duplicates: str = "first",
+    diagnostics: Optional[DataQualityReport] = None,
+    spike_filter: bool = True,
+    max_acceleration: Optional[float] = None,
+    median_window: int = 0,
+    simplify_tolerance: Optional[float] = None,
+    lod_tolerances: Sequence[float] = (),
+    stationary_radius: Optional[float] = None,
 ) -> Tuple[folium.Map, List[dict], float, str]:
     """Create an interactive map from GPX files.
 
     When ``start_time`` and/or ``end_time`` are provided, only points within
     ``[start_time, end_time]`` are rendered. Points outside the window are
     excluded from the map, speed calculations, and distance totals.
+
+    With ``repair`` (``"sort"``, ``"drop"`` or ``"flag"``) every track first
+    goes through :func:`gpx_utils.repair_track`, which fixes out-of-order and
+    duplicate timestamps (``repair_duplicates``: ``"first"`` or ``"average"``).
+
+    Unless ``spike_filter`` is ``False``, isolated position spikes are removed
+    before speeds and distances are computed (see
+    :func:`gpx_player.filters.filter_track`; a spike implies more than
+    ``max_speed``, or more than ``max_acceleration`` m/s², while skipping it
+    does not). ``median_window`` (odd, at least 3) additionally smooths the
+    positions with a running median.
+
+    ``simplify_tolerance`` (metres) thins every track with Douglas-Peucker
+    simplification (:func:`gpx_player.filters.simplify_indices`) before it is
+    drawn and put into the playback data; the kept points are a subsequence,
+    so timestamps stay in order. For each tolerance in ``lod_tolerances`` a
+    further, coarser copy of each track is added as a hidden layer (named in
+    the track's ``'lod_layer_names'``); the playback script shows the coarsest
+    one that is still accurate to about a pixel at the current zoom.
+
+    ``stationary_radius`` (metres) collapses runs of fixes that stay within
+    that distance of the run's first fix -- a boat at the dock or waiting for
+    the start -- into that fix, with the time of the run's last fix under
+    ``'until'`` (see :func:`gpx_player.filters.stationary_groups`). This is
+    done after speeds and distances are computed, so the values at the kept
+    fixes and the speed of the segment leaving a run are unchanged.
+
+    Speeds, distances and average speeds come from a
+    :class:`~gpx_player.kinematics.TrackAccumulator` (the same rules as
+    :func:`calculate_speeds`, :func:`accumulate_distances` and
+    :func:`calculate_average_speeds`), which is returned with each track
+    under ``'kinematics'``; fixes appended to the file later can be added to
+    it without going over the track again.
+
+    Data-quality problems (speed outliers, bad time steps, repaired
+    timestamps, tracks without points in the window) are collected per track
+    instead of being printed: every returned track has its
+    :class:`~gpx_player.diagnostics.TrackDiagnostics` under ``'diagnostics'``,
+    and all tracks (including skipped ones) are added to ``diagnostics`` if a
+    :class:`~gpx_player.diagnostics.DataQualityReport` is passed. A summary is
+    logged once at the end.
     """
     if start_time is not None and end_time is not None and start_time > end_time:
         raise ValueError(
             f"start_time ({start_time}) must be <= end_time ({end_time})"
         )
 
-    folium_map = folium.Map(location=[0, 0], zoom_start=12, control_scale=True, attributionControl=False, tiles=None)
+    folium_map = base_map()
     map_id = folium_map.get_name()
 
-    folium.TileLayer('openstreetmap', control=False).add_to(folium_map)
-    # Add OpenSeaMap layer directly to the map, not to the layer control
-    folium.TileLayer(
-        tiles='https://tiles.openseamap.org/seamark/{z}/{x}/{y}.png',
-        attr='OpenSeaMap',
-        overlay=False,
-        control=False,  # Set control to `False` to exclude from layer control
-    ).add_to(folium_map)
-
+    if diagnostics is None:
+        diagnostics = DataQualityReport()
     all_tracks = []
     source_index = -1
     for gpx_file in gpx_files:
@@ -241,19 +348,52 @@ def create_map(
             )
             if display_name is None:
                 display_name = f"Track {source_index + 1}"
+            track_diagnostics = diagnostics.track(display_name)
+            if repair is not None:
+                track, report = repair_track(track, repair, repair_duplicates)
+                if report.changed:
+                    track_diagnostics.record(TIMESTAMPS_REPAIRED, summary=str(report))
+            if spike_filter or median_window >= 3:
+                track, removed = filter_track(
+                    track, max_speed, max_acceleration, median_window, passes=2 if spike_filter else 0
+                )
+                if removed:
+                    track_diagnostics.record(SPIKES_REMOVED, count=removed)
             if start_time is not None or end_time is not None:
-                lo = start_time if start_time is not None else dt.datetime.min.replace(tzinfo=dt.timezone.utc)
-                hi = end_time if end_time is not None else dt.datetime.max.replace(tzinfo=dt.timezone.utc)
-                track = trim_track(track, lo, hi)
+                track = trim_track(track, start_time, end_time)
             points = track['points']
             if not points:
-                print(f"Warning: track '{track.get('name')}' has no points in "
-                      f"[{start_time}, {end_time}]; skipping.")
+                track_diagnostics.record(EMPTY_WINDOW, start=start_time, end=end_time)
                 continue
-            seg_speeds = calculate_speeds(points, max_speed)
-            distances = accumulate_distances(points)
-            avg_speeds = calculate_average_speeds(points, distances)
-            point_speeds = [0.0] + seg_speeds
+            # times are kept as epoch milliseconds; datetimes are only used for display
+            times_ms = epoch_ms(p['time'] for p in points)
+            kinematics = TrackAccumulator(max_speed, track_diagnostics)
+            columns = kinematics.extend([p['lat'] for p in points], [p['lon'] for p in points], times_ms)
+            point_speeds = columns.speeds.tolist()
+            seg_speeds = point_speeds[1:]
+            distances = columns.distances.tolist()
+            avg_speeds = columns.avg_speeds.tolist()
+            until_ms = times_ms
+            if stationary_radius:
+                first, last = _stationary_groups(points, stationary_radius)
+                if len(first) < len(points):
+                    # the segment leaving a group is the one leaving its last fix
+                    seg_speeds = [seg_speeds[j] for j in last[:-1]]
+                    points = [points[i] if i == j else dict(points[i], until=points[j]['time'])
+                              for i, j in zip(first, last)]
+                    times_ms, until_ms = times_ms[first], times_ms[last]
+                    distances = [distances[i] for i in first]
+                    avg_speeds = [avg_speeds[i] for i in first]
+                    point_speeds = [point_speeds[i] for i in first]
+            if simplify_tolerance:
+                keep = _simplify(points, simplify_tolerance)
+                if len(keep) < len(points):
+                    seg_speeds = _span_speeds(times_ms, until_ms, distances, keep, max_speed)
+                    times_ms, until_ms = times_ms[keep], until_ms[keep]
+                    points = [points[i] for i in keep]
+                    distances = [distances[i] for i in keep]
+                    avg_speeds = [avg_speeds[i] for i in keep]
+                    point_speeds = [point_speeds[i] for i in keep]
             all_tracks.append({
                 'name': track['name'],
                 'display_name': display_name,
@@ -262,7 +402,12 @@ def create_map(
                 'distances': distances,
                 'avg_speeds': avg_speeds,
                 'seg_speeds': seg_speeds,
+                'times_ms': times_ms,
+                'until_ms': until_ms,
+                'kinematics': kinematics,
+                'diagnostics': track_diagnostics,
             })
+    diagnostics.log()
 
     positive_speeds = [s for track in all_tracks for s in track['seg_speeds'] if s > 0]
     if positive_speeds:
@@ -285,19 +430,22 @@ def create_map(
         escaped_name = html_escape(name, quote=True)
 
         track_layer = folium.FeatureGroup(name=f"<span style='color:{color};'>&#9679;</span> {escaped_name}", show=True)
-        for j in range(len(lat_lon) - 1):
-            color = speed_to_color(speeds[j], max_speed)
-            tooltip_content = f"Name: {escaped_name}<br>Time: {times[j]} UTC<br>Speed: {speeds[j]:.2f} knots"
-            folium.PolyLine(
-                lat_lon[j:j + 2],
-                color=color,
-                weight=2.5,
-                opacity=1,
-                tooltip=folium.Tooltip(tooltip_content)
-            ).add_to(track_layer)
+        _add_speed_polylines(track_layer, lat_lon, speeds, times, max_speed, escaped_name)
         track_layers.append(track_layer)
         track['track_layer_name'] = track_layer.get_name()
         folium_map.add_child(track_layer)
+
+        if lod_tolerances:
+            track['lod_tolerances'] = list(lod_tolerances)
+            track['lod_layer_names'] = []
+            for tolerance in lod_tolerances:
+                keep = _simplify(track['points'], tolerance)
+                lod_speeds = _span_speeds(track['times_ms'], track['until_ms'], track['distances'], keep, max_speed)
+                lod_layer = folium.FeatureGroup(name=f"{escaped_name} ({tolerance:g} m)", show=False, control=False)
+                _add_speed_polylines(lod_layer, [lat_lon[i] for i in keep], lod_speeds,
+                                     [times[i] for i in keep], max_speed, escaped_name)
+                folium_map.add_child(lod_layer)
+                track['lod_layer_names'].append(lod_layer.get_name())
     
     if show_layer_control:
         folium.LayerControl(collapsed=False).add_to(folium_map)
@@ -305,6 +453,43 @@ def create_map(
     return folium_map, all_tracks, max_speed, map_id
 
 
+def _simplify(points: List[dict], tolerance: float) -> List[int]:
+    return simplify_indices([p['lat'] for p in points], [p['lon'] for p in points], tolerance).tolist()
+
+
+def _stationary_groups(points: List[dict], radius: float) -> Tuple[List[int], List[int]]:
+    first, last = stationary_groups([p['lat'] for p in points], [p['lon'] for p in points], radius)
+    return first.tolist(), last.tolist()
+
+
+def _span_speeds(times_ms: np.ndarray, until_ms: np.ndarray, distances: List[float], keep: List[int],
+                 max_speed: float) -> List[float]:
+    """Average speed in knots between consecutive kept points, nullified like in :func:`calculate_speeds`.
+
+    A collapsed stationary point is left at its ``until_ms`` time.
+    """
+    keep = np.asarray(keep)
+    hours = (times_ms[keep[1:]] - until_ms[keep[:-1]]) / 3600000.0
+    distances = np.asarray(distances, dtype=float)
+    speeds = np.divide(distances[keep[1:]] - distances[keep[:-1]], hours, out=np.zeros(len(hours)), where=hours > 0)
+    speeds[speeds > max_speed] = 0.0
+    return speeds.tolist()
+
+
+def _add_speed_polylines(layer, lat_lon, speeds, times, max_speed: float, escaped_name: str) -> None:
+    """Add one speed-coloured polyline with a tooltip per segment of ``lat_lon`` to ``layer``."""
+    for j in range(len(lat_lon) - 1):
+        color = speed_to_color(speeds[j], max_speed)
+        tooltip_content = f"Name: {escaped_name}<br>Time: {times[j]} UTC<br>Speed: {speeds[j]:.2f} knots"
+        folium.PolyLine(
+            lat_lon[j:j + 2],
+            color=color,
+            weight=2.5,
+            opacity=1,
+            tooltip=folium.Tooltip(tooltip_content)
+        ).add_to(layer)
+
+
 def _add_animation_script(
     folium_map: folium.Map,
     all_tracks: List[dict],
@@ -316,16 +501,24 @@ def _add_animation_script(
     slider_inactive_color: Optional[str] = None,
     tail_point_count: int = _TAIL_LENGTH_PRESETS["normal"],
     track_layer_names: Optional[Sequence[Optional[str]]] = None,
+    resample_step: Optional[float] = None,
+    max_gap: Optional[float] = None,
+    live_url: Optional[str] = None,
 ) -> None:
-    gpx_points_data = [track['points'] for track in all_tracks]
-    gpx_speeds_data = [track['point_speeds'] for track in all_tracks]
-    gpx_distances_data = [track['distances'] for track in all_tracks]
-    gpx_avg_speeds_data = [track['avg_speeds'] for track in all_tracks]
     track_names = [_display_name(track) for track in all_tracks]
     full_track_layer_names = _normalize_track_layer_names(all_tracks, track_layer_names)
-    gpx_timestamps = sorted({p['time'] for track in all_tracks for p in track['points']})
-    min_time, max_time = min(gpx_timestamps), max(gpx_timestamps)
-    time_range = (max_time - min_time).total_seconds()
+    if resample_step:
+        playback_tracks, gpx_timestamps = _resample_playback_tracks(all_tracks, resample_step, max_gap)
+    else:
+        playback_tracks = all_tracks
+        gpx_timestamps = merge_timeline([_track_times_ms(track)[0] for track in all_tracks]).times
+    gpx_points_data = [track['points'] for track in playback_tracks]
+    gpx_speeds_data = [track['point_speeds'] for track in playback_tracks]
+    gpx_distances_data = [track['distances'] for track in playback_tracks]
+    gpx_avg_speeds_data = [track['avg_speeds'] for track in playback_tracks]
+    # the playback script takes times as epoch milliseconds
+    min_time, max_time = int(gpx_timestamps[0]), int(gpx_timestamps[-1])
+    time_range = (max_time - min_time) / 1000
     payload = {
         "mapId": map_id,
         "colors": _TRACK_COLORS,
@@ -334,7 +527,7 @@ def _add_animation_script(
         "distances": gpx_distances_data,
         "avgSpeeds": gpx_avg_speeds_data,
         "trackNames": track_names,
-        "timestamps": gpx_timestamps,
+        "timestamps": gpx_timestamps.tolist(),
         "minTime": min_time,
         "maxTime": max_time,
         "timeRange": time_range,
@@ -347,6 +540,10 @@ def _add_animation_script(
         "sliderInactiveColor": slider_inactive_color or _DEFAULT_SLIDER_INACTIVE_COLOR,
         "tailPointCount": tail_point_count,
         "fullTrackLayerNames": full_track_layer_names,
+        "lodTolerances": [track.get('lod_tolerances', []) for track in all_tracks],
+        "lodLayerNames": [track.get('lod_layer_names', []) for track in all_tracks],
+        "liveUrl": live_url,
+        "liveTrackIds": [track.get('live_id', index) for index, track in enumerate(all_tracks)],
     }
     map_id_json = _json_for_inline_script(map_id)
     payload_json = _json_for_inline_script(payload)
@@ -363,6 +560,66 @@ def _add_animation_script(
     folium_map.get_root().html.add_child(folium.Element(animation_script))
 
 
+def _track_times_ms(track: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """Epoch-millisecond start and ``until`` times of the points of ``track``.
+
+    Tracks from :func:`create_map` carry them; others get them computed.
+    """
+    if 'times_ms' in track:
+        return track['times_ms'], track.get('until_ms', track['times_ms'])
+    points = track['points']
+    return epoch_ms(p['time'] for p in points), epoch_ms(p.get('until', p['time']) for p in points)
+
+
+def _resample_playback_tracks(all_tracks: List[dict], step: float,
+                              max_gap: Optional[float] = None) -> Tuple[List[dict], np.ndarray]:
+    """Playback data of ``all_tracks`` on one uniform clock with ``step`` seconds, and the clock.
+
+    Positions and distances are interpolated between fixes; the speed is the
+    one of the segment a tick falls in, and the average speed is recomputed
+    as in :func:`calculate_average_speeds`. A collapsed stationary point is
+    held until its ``'until'`` time. Times are epoch milliseconds. A track
+    without points is returned unchanged, as nothing can be resampled.
+    """
+    columns = []
+    for track in all_tracks:
+        times_ms, until_ms = _track_times_ms(track)
+        lat = np.array([p['lat'] for p in track['points']], dtype=float)
+        lon = np.array([p['lon'] for p in track['points']], dtype=float)
+        speeds = np.asarray(track['point_speeds'], dtype=float)
+        distances = np.asarray(track['distances'], dtype=float)
+        # a stationary point is repeated at its `until` time, standing still
+        stationary = np.flatnonzero(until_ms > times_ms)
+        order = np.sort(np.concatenate([np.arange(len(times_ms)), stationary]), kind='stable')
+        held = np.append(False, order[1:] == order[:-1])
+        seconds = np.where(held, until_ms[order], times_ms[order]) / 1000
+        columns.append((seconds, lat[order], lon[order], np.where(held, 0.0, speeds[order]), distances[order]))
+    clock = uniform_clock([column[0] for column in columns], step)
+
+    playback_tracks = []
+    for track, (seconds, lat, lon, speeds, distances) in zip(all_tracks, columns):
+        sampling = resample_times(seconds, clock, max_gap)
+        if not len(sampling):
+            playback_tracks.append(track)
+            continue
+        # between two fixes the speed is that of the segment ending at the second one
+        speed_index = np.minimum(sampling.index + (sampling.fraction > 0), len(seconds) - 1)
+        tick_distances = sampling.interpolate(distances)
+        hours = (sampling.seconds - seconds[0]) / 3600.0
+        avg_speeds = np.divide(tick_distances, hours, out=np.zeros(len(hours)), where=hours > 0)
+        tick_ms = np.round(sampling.seconds * 1000).astype(np.int64)
+        playback_tracks.append({
+            'points': [{'lat': la, 'lon': lo, 'time': t}
+                       for la, lo, t in zip(sampling.interpolate(lat).tolist(),
+                                            sampling.interpolate_longitude(lon).tolist(),
+                                            tick_ms.tolist())],
+            'point_speeds': speeds[speed_index].tolist(),
+            'distances': tick_distances.tolist(),
+            'avg_speeds': avg_speeds.tolist(),
+        })
+    return playback_tracks, np.round(clock * 1000).astype(np.int64)
+
+
 def _add_header(
     folium_map: folium.Map,
     title: str,
@@ -385,11 +642,25 @@ def add_playback_controls(
     slider_inactive_color: Optional[str] = _DEFAULT_SLIDER_INACTIVE_COLOR,
     tail_length: str = "normal",
     track_layer_names: Optional[Sequence[Optional[str]]] = None,
+    resample_step: Optional[float] = None,
+    max_gap: Optional[float] = None,
+    live_url: Optional[str] = None,
 ) -> None:
     """Add playback UI, legends, markers, and data to a Folium map.
 
     The templates and JavaScript are loaded from package resources, so this
     works from an installed wheel regardless of the current working directory.
+
+    With ``resample_step`` (seconds) the playback data of all tracks is
+    interpolated onto one uniform clock (see :mod:`gpx_player.resample`), so
+    the slider moves in equal steps and all boats are shown at the same
+    instant; ticks inside gaps between fixes longer than ``max_gap`` seconds
+    are left out. The drawn full tracks are not affected.
+
+    ``live_url`` is the Server-Sent Events stream of a
+    :mod:`gpx_player.live` server; the playback script then appends the
+    fixes it pushes to the tracks (matched by their ``'live_id'``) and
+    follows the newest fix while the slider is at its end.
     """
     tail_point_count = _resolve_tail_point_count(tail_length)
     if not all_tracks:
@@ -407,6 +678,9 @@ def add_playback_controls(
         slider_inactive_color=slider_inactive_color,
         tail_point_count=tail_point_count,
         track_layer_names=track_layer_names,
+        resample_step=resample_step,
+        max_gap=max_gap,
+        live_url=live_url,
     )
     if title:
         _add_header(folium_map, title, map_id, env)
@@ -430,8 +704,21 @@ def create_playback_map(
     slider_active_color: Optional[str] = _DEFAULT_SLIDER_ACTIVE_COLOR,
     slider_inactive_color: Optional[str] = _DEFAULT_SLIDER_INACTIVE_COLOR,
     tail_length: str = "normal",
+    diagnostics: Optional[DataQualityReport] = None,
+    simplify_tolerance: Optional[float] = None,
+    lod_tolerances: Sequence[float] = (),
+    stationary_radius: Optional[float] = None,
+    resample_step: Optional[float] = None,
+    max_gap: Optional[float] = None,
 ) -> folium.Map:
-    """Create a static OpenSeaMap with GPX playback controls."""
+    """Create a static OpenSeaMap with GPX playback controls.
+
+    Pass a :class:`~gpx_player.diagnostics.DataQualityReport` as
+    ``diagnostics`` to get the data-quality findings of :func:`create_map`;
+    ``simplify_tolerance``, ``lod_tolerances`` and ``stationary_radius`` are
+    passed on to it as well, ``resample_step`` and ``max_gap`` to
+    :func:`add_playback_controls`.
+    """
     _resolve_tail_point_count(tail_length)
     folium_map, all_tracks, actual_max_speed, map_id = create_map(
         gpx_files,
@@ -440,6 +727,10 @@ def create_playback_map(
         start_time=start_time,
         end_time=end_time,
         show_layer_control=False,
+        diagnostics=diagnostics,
+        simplify_tolerance=simplify_tolerance,
+        lod_tolerances=lod_tolerances,
+        stationary_radius=stationary_radius,
     )
     add_playback_controls(
         folium_map,
@@ -450,6 +741,8 @@ def create_playback_map(
         slider_active_color=slider_active_color,
         slider_inactive_color=slider_inactive_color,
         tail_length=tail_length,
+        resample_step=resample_step,
+        max_gap=max_gap,
     )
     return folium_map
 
@@ -512,6 +805,7 @@ def add_boat_legend(
 
 def main():
     args = parse_arguments()
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
     gpx_files = args.files
     names = args.names
 
@@ -519,6 +813,14 @@ def main():
         gpx_files, names, args.max_speed,
         start_time=args.start, end_time=args.end,
         show_layer_control=False,
+        repair=args.repair_timestamps,
+        repair_duplicates='average' if args.average_duplicates else 'first',
+        spike_filter=args.spike_filter,
+        max_acceleration=args.max_acceleration,
+        median_window=args.median_window,
+        simplify_tolerance=args.simplify,
+        lod_tolerances=args.lod,
+        stationary_radius=args.stationary_radius,
     )
     if not all_tracks:
         print("No GPX points found in the selected time window; nothing to render.")
@@ -530,6 +832,8 @@ def main():
         map_id=map_id,
         title=args.title,
         tail_length=args.tail_length,
+        resample_step=args.resample,
+        max_gap=args.max_gap,
     )
 
     folium_map.save('boat_tracks.html')
@@ -0,0 +1,306 @@
+"""Frame rendering and encoding helpers for video mode.
+
+``matplotlib.animation.Animation.save`` redraws the whole figure for every
+frame, even when the animation was created with ``blit=True``. The helpers in
+this module rasterize the static part of a figure (axes, ticks, marks, names,
+basemap) once and composite only the dynamic artists on top of it.
+"""
+import re
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Sequence, Tuple
+
+import matplotlib as mpl
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+_OUTPUT_SPEC_RE = re.compile(r'^(?P<path>.+?)(?::(?P<width>\d+)x(?P<height>\d+))?$')
+
+
+class StaticBackgroundRenderer:
+    """Render frames by drawing ``artists`` over a cached static background.
+
+    The background is captured on the first call to :meth:`render` with all
+    ``artists`` marked as animated, i.e. left out of the full draw.
+    """
+
+    def __init__(self, fig, artists: Sequence[mpl.artist.Artist]):
+        self.fig = fig
+        self.artists = list(artists)
+        self._background = None
+
+    def capture_background(self) -> None:
+        for artist in self.artists:
+            artist.set_animated(True)
+        self.fig.canvas.draw()
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+    def render(self) -> np.ndarray:
+        """Return the current frame as an ``(height, width, 4)`` RGBA array."""
+        canvas = self.fig.canvas
+        if self._background is None:
+            self.capture_background()
+        canvas.restore_region(self._background)
+        for artist in self.artists:
+            self.fig.draw_artist(artist)
+        return np.array(canvas.buffer_rgba())
+
+
+class FullRedrawRenderer:
+    """Render frames by redrawing the whole figure, as ``Animation.save`` does."""
+
+    def __init__(self, fig):
+        self.fig = fig
+
+    def render(self) -> np.ndarray:
+        self.fig.canvas.draw()
+        return np.array(self.fig.canvas.buffer_rgba())
+
+
+class FFMpegFrameSink:
+    """Pipe raw RGBA frames into ``ffmpeg`` to produce an H.264 video."""
+
+    def __init__(self, path: str, fps: float):
+        self.path = str(path)
+        self.fps = fps
+        self._proc = None
+
+    def _start(self, width: int, height: int) -> None:
+        ffmpeg = shutil.which(mpl.rcParams['animation.ffmpeg_path'])
+        if ffmpeg is None:
+            raise RuntimeError(f"ffmpeg is required to write {self.path}")
+        command = [
+            ffmpeg, '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', str(self.fps),
+            '-i', 'pipe:',
+            # H.264 with yuv420p needs even frame dimensions
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+            '-vcodec', 'h264', '-pix_fmt', 'yuv420p',
+            self.path,
+        ]
+        self._proc = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame: np.ndarray) -> None:
+        if self._proc is None:
+            self._start(frame.shape[1], frame.shape[0])
+        self._proc.stdin.write(np.ascontiguousarray(frame).tobytes())
+
+    def close(self) -> None:
+        if self._proc is None:
+            return
+        self._proc.stdin.close()
+        if self._proc.wait():
+            raise RuntimeError(f"ffmpeg failed to write {self.path}")
+        self._proc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class OptimizedGifFrameSink:
+    """Animated GIF writer with one global palette and frame differencing.
+
+    Only the rectangle that changed since the previous frame is kept in
+    memory, and a frame identical to the previous one just extends its
+    duration. On :meth:`close` a single palette is computed from
+    ``palette_samples`` evenly spaced frames, and the frames are quantized
+    with it and written one at a time, so the file needs no per-frame colour
+    tables and only the changed rectangle of every frame is encoded.
+    """
+
+    def __init__(self, path: str, fps: float, palette_samples: int = 8, colors: int = 256):
+        self.path = str(path)
+        self.fps = fps
+        self.palette_samples = palette_samples
+        self.colors = colors
+        self._first = None
+        self._previous = None
+        self._deltas = []  # (top, left, changed RGB rectangle) per frame after the first
+        self._durations = []
+
+    def write(self, frame: np.ndarray) -> None:
+        rgb = frame[..., :3]
+        duration = 1000 / self.fps
+        if self._first is None:
+            self._first = rgb.copy()
+            self._previous = rgb.copy()
+            self._durations.append(duration)
+            return
+        changed = np.any(rgb != self._previous, axis=2)
+        if not changed.any():
+            self._durations[-1] += duration
+            return
+        rows = np.flatnonzero(changed.any(axis=1))
+        cols = np.flatnonzero(changed.any(axis=0))
+        top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+        crop = rgb[top:bottom, left:right].copy()
+        self._previous[top:bottom, left:right] = crop
+        self._deltas.append((top, left, crop))
+        self._durations.append(duration)
+
+    def _rgb_frames(self):
+        canvas = self._first.copy()
+        yield canvas
+        for top, left, crop in self._deltas:
+            canvas[top:top + crop.shape[0], left:left + crop.shape[1]] = crop
+            yield canvas
+
+    def _palette(self) -> Image.Image:
+        count = len(self._deltas) + 1
+        picked = set(np.linspace(0, count - 1, max(self.palette_samples, 1)).round().astype(int))
+        samples = [frame.copy() for i, frame in enumerate(self._rgb_frames()) if i in picked]
+        return Image.fromarray(np.concatenate(samples)).quantize(self.colors, method=Image.Quantize.MEDIANCUT)
+
+    def _indexed_frames(self, palette: Image.Image):
+        """Yield the first frame and then each changed rectangle, quantized, with its offset."""
+        yield Image.fromarray(self._first).quantize(palette=palette, dither=Image.Dither.NONE), (0, 0)
+        for top, left, crop in self._deltas:
+            yield Image.fromarray(crop).quantize(palette=palette, dither=Image.Dither.NONE), (int(left), int(top))
+
+    def close(self) -> None:
+        if self._first is None:
+            return
+        palette = self._palette()
+        durations = [int(round(d)) for d in self._durations]
+        with open(self.path, 'wb') as fp:
+            for i, (frame, offset) in enumerate(self._indexed_frames(palette)):
+                if not i:
+                    header, _used_colors = GifImagePlugin.getheader(frame, info={'loop': 0})
+                    fp.writelines(header)
+                # each rectangle is drawn over the previous frame (no disposal)
+                fp.writelines(GifImagePlugin.getdata(frame, offset, duration=durations[i]))
+            fp.write(b';')
+        self._first = self._previous = None
+        self._deltas = []
+        self._durations = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ContactSheetSink:
+    """Tile all written frames into a single PNG image, ``columns`` per row."""
+
+    def __init__(self, path: str, columns: int = 4):
+        self.path = str(path)
+        self.columns = columns
+        self._frames = []
+
+    def write(self, frame: np.ndarray) -> None:
+        self._frames.append(frame[..., :3].copy())
+
+    def close(self) -> None:
+        if not self._frames:
+            return
+        Image.fromarray(contact_sheet(self._frames, self.columns)).save(self.path)
+        self._frames = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def contact_sheet(frames: Sequence[np.ndarray], columns: int = 4) -> np.ndarray:
+    """Arrange equally sized frames in a grid; empty cells are white."""
+    columns = max(1, min(columns, len(frames)))
+    rows = -(-len(frames) // columns)
+    height, width = frames[0].shape[:2]
+    sheet = np.full((rows * height, columns * width) + frames[0].shape[2:], 255, dtype=frames[0].dtype)
+    for i, frame in enumerate(frames):
+        row, column = divmod(i, columns)
+        sheet[row * height:(row + 1) * height, column * width:(column + 1) * width] = frame
+    return sheet
+
+
+class FanOutFrameSink:
+    """Write every frame to several sinks, each at its own resolution.
+
+    ``outputs`` is a sequence of ``(sink, size)`` pairs where ``size`` is a
+    ``(width, height)`` tuple or ``None`` for the rendered resolution. A frame
+    is scaled at most once per distinct size.
+    """
+
+    def __init__(self, outputs: Sequence[Tuple[object, Optional[Tuple[int, int]]]]):
+        self.outputs = list(outputs)
+
+    def write(self, frame: np.ndarray) -> None:
+        scaled = {}
+        for sink, size in self.outputs:
+            if size is None or size == (frame.shape[1], frame.shape[0]):
+                sink.write(frame)
+                continue
+            if size not in scaled:
+                scaled[size] = fit_frame(frame, size)
+            sink.write(scaled[size])
+
+    def close(self) -> None:
+        """Close every sink, then re-raise the first error any of them raised."""
+        error = None
+        for sink, _size in self.outputs:
+            try:
+                sink.close()
+            except Exception as exc:
+                error = error or exc
+        if error is not None:
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def fit_frame(frame: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """Scale ``frame`` to fit into ``size`` keeping its aspect ratio; pad with white."""
+    width, height = size
+    scale = min(width / frame.shape[1], height / frame.shape[0])
+    scaled_size = (max(1, round(frame.shape[1] * scale)), max(1, round(frame.shape[0] * scale)))
+    scaled = np.asarray(Image.fromarray(frame).resize(scaled_size, Image.Resampling.LANCZOS))
+    if scaled_size == (width, height):
+        return scaled
+    fitted = np.full((height, width) + frame.shape[2:], 255, dtype=frame.dtype)
+    top, left = (height - scaled_size[1]) // 2, (width - scaled_size[0]) // 2
+    fitted[top:top + scaled_size[1], left:left + scaled_size[0]] = scaled
+    return fitted
+
+
+def parse_output_spec(spec: str) -> Tuple[str, Optional[Tuple[int, int]]]:
+    """Parse ``path[:WIDTHxHEIGHT]``, e.g. ``race.mp4:1920x1080``."""
+    match = _OUTPUT_SPEC_RE.match(spec)
+    width, height = match.group('width'), match.group('height')
+    if width is None:
+        return match.group('path'), None
+    if not int(width) or not int(height):
+        raise ValueError(f"output size must be positive: {spec}")
+    return match.group('path'), (int(width), int(height))
+
+
+def open_frame_sink(path: str, fps: float):
+    """Return a frame sink for ``path``, chosen by its file extension."""
+    if Path(path).suffix.lower() == '.gif':
+        return OptimizedGifFrameSink(path, fps)
+    return FFMpegFrameSink(path, fps)
+
+
+def render_animation(renderer, update: Callable, frames: Iterable, sink, fargs: Sequence = ()) -> int:
+    """Call ``update(frame, *fargs)`` for every frame and write the result to ``sink``.
+
+    Returns the number of frames written.
+    """
+    count = 0
+    with sink:
+        for frame in frames:
+            update(frame, *fargs)
+            sink.write(renderer.render())
+            count += 1
+    return count
@@ -0,0 +1,188 @@
+"""Replay finished GPX files as growing logs, for trying out :mod:`gpx_player.live` offline.
+
+The fixes of all files are written in time order, each one when it is due on
+an accelerated clock, to a GPX or NMEA log per file (or, for one file, to a
+TCP client as an NMEA stream), so the live server sees the same kind of
+input as from boats on the water.
+
+Example::
+
+    python -m gpx_player.replay example-data/osm-demo-*.gpx --output-dir live/ --speed 20
+    python -m gpx_player.live live/*.gpx
+"""
+import argparse
+import datetime as dt
+import heapq
+import socket
+import sys
+import time
+from itertools import repeat
+from html import escape as xml_escape
+from pathlib import Path
+from typing import Callable, Iterable, List, Sequence, TextIO, Tuple
+
+from gpx_player.live import Fix, nmea_checksum
+from gpx_player.openseamap import parse_gpx
+from gpx_player.utils import epoch_ms, from_epoch_ms
+
+_GPX_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="gpx-player replay" xmlns="http://www.topografix.com/GPX/1/1">
+  <trk>
+    <name>{name}</name>
+    <trkseg>
+"""
+_GPX_FOOTER = """    </trkseg>
+  </trk>
+</gpx>
+"""
+
+
+def read_fixes(file_path) -> List[Fix]:
+    """Return the fixes with a time of all tracks in a GPX file, in file order."""
+    points = [p for track in parse_gpx(str(file_path)) for p in track['points'] if p['time'] is not None]
+    times_ms = epoch_ms(p['time'] for p in points).tolist()
+    return [Fix(p['lat'], p['lon'], t) for p, t in zip(points, times_ms)]
+
+
+def _degrees_minutes(value: float, degree_digits: int) -> str:
+    minutes = round(abs(value) * 60, 4)
+    degrees, minutes = divmod(minutes, 60)
+    return f"{int(degrees):0{degree_digits}d}{minutes:07.4f}"
+
+
+def format_rmc(fix: Fix) -> str:
+    """Return ``fix`` as an NMEA ``$GPRMC`` sentence with checksum (no line ending)."""
+    stamp = from_epoch_ms(fix.time_ms)
+    body = ",".join([
+        "GPRMC",
+        f"{stamp:%H%M%S}.{stamp.microsecond // 1000:03d}",
+        "A",
+        _degrees_minutes(fix.lat, 2), "N" if fix.lat >= 0 else "S",
+        _degrees_minutes(fix.lon, 3), "E" if fix.lon >= 0 else "W",
+        "", "",
+        f"{stamp:%d%m%y}",
+        "", "", "A",
+    ])
+    return f"${body}*{nmea_checksum(body):02X}"
+
+
+class GpxLogWriter:
+    """Write fixes to a GPX file the way a logger does: the document is closed only at the end."""
+
+    def __init__(self, stream: TextIO, name: str):
+        self._stream = stream
+        self._stream.write(_GPX_HEADER.format(name=xml_escape(name)))
+        self._stream.flush()
+
+    def write(self, fix: Fix) -> None:
+        stamp = from_epoch_ms(fix.time_ms).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+        self._stream.write(f'      <trkpt lat="{fix.lat!r}" lon="{fix.lon!r}"><time>{stamp}</time></trkpt>\n')
+        self._stream.flush()
+
+    def close(self) -> None:
+        self._stream.write(_GPX_FOOTER)
+        self._stream.close()
+
+
+class NmeaLogWriter:
+    """Write fixes as ``$GPRMC`` sentences to a text stream or a socket."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, fix: Fix) -> None:
+        line = format_rmc(fix) + "\r\n"
+        if isinstance(self._stream, socket.socket):
+            self._stream.sendall(line.encode('ascii'))
+        else:
+            self._stream.write(line)
+            self._stream.flush()
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+def replay(tracks: Sequence[Tuple[Iterable[Fix], object]], speed: float, shift_ms: int = 0,
+           sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.monotonic) -> int:
+    """Write the fixes of all ``(fixes, writer)`` pairs in time order, ``speed`` times faster than real time.
+
+    Each fix is written when it is due relative to the first one (``speed``
+    0 writes them all at once), with its time moved by ``shift_ms``. The
+    schedule is kept against ``clock``, so slow writes do not add up.
+    Returns the number of fixes written.
+    """
+    merged = heapq.merge(*[zip((fix.time_ms for fix in fixes), repeat(index), fixes)
+                           for index, (fixes, _writer) in enumerate(tracks)])
+    start = first_ms = None
+    written = 0
+    for time_ms, index, fix in merged:
+        if start is None:
+            start, first_ms = clock(), time_ms
+        if speed > 0:
+            delay = start + (time_ms - first_ms) / 1000 / speed - clock()
+            if delay > 0:
+                sleep(delay)
+        tracks[index][1].write(fix._replace(time_ms=time_ms + shift_ms))
+        written += 1
+    return written
+
+
+def _tcp_client(address: str) -> socket.socket:
+    host, _, port = address.rpartition(':')
+    with socket.create_server((host or '127.0.0.1', int(port))) as server:
+        print(f"Waiting for a client on {host or '127.0.0.1'}:{port}")
+        client, _peer = server.accept()
+    return client
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Replay GPX files as growing GPX/NMEA logs.")
+    parser.add_argument('files', nargs='+', help='GPX files to replay')
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--output-dir', type=Path, help='Write one log per input file into this directory')
+    output.add_argument('--tcp', metavar='HOST:PORT', help='Serve the NMEA sentences of one file to a TCP client')
+    parser.add_argument('--format', choices=('gpx', 'nmea'), default='gpx',
+                        help='Log format with --output-dir (default: gpx)')
+    parser.add_argument('--speed', type=float, default=10,
+                        help='How many times faster than real time to replay; 0 for no delay (default: 10)')
+    parser.add_argument('--now', action='store_true', help='Shift the times so that the replay starts now')
+    args = parser.parse_args(argv)
+    if args.tcp and len(args.files) != 1:
+        parser.error("--tcp replays exactly one file")
+    return args
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    fixes = [read_fixes(path) for path in args.files]
+    first = min((track[0].time_ms for track in fixes if track), default=None)
+    if first is None:
+        sys.exit("No timed points in the input files.")
+    shift_ms = round(dt.datetime.now(dt.timezone.utc).timestamp() * 1000) - first if args.now else 0
+
+    if args.tcp:
+        writers = [NmeaLogWriter(_tcp_client(args.tcp))]
+    else:
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+        writers = []
+        for path in args.files:
+            target = args.output_dir / f"{Path(path).stem}.{args.format}"
+            # opening an existing FIFO waits here for the live server to open it for reading
+            stream = open(target, 'w', encoding='utf-8')
+            writers.append(GpxLogWriter(stream, Path(path).stem) if args.format == 'gpx' else NmeaLogWriter(stream))
+    try:
+        written = replay(list(zip(fixes, writers)), args.speed, shift_ms)
+    except (KeyboardInterrupt, BrokenPipeError, ConnectionResetError):
+        written = None
+    finally:
+        for writer in writers:
+            try:
+                writer.close()
+            except OSError:
+                pass
+    if written is not None:
+        print(f"Replayed {written} fixes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Resampling of tracks onto a common, uniform clock.
+
+Raw tracks are logged at their own instants, so the union of all timestamps
+grows with the number of boats and their clock offsets, and no two boats are
+ever shown at the same instant. :func:`uniform_clock` builds one clock with a
+fixed step for all tracks, and :func:`resample_times` maps a track onto it;
+the resulting :class:`Resampling` interpolates any per-fix column (position,
+cumulative distance) at the clock ticks with NumPy, in O(n + ticks) per track.
+"""
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+
+
+class Resampling(NamedTuple):
+    """The ticks of a clock covered by one track, see :func:`resample_times`.
+
+    ``seconds`` are the covered ticks (epoch seconds), ``index`` the last fix
+    at or before each tick and ``fraction`` how far the tick lies between that
+    fix and the next one (0 at a fix).
+    """
+    seconds: np.ndarray
+    index: np.ndarray
+    fraction: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.seconds)
+
+    def interpolate(self, column) -> np.ndarray:
+        """Linearly interpolate ``column`` (one value per fix) at the ticks."""
+        values = np.asarray(column, dtype=float)
+        following = np.minimum(self.index + 1, len(values) - 1)
+        return values[self.index] + (values[following] - values[self.index]) * self.fraction
+
+    def interpolate_longitude(self, lon) -> np.ndarray:
+        """Like :meth:`interpolate`, but along the short way across the antimeridian."""
+        unwrapped = np.degrees(np.unwrap(np.radians(np.asarray(lon, dtype=float))))
+        return (self.interpolate(unwrapped) + 180.0) % 360.0 - 180.0
+
+    def hold(self, column) -> np.ndarray:
+        """Return the value of ``column`` at the last fix at or before each tick."""
+        return np.asarray(column)[self.index]
+
+
+def uniform_clock(seconds_columns: Iterable, step: float) -> np.ndarray:
+    """Return the ticks, ``step`` seconds apart, that cover all given tracks.
+
+    The ticks are multiples of ``step`` since the epoch, from the last tick at
+    or before the earliest fix up to the first tick at or after the latest
+    fix, so the clock has about duration / step entries however many tracks
+    there are, and every fix has a tick at or after it.
+    """
+    if step <= 0:
+        raise ValueError(f"uniform_clock: step must be positive, got {step}")
+    columns = [np.asarray(seconds, dtype=float) for seconds in seconds_columns]
+    columns = [seconds for seconds in columns if len(seconds)]
+    if not columns:
+        return np.zeros(0)
+    first = np.floor(min(seconds[0] for seconds in columns) / step) * step
+    last = max(seconds[-1] for seconds in columns)
+    return first + step * np.arange(int(np.ceil((last - first) / step)) + 1)
+
+
+def resample_times(seconds, clock, max_gap: Optional[float] = None) -> Resampling:
+    """Map a track with sorted fix times ``seconds`` onto the ticks of ``clock``.
+
+    The ticks from the first fix up to the first tick at or after the last
+    fix are covered; that last tick holds the last fix. With ``max_gap``
+    (seconds), ticks that fall inside a longer gap between two fixes are left
+    out, so positions are never invented across a logging outage -- except
+    the first tick at or after each fix, which holds that fix. So a track
+    with at least one fix covers at least one tick, however sparse it is.
+    """
+    seconds = np.asarray(seconds, dtype=float)
+    clock = np.asarray(clock, dtype=float)
+    if not len(seconds):
+        return Resampling(np.zeros(0), np.zeros(0, dtype=np.intp), np.zeros(0))
+    ticks = clock[np.searchsorted(clock, seconds[0]):np.searchsorted(clock, seconds[-1]) + 1]
+    index = np.searchsorted(seconds, ticks, side="right") - 1
+    following = np.minimum(index + 1, len(seconds) - 1)
+    span = seconds[following] - seconds[index]
+    # ticks in a gap longer than max_gap hold the fix before it
+    held = np.zeros(len(ticks), dtype=bool) if max_gap is None else span > max_gap
+    if held.any():
+        at_fix = np.searchsorted(ticks, seconds)
+        covered = ~held
+        covered[at_fix[at_fix < len(ticks)]] = True
+        ticks, index, following, span, held = (
+            ticks[covered], index[covered], following[covered], span[covered], held[covered])
+    fraction = np.zeros(len(ticks))
+    moving = (span > 0) & ~held
+    fraction[moving] = (ticks[moving] - seconds[index[moving]]) / span[moving]
+    return Resampling(ticks, index, fraction)
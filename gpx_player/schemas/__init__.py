@@ -0,0 +1 @@
+"""GPX 1.0 and 1.1 XML schemas used by the validator."""
@@ -0,0 +1,121 @@
+import argparse
+import csv
+import datetime as dt
+import os
+import re
+import sys
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from lxml import etree
+
+from gpx_player.gpx_utils import extract_windows
+from gpx_player.utils import slug
+
+_COMPACT_TZ_RE = re.compile(r"([+-]\d{2})(\d{2})$")
+
+
+class TimeWindow(NamedTuple):
+    name: str
+    start: dt.datetime
+    end: dt.datetime
+
+
+def parse_window_time(s: str) -> dt.datetime:
+    """Parse an ISO 8601 time with a timezone (``Z``, ``+02:00`` or ``+0200``)."""
+    normalized = _COMPACT_TZ_RE.sub(r"\1:\2", s.strip().replace('Z', '+00:00'))
+    parsed = dt.datetime.fromisoformat(normalized)
+    if parsed.tzinfo is None:
+        raise ValueError(f"time {s!r} has no timezone")
+    return parsed
+
+
+def read_schedule(path) -> List[TimeWindow]:
+    """Read a race schedule: one ``name,start,end`` line per window.
+
+    Times are ISO 8601 with a timezone. Blank lines and lines starting with
+    ``#`` are ignored.
+    """
+    windows = []
+    with open(path, newline='') as f:
+        rows = csv.reader(line for line in f if line.strip() and not line.lstrip().startswith('#'))
+        for row in rows:
+            if len(row) != 3:
+                raise ValueError(f"{path}: expected 'name,start,end', got {','.join(row)!r}")
+            name, start, end = (field.strip() for field in row)
+            windows.append(TimeWindow(name, parse_window_time(start), parse_window_time(end)))
+    return windows
+
+
+def window_file_paths(gpx_file, windows: List[TimeWindow], output_dir=None, compress: bool = False) -> List[Path]:
+    """Return ``<stem>_<window name>.gpx`` (``.gpx.gz`` if ``compress``) for each window."""
+    source = Path(gpx_file)
+    stem = source.name[:-len(".gpx.gz")] if source.name.endswith(".gpx.gz") else source.stem
+    directory = Path(output_dir) if output_dir is not None else source.parent
+    suffix = ".gpx.gz" if compress else ".gpx"
+    paths = [directory / f"{stem}_{slug(window.name) or f'{i:02d}'}{suffix}" for i, window in enumerate(windows, 1)]
+    if len(set(paths)) != len(paths):
+        raise ValueError("window names must give distinct file names")
+    return paths
+
+
+def split_gpx_file(gpx_file, windows: List[TimeWindow], output_dir=None,
+                   compress: bool = False) -> List[tuple]:
+    """Write one GPX file per time window, reading ``gpx_file`` only once.
+
+    Parameters
+    ----------
+    gpx_file : str
+        Path to the source GPX file (may be gzip-compressed).
+
+    windows : list[TimeWindow]
+        Named windows, e.g. from :func:`read_schedule`.
+
+    output_dir : str, optional
+        Directory for the results. Default is the directory of ``gpx_file``.
+
+    compress : bool, optional
+        If ``True`` the results are gzip-compressed. Default is ``False``.
+
+    Returns
+    -------
+    list[tuple[Path, int]]
+        The output path and the number of points written for each window.
+    """
+    paths = window_file_paths(gpx_file, windows, output_dir, compress)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    counts = extract_windows(gpx_file, [(w.start, w.end) for w in windows], paths, compress=compress)
+    return list(zip(paths, counts))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Extract several time windows of a GPX file in one pass")
+    parser.add_argument("gpx_file", help="GPX file to split")
+    parser.add_argument("--window", "-w", nargs=2, action="append", metavar=("START", "END"), default=[],
+                        help="Time window to extract (ISO 8601 with timezone); may be repeated")
+    parser.add_argument("--schedule", help="Race schedule file with one 'name,start,end' line per window")
+    parser.add_argument("--output-dir", "-o", help="Directory for the extracted files (default: next to the input)")
+    parser.add_argument("--gzip", action="store_true", help="Write the extracted files gzip-compressed")
+    args = parser.parse_args(argv)
+
+    try:
+        windows = read_schedule(args.schedule) if args.schedule else []
+        windows += [TimeWindow(f"{i:02d}", parse_window_time(start), parse_window_time(end))
+                    for i, (start, end) in enumerate(args.window, len(windows) + 1)]
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+    if not windows:
+        parser.error("give at least one --window or a --schedule")
+
+    try:
+        results = split_gpx_file(args.gpx_file, windows, args.output_dir, args.gzip)
+    except (OSError, ValueError, etree.XMLSyntaxError) as exc:
+        print(f"Split failed: {exc}", file=sys.stderr)
+        sys.exit(1)
+    for window, (path, points) in zip(windows, results):
+        print(f"{window.name}: {points} points -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Global playback timeline over several time-sorted tracks.
+
+Both renderers step through the union of all fix times. :func:`merge_timeline`
+builds it from the tracks' int64 epoch-millisecond columns (see
+:func:`gpx_player.utils.epoch_ms`) and also returns, for every timeline entry,
+the position of each track, so a renderer can jump to any frame without
+searching the tracks.
+"""
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+
+class Timeline(NamedTuple):
+    """Merged timeline of several tracks, see :func:`merge_timeline`.
+
+    ``times`` are the distinct fix times of all tracks in ascending order.
+    ``positions[k, i]`` is the index of the last fix of track ``k`` at or
+    before ``times[i]``, or -1 while the track has not started. A track that
+    is not sorted advances only up to its first fix later than ``times[i]``.
+    """
+    times: np.ndarray
+    positions: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def counts(self, track: int) -> np.ndarray:
+        """Number of fixes of ``track`` at or before each timeline entry."""
+        return self.positions[track] + 1
+
+
+def merge_timeline(time_columns: Sequence) -> Timeline:
+    """Merge the sorted time columns of several tracks into one :class:`Timeline`.
+
+    The union is taken with ``np.unique`` over the concatenated columns, and
+    the positions with one ``np.searchsorted`` per track, so no Python-level
+    work is done per fix or per timeline entry.
+    """
+    columns = [np.asarray(times, dtype=np.int64) for times in time_columns]
+    times = np.unique(np.concatenate(columns)) if columns else np.zeros(0, dtype=np.int64)
+    positions = np.full((len(columns), len(times)), -1, dtype=np.intp)
+    for track, column in enumerate(columns):
+        if len(column):
+            # the running maximum is sorted even if the column is not
+            positions[track] = np.searchsorted(np.maximum.accumulate(column), times, side='right') - 1
+    return Timeline(times, positions)
@@ -1,5 +1,6 @@
 import datetime as dt
 import re
+from functools import lru_cache
 
 import matplotlib as mpl
 import numpy as np
@@ -51,6 +52,53 @@ def format_func(value, tick_number):
 def km_to_nm(dist: float) -> float:
     return dist/1.852
 
+
+def epoch_ms(times) -> np.ndarray:
+    """Convert timezone-aware datetimes to an int64 column of milliseconds since the epoch.
+
+    Tracks keep their times in this form internally; datetimes are only
+    created again for display, with :func:`from_epoch_ms`.
+    """
+    return np.fromiter((round(t.timestamp() * 1000) for t in times), dtype=np.int64)
+
+
+def from_epoch_ms(ms, tz: dt.tzinfo = dt.timezone.utc) -> dt.datetime:
+    """Return the datetime in ``tz`` of ``ms`` milliseconds since the epoch."""
+    return dt.datetime.fromtimestamp(int(ms) / 1000, tz)
+
+
+EARTH_RADIUS = 6378137.0  # metres, the same value as in gpxpy.geo
+MS_TO_KNOTS = 1.94384
+
+
+def haversine_between(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Vectorized ``gpxpy.geo.haversine_distance`` between paired points, in metres."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.sin((lon2 - lon1) / 2) ** 2 * np.cos(lat1) * np.cos(lat2)
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_distances(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Vectorized ``gpxpy.geo.haversine_distance`` between consecutive points, in metres."""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    return haversine_between(lat[:-1], lon[:-1], lat[1:], lon[1:])
+
+
+def segment_speeds(lat: np.ndarray, lon: np.ndarray, seconds: np.ndarray, max_speed: float) -> np.ndarray:
+    """Speed in knots of every segment between consecutive points.
+
+    Same rules as :func:`gpx_player.openseamap.calculate_speeds`: segments
+    with a non-positive time step or a speed above ``max_speed`` get zero.
+    """
+    distances = haversine_distances(lat, lon)
+    time_diff = np.diff(np.asarray(seconds, dtype=float))
+    speeds = np.zeros_like(distances)
+    moving = time_diff > 0
+    speeds[moving] = distances[moving] / time_diff[moving] * MS_TO_KNOTS
+    speeds[speeds > max_speed] = 0.0
+    return speeds
+
 def gen_arrow_head_marker(rot: float) -> (mpl.path.Path, float):
     """generate a marker to plot with matplotlib scatter, plot, ...
 
@@ -91,4 +139,23 @@ def gen_arrow_head_marker(rot: float) -> (mpl.path.Path, float):
     codes = [mpl.path.Path.MOVETO, mpl.path.Path.LINETO,mpl.path.Path.LINETO, mpl.path.Path.CLOSEPOLY]
     arrow_head_marker = mpl.path.Path(arr, codes)
     
-    return arrow_head_marker, scale
\ No newline at end of file
+    return arrow_head_marker, scale
+
+
+@lru_cache(maxsize=4096)
+def _arrow_head_marker_at(rot: float) -> (mpl.path.Path, float):
+    return gen_arrow_head_marker(rot)
+
+
+def cached_arrow_head_marker(rot: float, resolution: float = 2.0) -> (mpl.path.Path, float):
+    """Return a pre-built arrow head marker, quantized to ``resolution`` degrees.
+
+    The same ``(Path, scale)`` objects are returned for every rotation that
+    falls into one bucket, so callers can skip ``set_marker`` when the marker
+    of an artist has not changed. At most ``360 / resolution`` markers are
+    ever built.
+    """
+    if resolution <= 0:
+        raise ValueError("resolution must be positive")
+    quantized = (round(rot / resolution) * resolution) % 360
+    return _arrow_head_marker_at(float(quantized))
@@ -0,0 +1,138 @@
+"""Persistent cache of GPX validation results, keyed by file content.
+
+Results are stored in a small SQLite database under the SHA-256 digest of the
+file bytes, the GPX version, the strict flag and the package version, so a
+verdict is reused only for byte-identical input validated by the same rules.
+The database holds at most ``max_entries`` results; the least recently used
+ones are evicted first.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from gpx_player import __version__
+
+_CHUNK_SIZE = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    digest TEXT NOT NULL,
+    version TEXT NOT NULL,
+    strict INTEGER NOT NULL,
+    validator TEXT NOT NULL,
+    result TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (digest, version, strict, validator)
+)
+"""
+
+
+def file_digest(path) -> str:
+    """Return the SHA-256 hex digest of the file at ``path``."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ValidationCache:
+    """SQLite-backed LRU store of validation results.
+
+    ``path`` is the database file (created if missing) or ``":memory:"``.
+    Digests are additionally memoized in-process by path, size and mtime, so
+    looking up an unchanged file does not read it again. Instances may be
+    shared between threads; after a fork the child opens its own connection.
+    """
+
+    def __init__(self, path, max_entries: int = 10000):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.path = os.path.expanduser(str(path))
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._digests = OrderedDict()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def file_digest(self, path) -> str:
+        """Return the SHA-256 digest of ``path``, reusing it while the file is unchanged."""
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        with self._lock:
+            digest = self._digests.get(key)
+            if digest is not None:
+                self._digests.move_to_end(key)
+                return digest
+        digest = file_digest(path)
+        with self._lock:
+            self._digests[key] = digest
+            while len(self._digests) > self.max_entries:
+                self._digests.popitem(last=False)
+        return digest
+
+    def get(self, digest: str, version: Optional[str], strict: bool) -> Optional[dict]:
+        """Return the stored result for this key, or ``None``."""
+        key = (digest, str(version), int(strict), __version__)
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT result FROM results WHERE digest = ? AND version = ? AND strict = ? AND validator = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE results SET last_used = ? WHERE digest = ? AND version = ? AND strict = ? AND validator = ?",
+                (time.time(),) + key,
+            )
+        return json.loads(row[0])
+
+    def put(self, digest: str, version: Optional[str], strict: bool, result: dict) -> None:
+        """Store a JSON-serializable ``result``, evicting the least recently used ones beyond the limit."""
+        key = (digest, str(version), int(strict), __version__)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (digest, version, strict, validator, result, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                key + (json.dumps(result), time.time()),
+            )
+            excess = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM results WHERE rowid IN "
+                    "(SELECT rowid FROM results ORDER BY last_used LIMIT ?)", (excess,)
+                )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM results")
+            self._digests.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
@@ -1,12 +1,53 @@
 import argparse
+import glob
+import json
+import logging
+import os
+import re
 import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime as dt
+from functools import lru_cache
+from importlib import resources
+from typing import NamedTuple
 
 from lxml import etree
 
+from gpx_player.validation_cache import ValidationCache
+
+_SCHEMA_PACKAGE = "gpx_player.schemas"
+_SUPPORTED_VERSIONS = ("1.0", "1.1")
+# Compiled schemas are kept for the life of the process. An lxml schema keeps
+# a single error log, so validations against a cached schema are serialized
+# by its own lock.
+_SCHEMA_CACHE = {}
+_SCHEMA_VALIDATION_LOCKS = {}
+_SCHEMA_CACHE_LOCK = threading.Lock()
+_MAX_REPORTED_ERRORS = 10
+_ISO_TIMESTAMP_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?Z", re.ASCII)
+
+# Optional persistent result cache, see set_validation_cache(). The
+# GPX_VALIDATION_CACHE environment variable names a default cache file.
+_CACHE_ENV_VAR = "GPX_VALIDATION_CACHE"
+_validation_cache = None
+_validation_cache_configured = False
+
+logger = logging.getLogger(__name__)
+
+
 class GPXValidationError(Exception):
-    """Exception raised for GPX validation errors."""
-    pass
+    """Exception raised for GPX validation errors.
+
+    ``errors`` holds the individual problems behind the message, e.g. one
+    entry per reported schema or timestamp error.
+    """
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = list(errors) if errors else [message]
 
 
 def parse_gpx(file_path):
@@ -21,7 +62,18 @@ def parse_timestamp(timestamp_str):
     """
     A helper function that tolerates both `2024-06-15T14:46:21.000Z` and `2024-06-15T14:46:21Z` time formats,
     i.e. both integer and decimal seconds.
+
+    The usual fixed layout is decoded directly; anything else goes through
+    ``strptime``.
     """
+    match = _ISO_TIMESTAMP_RE.fullmatch(timestamp_str)
+    if match:
+        year, month, day, hour, minute, second, fraction = match.groups()
+        try:
+            return dt(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                      int(fraction.ljust(6, "0")) if fraction else 0)
+        except ValueError:
+            pass
     formats = ["%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"]
     for fmt in formats:
         try:
@@ -31,47 +83,77 @@ def parse_timestamp(timestamp_str):
     raise ValueError(f"Timestamp '{timestamp_str}' does not match any expected format.")
 
 
+def _open_schema_file(filename):
+    try:
+        return resources.files(_SCHEMA_PACKAGE).joinpath(filename).open('rb')
+    except AttributeError:  # pragma: no cover - Python 3.8 compatibility
+        return resources.open_binary(_SCHEMA_PACKAGE, filename)
+
+
 def load_schema(version):
-    from pathlib import Path
-    if version not in ("1.0", "1.1"):
+    """Read and compile the bundled XSD for the given GPX version."""
+    if version not in _SUPPORTED_VERSIONS:
         raise GPXValidationError(f"Unsupported GPX version: {version}")
-    schema_dir = Path(__file__).parent.parent / "schema"
-    xsd_path = schema_dir / f"gpx_{version}.xsd"
+    filename = f"gpx_{version}.xsd"
 
     try:
-        with xsd_path.open('rb') as f:
+        with _open_schema_file(filename) as f:
             schema_doc = etree.parse(f)
             schema = etree.XMLSchema(schema_doc)
     except Exception as e:
-        raise GPXValidationError(f"Error loading schema file '{xsd_path}': {e}")
+        raise GPXValidationError(f"Error loading schema file '{filename}': {e}")
+    return schema
+
+
+def get_schema(version):
+    """Return the compiled schema for ``version``, compiling it only once per process.
+
+    Safe to call from several threads.
+    """
+    schema = _SCHEMA_CACHE.get(version)
+    if schema is None:
+        with _SCHEMA_CACHE_LOCK:
+            schema = _SCHEMA_CACHE.get(version)
+            if schema is None:
+                schema = load_schema(version)
+                _SCHEMA_VALIDATION_LOCKS[id(schema)] = threading.Lock()
+                _SCHEMA_CACHE[version] = schema
     return schema
 
 
 def validate_coordinates(root):
     """Custom check for coordinate values in lenient mode."""
     for trkpt in root.findall(".//{*}trkpt"):
-        lat = trkpt.get("lat")
-        lon = trkpt.get("lon")
-        try:
-            lat_val = float(lat)
-            lon_val = float(lon)
-        except (TypeError, ValueError):
-            raise GPXValidationError(f"Invalid coordinate values: lat={lat}, lon={lon}")
-        if not (-90 <= lat_val <= 90):
-            raise GPXValidationError(f"Latitude {lat_val} out of range (-90, 90)")
-        if not (-180 <= lon_val <= 180):
-            raise GPXValidationError(f"Longitude {lon_val} out of range (-180, 180)")
+        _check_trkpt_coordinates(trkpt)
+
+
+def _check_trkpt_coordinates(trkpt):
+    lat = trkpt.get("lat")
+    lon = trkpt.get("lon")
+    try:
+        lat_val = float(lat)
+        lon_val = float(lon)
+    except (TypeError, ValueError):
+        raise GPXValidationError(f"Invalid coordinate values: lat={lat}, lon={lon}")
+    if not (-90 <= lat_val <= 90):
+        raise GPXValidationError(f"Latitude {lat_val} out of range (-90, 90)")
+    if not (-180 <= lon_val <= 180):
+        raise GPXValidationError(f"Longitude {lon_val} out of range (-180, 180)")
 
 
 def validate_elevations(root):
     """Custom check for elevation values in lenient mode."""
     for trkpt in root.findall(".//{*}trkpt"):
-        ele_elem = trkpt.find("{*}ele")
-        if ele_elem is not None and ele_elem.text:
-            try:
-                ele_val = float(ele_elem.text)
-            except ValueError:
-                raise GPXValidationError(f"Invalid elevation value: {ele_elem.text}")
+        _check_trkpt_elevation(trkpt)
+
+
+def _check_trkpt_elevation(trkpt):
+    ele_elem = trkpt.find("{*}ele")
+    if ele_elem is not None and ele_elem.text:
+        try:
+            ele_val = float(ele_elem.text)
+        except ValueError:
+            raise GPXValidationError(f"Invalid elevation value: {ele_elem.text}")
 
 
 def validate_schema(tree, schema, strict, root=None):
@@ -81,14 +163,36 @@ def validate_schema(tree, schema, strict, root=None):
     perform a manual coordinate check.
     In strict mode, any schema violation will result in an error.
     """
-    if schema.validate(tree):
+    with _SCHEMA_VALIDATION_LOCKS.get(id(schema), nullcontext()):
+        valid = schema.validate(tree)
+        error_log = list(schema.error_log)
+    if valid:
         return  # Validation passed
 
+    _raise_for_schema_errors(error_log, strict)
+    # Lenient mode and only precision errors: run manual coordinate validation
+    validate_coordinates(root)
+    validate_elevations(root)
+    _log_lenient_schema_warning()
+
+
+def _log_lenient_schema_warning():
+    logger.warning("GPX file does not strictly conform to the schema (coordinate precision issues), "
+                   "but manual checks passed in lenient mode.")
+
+
+def _raise_for_schema_errors(error_log, strict):
+    """
+    Raise ``GPXValidationError`` for schema errors in ``error_log``, except, in
+    lenient mode, for errors that are solely about lat/lon or elevation
+    precision. The caller is responsible for checking those values manually.
+    """
     if strict:
-        error_messages = "\n".join(f"  {error.message}" for error in schema.error_log[:10])
+        shown = [error.message for error in error_log[:10]]
+        error_messages = "\n".join(f"  {error}" for error in shown)
         raise GPXValidationError(f"XML does not conform to the GPX schema (strict mode enabled):\n"
-                                  f"The first {min(10, len(schema.error_log))} errors (out of {len(schema.error_log)}) are:\n"
-                                  f"{error_messages}")
+                                  f"The first {min(10, len(error_log))} errors (out of {len(error_log)}) are:\n"
+                                  f"{error_messages}", errors=shown)
 
     # Lenient mode: check if errors are exclusively about lat/lon or elevation precision
 
@@ -96,103 +200,463 @@ def validate_schema(tree, schema, strict, root=None):
     allowed_keywords = ["latitudeType", "longitudeType", "ele"]
 
     # Filter out errors that are solely about these issues.
-    error_log = [e.message for e in schema.error_log]
+    error_log = [e.message for e in error_log]
     filtered_errors = [msg for msg in error_log if not any(keyword in msg for keyword in allowed_keywords)]
 
-    if len(filtered_errors) == 0:
-        # Run manual coordinate validation
-        validate_coordinates(root)
-        validate_elevations(root)
-        print("Warning: GPX file does not strictly conform to the schema (coordinate precision issues), "
-              "but manual checks passed in lenient mode.")
-    else:
+    if filtered_errors:
         error_messages = "\n".join(f"  {error}" for error in filtered_errors[:10])
         raise GPXValidationError(f"XML does not conform to the GPX schema ({len(filtered_errors)} errors):\n"
                                   f"The first {min(10, len(filtered_errors))} errors (out of {len(filtered_errors)}) are:\n"
-                                  f"{error_messages}")
+                                  f"{error_messages}", errors=filtered_errors[:10])
+
+
+class TimestampIssue(NamedTuple):
+    """A point whose timestamp does not come strictly after the last accepted one."""
+    track: int  # index of the track in the file
+    point: int  # index of the point in the track, across segments
+    time: dt
+    previous: dt
+
+    def __str__(self):
+        where = f"(track {self.track}, point {self.point})"
+        if self.time == self.previous:
+            return f"Duplicate timestamp found in track: {self.time} {where}"
+        return f"Timestamps not strictly increasing: {self.time} does not come after {self.previous} {where}"
+
+
+def _raise_for_timestamp_issues(issues, total):
+    if not issues:
+        return
+    if total == 1:
+        raise GPXValidationError(str(issues[0]))
+    messages = "\n".join(f"  {issue}" for issue in issues)
+    raise GPXValidationError(f"Found {total} timestamp errors, the first {len(issues)} are:\n{messages}",
+                             errors=[str(issue) for issue in issues])
+
+
+def find_timestamp_issues(root, limit=_MAX_REPORTED_ERRORS):
+    """
+    Return ``(issues, total)``: up to ``limit`` points whose timestamp is not
+    strictly later than the last accepted timestamp of the same track, and the
+    total number of such points.
+
+    Strictly increasing timestamps are also unique, so comparing every point
+    with the last accepted one finds both duplicates and backward jumps in
+    linear time. An offending point is not accepted, so a single glitch does
+    not make all following points fail.
+    """
+    issues = []
+    total = 0
+    # Using a namespace-agnostic search with {*}
+    for track_index, trk in enumerate(root.iterfind(".//{*}trk")):
+        previous = None
+        # Points of all segments, in document order.
+        for point_index, trkpt in enumerate(trk.iterfind(".//{*}trkseg/{*}trkpt")):
+            time_elem = trkpt.find("{*}time")
+            if time_elem is None or not time_elem.text:
+                continue
+            try:
+                # GPX timestamps are typically in ISO8601 format ending with 'Z' (UTC).
+                t = parse_timestamp(time_elem.text)
+            except ValueError:
+                raise GPXValidationError(f"Invalid timestamp format: {time_elem.text}")
+            if previous is not None and t <= previous:
+                total += 1
+                if len(issues) < limit:
+                    issues.append(TimestampIssue(track_index, point_index, t, previous))
+                continue
+            previous = t
+    return issues, total
 
 
-def check_timestamp_consistency(root):
+def check_timestamp_consistency(root, limit=_MAX_REPORTED_ERRORS):
     """
     For each track that has at least one timestamped point, ensure that:
       - Timestamps appear in strictly increasing order.
       - No two distinct points have the same timestamp.
+
+    All offending points are collected; the error lists the first ``limit``.
     """
-    # Using a namespace-agnostic search with {*}
-    tracks = root.findall(".//{*}trk")
-    if not tracks:
-        # No tracks in the file.
-        return
+    _raise_for_timestamp_issues(*find_timestamp_issues(root, limit))
 
-    # Iterate over each track.
-    for trk in tracks:
-        # List to store timestamps (in order) for the current track.
-        timestamps = []
-        # Process each track segment (trkseg) in the order they appear.
-        for trkseg in trk.findall(".//{*}trkseg"):
-            for trkpt in trkseg.findall("{*}trkpt"):
-                time_elem = trkpt.find("{*}time")
-                if time_elem is not None and time_elem.text:
-                    try:
-                        # GPX timestamps are typically in ISO8601 format ending with 'Z' (UTC).
-                        t = parse_timestamp(time_elem.text)
-                    except ValueError:
-                        print(f"Invalid timestamp format: {time_elem.text}")
-                        sys.exit(1)
-                    # Check for duplicate timestamp (i.e. same time appears more than once in this track)
-                    if t in timestamps:
-                        raise GPXValidationError(f"Duplicate timestamp found in track: {t}")
-                    # If there is a previous timestamp, ensure the current one is later.
-                    if timestamps and t <= timestamps[-1]:
-                        raise GPXValidationError(f"Timestamps not strictly increasing: {t} does not come after {timestamps[-1]}")
-                    timestamps.append(t)
+
+def set_validation_cache(cache):
+    """
+    Use ``cache`` (a :class:`ValidationCache`, a path to its database, or
+    ``None`` to disable caching) for all subsequent validations in this process.
+    """
+    global _validation_cache, _validation_cache_configured
+    if cache is not None and not isinstance(cache, ValidationCache):
+        cache = ValidationCache(cache)
+    _validation_cache = cache
+    _validation_cache_configured = True
+
+
+def get_validation_cache():
+    """Return the active :class:`ValidationCache`, or ``None`` if caching is off."""
+    if not _validation_cache_configured:
+        set_validation_cache(os.environ.get(_CACHE_ENV_VAR) or None)
+    return _validation_cache
+
+
+def validate_cached(file_path, strict, validate):
+    """
+    Run ``validate(file_path, strict)`` through the active result cache.
+
+    ``validate`` returns ``(version, track count, point count)`` like
+    :func:`validate_tree` and :func:`validate_stream`. It is not called at
+    all when there is a cached verdict for byte-identical content; that
+    verdict is replayed instead: its warnings are logged again and a failure
+    raises the same ``GPXValidationError``.
+    """
+    cache = get_validation_cache()
+    if cache is None:
+        return validate(file_path, strict)
+
+    digest = cache.file_digest(file_path)
+    stat = os.stat(file_path)
+    version = _peek_unchanged_file_version(os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    result = cache.get(digest, version, strict)
+    if result is not None:
+        for message in result["warnings"]:
+            logger.warning(message)
+        if not result["valid"]:
+            raise GPXValidationError(result["message"], errors=result["errors"])
+        logger.info("GPX file is valid (cached result).")
+        return result["version"], result["tracks"], result["points"]
+
+    with _collect_warnings() as warnings:
+        try:
+            version, tracks, points = validate(file_path, strict)
+        except GPXValidationError as e:
+            cache.put(digest, version, strict, {"valid": False, "message": str(e), "errors": e.errors,
+                                                "warnings": warnings})
+            raise
+    cache.put(digest, version, strict, {"valid": True, "version": version, "tracks": tracks, "points": points,
+                                        "warnings": warnings})
+    return version, tracks, points
 
 
 def validate_gpx(file_path, strict=False):
-    """Run the full validation procedure on the provided GPX file."""
+    """Run the full validation procedure on the provided GPX file.
+
+    Results are reused from the validation cache when one is active, see
+    :func:`set_validation_cache`.
+    """
+    validate_cached(file_path, strict, _validate_document)
+    return True
+
+
+def _validate_document(file_path, strict):
+    """Validate a parsed document; return ``(version, track count, point count)``."""
     # Step 1. Parse the file as XML.
-    tree = parse_gpx(file_path)
+    return validate_tree(parse_gpx(file_path), strict)
+
+
+def validate_tree(tree, strict):
+    """Validate an already parsed document; return ``(version, track count, point count)``."""
     root = tree.getroot()
 
     # Step 2. Determine GPX version from the root element.
     version = root.get("version")
-    if version not in ("1.0", "1.1"):
-        print(f"Unsupported or missing GPX version: {version}")
-        sys.exit(1)
+    if version not in _SUPPORTED_VERSIONS:
+        raise GPXValidationError(f"Unsupported or missing GPX version: {version}")
 
     # Step 3. Validate against the corresponding GPX XSD.
-    schema = load_schema(version)
+    schema = get_schema(version)
     # Note: lenient mode is the default behavior; strict mode is enabled via command-line flag.
     validate_schema(tree, schema, strict=strict, root=root)
-    print("XML schema validation passed.")
+    logger.info("XML schema validation passed.")
 
     # Step 4. GPX-specific content check.
     tracks = root.findall(".//{*}trk")
     if not tracks:
-        print("Warning: No tracks found in the GPX file.")
+        logger.warning("No tracks found in the GPX file.")
 
     # Step 5. Timestamp consistency check.
     check_timestamp_consistency(root)
-    print("Timestamp consistency check passed.")
+    logger.info("Timestamp consistency check passed.")
+
+    logger.info("GPX file is valid.")
+    return version, len(tracks), sum(1 for _ in root.iterfind(".//{*}trkpt"))
 
-    print("GPX file is valid.")
+
+@lru_cache(maxsize=1024)
+def _peek_unchanged_file_version(file_path, size, mtime_ns, inode):
+    # size, mtime and inode only make the cache key change with the file
+    return _peek_gpx_version(file_path)
+
+
+def _peek_gpx_version(file_path):
+    """Read the ``version`` attribute of the root element without parsing the rest."""
+    parser = etree.XMLPullParser(events=("start",))
+    try:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(4096), b""):
+                parser.feed(chunk)
+                for _event, elem in parser.read_events():
+                    return elem.get("version")
+        parser.close()
+    except etree.XMLSyntaxError as e:
+        raise GPXValidationError(f"XML Syntax Error: {e}")
+
+
+def validate_gpx_streaming(file_path, strict=False):
+    """
+    Validate a GPX file in a single streaming pass with bounded memory.
+
+    The document is read with ``etree.iterparse`` while lxml validates it
+    against the XSD. Coordinate, elevation (lenient mode only) and timestamp
+    checks run on each ``trkpt`` as soon as it is parsed, and parsed elements
+    are freed right away, so memory stays flat for arbitrarily long logs.
+    Coordinate and elevation errors are reported as soon as they are found,
+    i.e. possibly before schema errors later in the file; timestamp errors are
+    collected and reported together after the pass.
+    """
+    validate_cached(file_path, strict, validate_stream)
     return True
 
 
+def validate_stream(file_path, strict, on_event=None):
+    """Streaming counterpart of :func:`validate_tree`, reading the file itself.
+
+    If ``on_event`` is given, it is called as ``on_event(event, element)`` for
+    every ``start``, ``end``, ``comment`` and ``pi`` event of the document,
+    after the checks of that element, and is then responsible for freeing
+    parsed elements. Events inside a ``trkpt`` are passed on after the checks
+    of the whole point. This lets a caller transform the document in the same
+    pass.
+    """
+    version = _peek_gpx_version(file_path)
+    if version not in _SUPPORTED_VERSIONS:
+        raise GPXValidationError(f"Unsupported or missing GPX version: {version}")
+    schema = get_schema(version)
+
+    tracks = 0
+    points = 0
+    previous = None
+    point_index = 0
+    issues = []
+    issue_count = 0
+    finished = False
+    deferred = None  # events inside the current trkpt, passed on after its checks
+    # iterparse reports errors from lxml's per-thread error log, which would
+    # otherwise still hold the errors of earlier documents
+    etree.clear_error_log()
+    if on_event is None:
+        events = etree.iterparse(file_path, events=("start", "end"), schema=schema,
+                                 tag=("{*}gpx", "{*}trk", "{*}trkpt"))
+    else:
+        events = etree.iterparse(file_path, events=("start", "end", "comment", "pi"), schema=schema,
+                                 huge_tree=True)
+    try:
+        for event, elem in events:
+            if event != "start" and event != "end":
+                if deferred is not None:
+                    deferred.append((event, elem))
+                else:
+                    on_event(event, elem)
+                continue
+            name = elem.tag.rpartition("}")[2]
+            if event == "start":
+                if name == "trk":
+                    tracks += 1
+                    previous = None
+                    point_index = 0
+                if deferred is not None:
+                    deferred.append((event, elem))
+                elif on_event is not None:
+                    on_event(event, elem)
+                    if name == "trkpt":
+                        deferred = []
+                continue
+            if deferred is not None and name != "trkpt":
+                deferred.append((event, elem))
+                continue
+            if name == "trkpt":
+                points += 1
+                if not strict:
+                    _check_trkpt_coordinates(elem)
+                    _check_trkpt_elevation(elem)
+                time_elem = elem.find("{*}time")
+                if time_elem is not None and time_elem.text:
+                    try:
+                        t = parse_timestamp(time_elem.text)
+                    except ValueError:
+                        raise GPXValidationError(f"Invalid timestamp format: {time_elem.text}")
+                    if previous is not None and t <= previous:
+                        issue_count += 1
+                        if len(issues) < _MAX_REPORTED_ERRORS:
+                            issues.append(TimestampIssue(tracks - 1, point_index, t, previous))
+                    else:
+                        previous = t
+                point_index += 1
+            if name == "gpx":
+                finished = True
+            if on_event is not None:
+                for deferred_event in deferred or ():
+                    on_event(*deferred_event)
+                deferred = None
+                on_event(event, elem)
+            elif name != "gpx":
+                # free everything parsed so far
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+    except etree.XMLSyntaxError as e:
+        schema_errors = [error for error in e.error_log if error.domain == etree.ErrorDomains.SCHEMASV]
+        if not finished or len(schema_errors) < len(e.error_log):
+            raise GPXValidationError(f"XML Syntax Error: {e}")
+        _raise_for_schema_errors(schema_errors, strict)
+        _log_lenient_schema_warning()
+    logger.info("XML schema validation passed.")
+
+    if not tracks:
+        logger.warning("No tracks found in the GPX file.")
+    _raise_for_timestamp_issues(issues, issue_count)
+    logger.info("Timestamp consistency check passed.")
+    logger.info("GPX file is valid.")
+    return version, tracks, points
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@contextmanager
+def _collect_warnings():
+    handler = _ListHandler()
+    logger.addHandler(handler)
+    try:
+        yield handler.messages
+    finally:
+        logger.removeHandler(handler)
+
+
+def validate_file(file_path, strict=False, stream=False):
+    """
+    Validate one GPX file and return a JSON-serializable report instead of raising.
+
+    The report has the keys ``file``, ``valid``, ``errors``, ``warnings``,
+    ``version``, ``tracks``, ``points`` and ``seconds``. Version and counts are
+    ``None`` when the file is invalid.
+    """
+    record = {"file": str(file_path), "valid": False, "errors": [], "warnings": [],
+              "version": None, "tracks": None, "points": None}
+    start = time.perf_counter()
+    with _collect_warnings() as warnings:
+        try:
+            validate = validate_stream if stream else _validate_document
+            record["version"], record["tracks"], record["points"] = validate_cached(file_path, strict, validate)
+            record["valid"] = True
+        except GPXValidationError as e:
+            record["errors"] = e.errors
+        except OSError as e:
+            record["errors"] = [f"Cannot read file: {e}"]
+    record["warnings"] = warnings
+    record["seconds"] = round(time.perf_counter() - start, 6)
+    return record
+
+
+def _validate_file_job(job):
+    file_path, strict, stream = job
+    return validate_file(file_path, strict=strict, stream=stream)
+
+
+def expand_gpx_paths(patterns):
+    """
+    Expand files, directories (searched recursively for ``*.gpx``) and glob
+    patterns into a sorted list of unique paths. Entries that match nothing
+    are kept as they are, so that they are reported as unreadable.
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "**", "*.gpx"), recursive=True)
+        elif glob.has_magic(pattern):
+            matches = [path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path)]
+        else:
+            matches = [pattern]
+        paths.extend(sorted(matches))
+    return list(dict.fromkeys(paths))
+
+
+def validate_files(file_paths, strict=False, stream=False, jobs=1):
+    """
+    Validate many files, ``jobs`` at a time in a process pool; yield the report
+    of each file (see :func:`validate_file`) in input order.
+
+    Every worker compiles each schema once and reuses it for all its files.
+    """
+    job_args = [(path, strict, stream) for path in file_paths]
+    if jobs <= 1 or len(job_args) <= 1:
+        yield from map(_validate_file_job, job_args)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(_validate_file_job, job_args, chunksize=max(1, len(job_args) // (jobs * 4)))
+
+
+def _print_report(record):
+    if record["valid"]:
+        print(f"{record['file']}: OK ({record['points']} points, {record['seconds']:.2f} s)")
+    else:
+        print(f"{record['file']}: FAILED")
+    for message in record["errors"]:
+        print(f"  error: {message}")
+    for message in record["warnings"]:
+        print(f"  warning: {message}")
+
+
 def main():
     parser = argparse.ArgumentParser(
-        description="Validate a GPX file for XML schema and timestamp consistency.\n"
+        description="Validate GPX files for XML schema and timestamp consistency.\n"
                     "By default, the validator runs in lenient mode (extra precision is allowed).\n"
                     "Use --strict to enforce strict schema compliance."
     )
-    parser.add_argument("gpx_file", help="Path to the GPX file to validate")
+    parser.add_argument("gpx_files", nargs="+", metavar="DIR_OR_GLOB",
+                        help="GPX file(s), directories (searched recursively) or glob patterns")
     parser.add_argument("--strict", action="store_true", help="Enable strict mode (default is lenient)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Validate in a single streaming pass with bounded memory (for very large files)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes for batch validation (default: number of CPUs)")
+    parser.add_argument("--json", action="store_true",
+                        help="Print one JSON record per file (JSON Lines) instead of text")
+    parser.add_argument("--cache", metavar="PATH", default=os.environ.get(_CACHE_ENV_VAR),
+                        help="Reuse validation results stored in this SQLite file for unchanged files "
+                             f"(default: ${_CACHE_ENV_VAR}, if set)")
 
     args = parser.parse_args()
-    try:
-        validate_gpx(args.gpx_file, strict=args.strict)
-    except GPXValidationError as e:
-        print(e, file=sys.stderr)
+    set_validation_cache(args.cache)
+    single_file = len(args.gpx_files) == 1 and os.path.isfile(args.gpx_files[0])
+    if single_file and not args.json:
+        logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+        validate = validate_gpx_streaming if args.stream else validate_gpx
+        try:
+            validate(args.gpx_files[0], strict=args.strict)
+        except GPXValidationError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        return
+
+    paths = expand_gpx_paths(args.gpx_files)
+    if not paths:
+        parser.error("no GPX files found")
+    failed = 0
+    for record in validate_files(paths, strict=args.strict, stream=args.stream, jobs=args.jobs):
+        failed += not record["valid"]
+        if args.json:
+            print(json.dumps(record), flush=True)
+        else:
+            _print_report(record)
+    if not args.json:
+        print(f"{len(paths) - failed} of {len(paths)} files valid.")
+    if failed:
         sys.exit(1)
 
 
@@ -0,0 +1,47 @@
+import sqlite3
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from gpx_player.basemap import _lat_to_tile_y, _lon_to_tile_x, read_mbtiles_basemap
+
+
+def _write_mbtiles(path, zoom, tiles):
+    """Write ``{(x, y): rgb}`` XYZ tiles of a single colour into an MBTiles file."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+    conn.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+    for (x, y), rgb in tiles.items():
+        buf = BytesIO()
+        Image.new("RGB", (256, 256), rgb).save(buf, format="PNG")
+        conn.execute("INSERT INTO tiles VALUES (?, ?, ?, ?)", (zoom, x, 2 ** zoom - 1 - y, buf.getvalue()))
+    conn.commit()
+    conn.close()
+
+
+def test_read_mbtiles_basemap_stitches_tiles(tmp_path):
+    zoom = 14
+    lon_min, lon_max, lat_min, lat_max = 9.79, 9.82, 53.53, 53.55
+    xs = range(int(_lon_to_tile_x(lon_min, zoom)), int(_lon_to_tile_x(lon_max, zoom)) + 1)
+    ys = range(int(_lat_to_tile_y(lat_max, zoom)), int(_lat_to_tile_y(lat_min, zoom)) + 1)
+    assert len(xs) > 1 and len(ys) > 1
+    # west half red, east half blue; the northernmost row is missing
+    tiles = {(x, y): (255, 0, 0) if x == xs[0] else (0, 0, 255) for x in xs for y in ys if y != ys[0]}
+    path = tmp_path / "map.mbtiles"
+    _write_mbtiles(str(path), zoom, tiles)
+
+    image, extent = read_mbtiles_basemap(str(path), lon_min, lon_max, lat_min, lat_max, 200, 100)
+
+    assert image.shape == (100, 200, 3)
+    assert extent == (lon_min, lon_max, lat_min, lat_max)
+    assert tuple(image[-1, 0]) == (255, 0, 0)
+    assert tuple(image[-1, -1]) == (0, 0, 255)
+    assert tuple(image[0, 0]) == (255, 255, 255)
+
+
+def test_read_mbtiles_basemap_rejects_empty_file(tmp_path):
+    path = tmp_path / "empty.mbtiles"
+    _write_mbtiles(str(path), 10, {})
+    with pytest.raises(ValueError, match="no tiles"):
+        read_mbtiles_basemap(str(path), 9.0, 10.0, 53.0, 54.0, 10, 10)
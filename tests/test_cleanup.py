@@ -1,9 +1,11 @@
+import gzip
 import shutil
 from pathlib import Path
 
 import pytest
+from lxml import etree
 
-from gpx_player.clean_gpx import clean_gpx_file
+from gpx_player.clean_gpx import clean_gpx_file, clean_gpx_files
 from gpx_player.validator import GPXValidationError
 
 
@@ -40,3 +42,49 @@ def test_clean_gpx_file_invalid(tmp_path):
     with pytest.raises(GPXValidationError):
         clean_gpx_file(str(temp))
 
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_clean_gpx_file_single_pass(tmp_path, stream):
+    src = Path("example-data/osm-demo-Alex.gpx")
+    temp = tmp_path / src.name
+    shutil.copy(src, temp)
+
+    cleaned, removed = clean_gpx_file(str(temp), stream=stream)
+
+    assert removed == 1909
+    expected = etree.parse(str(src))
+    for node in expected.xpath('//*[local-name()="extensions"]'):
+        node.getparent().remove(node)
+    assert etree.tostring(etree.parse(cleaned), method="c14n") == etree.tostring(expected, method="c14n")
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_clean_gpx_file_invalid_writes_nothing(tmp_path, stream):
+    for name in ("wrong-timestamp-order.gpx", "duplicate-timestamps.gpx"):
+        temp = tmp_path / name
+        shutil.copy(Path("example-data") / name, temp)
+        with pytest.raises(GPXValidationError):
+            clean_gpx_file(str(temp), overwrite=True, stream=stream)
+        assert temp.read_bytes() == (Path("example-data") / name).read_bytes()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["duplicate-timestamps.gpx", "wrong-timestamp-order.gpx"]
+
+
+def test_clean_gpx_files_in_process_pool(tmp_path):
+    names = ["track1.gpx", "track2.gpx", "wrong-timestamp-order.gpx"]
+    for name in names:
+        shutil.copy(Path("example-data") / name, tmp_path / name)
+
+    results = list(clean_gpx_files([str(tmp_path / name) for name in names], compress=True, jobs=2))
+
+    assert [result[0] for result in results] == [str(tmp_path / name) for name in names]
+    assert [result[2] for result in results] == [511, 337, 0]
+    assert results[0][1] == str(tmp_path / "track1_noext.gpx.gz") and results[0][3] is None
+    assert results[2][1] is None and "not strictly increasing" in results[2][3]
+    with gzip.open(results[1][1]) as f:
+        assert b"<extensions>" not in f.read()
+
+
+def test_clean_gpx_files_reports_unreadable_files(tmp_path):
+    ((gpx_file, cleaned, removed, error),) = clean_gpx_files([str(tmp_path / "missing.gpx")])
+    assert cleaned is None and removed == 0
+    assert "No such file" in error
@@ -0,0 +1,173 @@
+import argparse
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from gpx_player.filters import (
+    filter_track, median_smooth, parse_median_window, reject_spikes, simplify_indices, spike_mask, stationary_groups,
+)
+from gpx_player.openseamap import accumulate_distances, create_map
+from gpx_player.utils import EARTH_RADIUS
+
+
+def _straight_track(n=50, step_deg=0.0001):
+    # ~6.7 m per second along a parallel: about 13 kn
+    lat = np.full(n, 54.0)
+    lon = 10.0 + step_deg * np.arange(n)
+    seconds = np.arange(n, dtype=float)
+    return lat, lon, seconds
+
+
+def test_spike_mask_finds_isolated_spikes():
+    lat, lon, seconds = _straight_track()
+    lat[10] += 0.01  # ~1 km off the track for one second
+    lat[30] += 0.01
+    lat[31] += 0.01  # two-fix spike
+
+    mask = spike_mask(lat, lon, seconds, max_speed=20)
+    assert np.flatnonzero(mask).tolist() == [10, 30, 31]
+
+    lat[12] -= 0.01  # another spike, two fixes later
+    keep = reject_spikes(lat, lon, seconds, max_speed=20)
+    assert sorted(set(range(50)) - set(keep.tolist())) == [10, 12, 30, 31]
+
+
+def test_spike_mask_keeps_fast_but_consistent_motion():
+    lat, lon, seconds = _straight_track()
+    # every fix is "too fast", but skipping one is too fast as well
+    assert not spike_mask(lat, lon, seconds, max_speed=5).any()
+    assert not spike_mask(lat[:2], lon[:2], seconds[:2], max_speed=5).any()
+
+
+def test_spike_mask_acceleration_rule():
+    lat, lon, seconds = _straight_track(step_deg=0.00001)  # ~1.3 kn
+    lon[20] += 0.0002  # a 13 m jump forward and back: slower than max_speed
+    assert not spike_mask(lat, lon, seconds, max_speed=30).any()
+    assert np.flatnonzero(spike_mask(lat, lon, seconds, max_speed=30, max_acceleration=3.0)).tolist() == [20]
+
+
+def test_median_smooth():
+    values = np.array([1.0, 1.0, 9.0, 1.0, 1.0, 2.0])
+    assert median_smooth(values, 3).tolist() == [1.0, 1.0, 1.0, 1.0, 1.0, 2.0]
+    assert median_smooth(values, 1).tolist() == values.tolist()
+    with pytest.raises(ValueError):
+        median_smooth(values, 4)
+
+
+def test_simplify_indices():
+    lat, lon, _seconds = _straight_track(n=101)
+    assert simplify_indices(lat, lon, 1.0).tolist() == [0, 100]
+    assert simplify_indices(lat[:2], lon[:2], 1.0).tolist() == [0, 1]
+
+    lat[40] += 0.001  # ~111 m to the side
+    keep = simplify_indices(lat, lon, 1.0)
+    assert keep.tolist() == [0, 39, 40, 41, 100]
+    assert simplify_indices(lat, lon, 0).tolist() == list(range(101))
+
+    # a wiggly track: every dropped fix is within the tolerance of the kept line
+    rng = np.random.default_rng(1)
+    lat = 54.0 + np.cumsum(rng.normal(0, 1e-4, 500))
+    lon = 10.0 + np.cumsum(rng.normal(0, 1e-4, 500))
+    keep = simplify_indices(lat, lon, 5.0)
+    assert keep[0] == 0 and keep[-1] == 499 and np.all(np.diff(keep) > 0)
+    y = EARTH_RADIUS * np.radians(lat)
+    x = EARTH_RADIUS * np.radians(lon) * np.cos(np.radians(lat.mean()))
+    for first, last in zip(keep, keep[1:]):
+        inner = np.arange(first + 1, last)
+        t = np.linspace(0, 1, 200)[:, None]
+        line_x = x[first] + t * (x[last] - x[first])
+        line_y = y[first] + t * (y[last] - y[first])
+        assert np.all(np.hypot(line_x - x[inner], line_y - y[inner]).min(axis=0) <= 5.0 + 0.5)
+
+
+def test_stationary_groups():
+    lat, lon, _seconds = _straight_track(n=10)
+    first, last = stationary_groups(lat, lon, 1.0)
+    assert first.tolist() == last.tolist() == list(range(10))
+
+    lat = np.concatenate([lat[:3], np.full(100, lat[3]), lat[4:]])
+    lon = np.concatenate([lon[:3], lon[3] + 2e-6 * np.sin(np.arange(100)), lon[4:]])  # jitter of ~13 cm
+    first, last = stationary_groups(lat, lon, 1.0)
+    assert first.tolist() == [0, 1, 2, 3, 103, 104, 105, 106, 107, 108]
+    assert last.tolist() == [0, 1, 2, 102, 103, 104, 105, 106, 107, 108]
+
+    # slow drift: the run is split where it leaves the radius around its first fix
+    lat = 54.0 + np.arange(10) * 0.4 / EARTH_RADIUS * 180 / np.pi
+    first, last = stationary_groups(lat, np.full(10, 10.0), 1.0)
+    assert first.tolist() == [0, 3, 6, 9] and last.tolist() == [2, 5, 8, 9]
+
+
+def test_filter_track_reduces_distance():
+    t0 = dt.datetime(2024, 6, 15, 12, tzinfo=dt.timezone.utc)
+    lat, lon, _seconds = _straight_track()
+    points = [{'lat': la, 'lon': lo, 'time': t0 + dt.timedelta(seconds=i)} for i, (la, lo) in enumerate(zip(lat, lon))]
+    points[25] = dict(points[25], lat=54.05)
+    track = {'name': 'noisy', 'points': points}
+
+    filtered, removed = filter_track(track, max_speed=20)
+
+    assert removed == 1 and len(track['points']) == 50
+    assert filtered['points'][0] is points[0]
+    assert accumulate_distances(filtered['points'])[-1] < 0.2 < accumulate_distances(points)[-1]
+
+    smoothed, removed = filter_track(track, max_speed=20, median_window=5, passes=0)
+    assert removed == 0 and smoothed['points'][25]['lat'] == 54.0
+
+
+def test_create_map_removes_spikes_by_default(tmp_path):
+    t0 = dt.datetime(2024, 6, 15, 12, tzinfo=dt.timezone.utc)
+    lat, lon, _seconds = _straight_track(n=10, step_deg=0.00001)
+    lat[5] += 0.01
+    pts = "".join(
+        f'<trkpt lat="{la}" lon="{lo}"><time>{(t0 + dt.timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%SZ")}</time></trkpt>'
+        for i, (la, lo) in enumerate(zip(lat, lon))
+    )
+    path = tmp_path / "spike.gpx"
+    path.write_text(f'<gpx version="1.1" creator="pytest" xmlns="http://www.topografix.com/GPX/1/1">'
+                    f'<trk><name>Spiky</name><trkseg>{pts}</trkseg></trk></gpx>')
+
+    _map, all_tracks, _max_speed, _map_id = create_map([str(path)], names=None, max_speed=12.0)
+    assert len(all_tracks[0]['points']) == 9
+    assert all_tracks[0]['diagnostics'].counts == {"spikes_removed": 1}
+
+    _map, all_tracks, _max_speed, _map_id = create_map([str(path)], names=None, max_speed=12.0, spike_filter=False)
+    assert len(all_tracks[0]['points']) == 10
+
+
+def test_create_map_collapses_stationary_runs(tmp_path):
+    t0 = dt.datetime(2024, 6, 15, 12, tzinfo=dt.timezone.utc)
+    lat, lon, _seconds = _straight_track(n=10)
+    lat = np.concatenate([lat[:3], np.full(50, lat[3]), lat[4:]])  # waiting at the start for 50 s
+    lon = np.concatenate([lon[:3], np.full(50, lon[3]), lon[4:]])
+    pts = "".join(
+        f'<trkpt lat="{la}" lon="{lo}"><time>{(t0 + dt.timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%SZ")}</time></trkpt>'
+        for i, (la, lo) in enumerate(zip(lat, lon))
+    )
+    path = tmp_path / "dock.gpx"
+    path.write_text(f'<gpx version="1.1" creator="pytest" xmlns="http://www.topografix.com/GPX/1/1">'
+                    f'<trk><name>Dock</name><trkseg>{pts}</trkseg></trk></gpx>')
+
+    _map, (full,), _max_speed, _map_id = create_map([str(path)], names=None, max_speed=20.0)
+    _map, (track,), _max_speed, _map_id = create_map([str(path)], names=None, max_speed=20.0,
+                                                     stationary_radius=1.0)
+
+    assert len(full['points']) == 59 and len(track['points']) == 10
+    assert track['points'][3]['time'] == t0 + dt.timedelta(seconds=3)
+    assert track['points'][3]['until'] == t0 + dt.timedelta(seconds=52)
+    assert 'until' not in track['points'][4]
+    assert len(track['seg_speeds']) == 9
+    assert track['seg_speeds'][3] == full['seg_speeds'][52] > 10
+    assert track['distances'][-1] == full['distances'][-1]
+    assert track['avg_speeds'][-1] == full['avg_speeds'][-1]
+
+
+@pytest.mark.parametrize("value, expected", [("0", 0), ("3", 3), ("7", 7)])
+def test_parse_median_window(value, expected):
+    assert parse_median_window(value) == expected
+
+
+@pytest.mark.parametrize("value", ["1", "2", "4", "-3", "five"])
+def test_parse_median_window_rejects_other_values(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_median_window(value)
@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+import pytest
+
+from gpx_player.diagnostics import TrackDiagnostics
+from gpx_player.kinematics import TrackAccumulator
+from gpx_player.openseamap import (
+    accumulate_distances, calculate_average_speeds, calculate_speeds, create_map, parse_gpx,
+)
+from gpx_player.utils import epoch_ms
+
+
+def _columns(path):
+    points = [p for track in parse_gpx(path) for p in track['points']]
+    lat = np.array([p['lat'] for p in points])
+    lon = np.array([p['lon'] for p in points])
+    return points, lat, lon, epoch_ms(p['time'] for p in points)
+
+
+@pytest.mark.parametrize("path", ["example-data/track1.gpx", "example-data/wrong-timestamp-order.gpx"])
+def test_extend_matches_whole_track_functions(path):
+    points, lat, lon, times_ms = _columns(path)
+    expected_diagnostics, diagnostics = TrackDiagnostics("expected"), TrackDiagnostics("batch")
+    accumulator = TrackAccumulator(5.0, diagnostics)
+    columns = accumulator.extend(lat, lon, times_ms)
+
+    distances = accumulate_distances(points)
+    assert columns.speeds.tolist() == pytest.approx([0.0] + calculate_speeds(points, 5.0, expected_diagnostics))
+    assert columns.distances.tolist() == pytest.approx(distances)
+    assert columns.avg_speeds.tolist() == pytest.approx(calculate_average_speeds(points, distances))
+    assert diagnostics.counts == expected_diagnostics.counts
+    assert accumulator.distance == pytest.approx(distances[-1])
+    assert accumulator.top_speed == pytest.approx(max(columns.speeds))
+    assert accumulator.average_speed == pytest.approx(columns.avg_speeds[-1])
+
+
+def test_single_fixes_batches_and_resume_agree():
+    _points, lat, lon, times_ms = _columns("example-data/track1.gpx")
+    whole = TrackAccumulator(12.0)
+    columns = whole.extend(lat, lon, times_ms)
+
+    single = TrackAccumulator(12.0)
+    headings = []
+    for la, lo, t in zip(lat.tolist(), lon.tolist(), times_ms.tolist()):
+        single.add(la, lo, t)
+        headings.append(single.heading)
+    assert headings[1:] == pytest.approx(columns.headings[1:].tolist())
+
+    resumed = TrackAccumulator(12.0)
+    parts = []
+    for chunk in np.array_split(np.arange(len(lat)), 7):
+        parts.append(resumed.extend(lat[chunk], lon[chunk], times_ms[chunk]))
+        resumed = TrackAccumulator.from_dict(json.loads(json.dumps(resumed.to_dict())))
+    assert np.concatenate([part.distances for part in parts]) == pytest.approx(columns.distances)
+    assert np.concatenate([part.avg_speeds for part in parts]) == pytest.approx(columns.avg_speeds)
+    assert single.to_dict() == pytest.approx(whole.to_dict())
+    assert resumed.to_dict() == pytest.approx(whole.to_dict())
+
+
+def test_heading_is_kept_while_stationary():
+    accumulator = TrackAccumulator()
+    columns = accumulator.extend([54.0, 54.0, 54.001, 54.001, 54.001], [10.0, 10.0, 10.0, 10.001, 10.001],
+                                 [0, 1000, 2000, 3000, 4000])
+    assert np.isnan(columns.headings[:2]).all()
+    assert columns.headings[2:].tolist() == pytest.approx([0.0, 90.0, 90.0], abs=0.01)
+    assert accumulator.heading == pytest.approx(90.0, abs=0.01)
+    assert accumulator.speed == 0.0 and accumulator.to_dict()['max_speed'] is None
+
+    accumulator.add(54.0, 10.001, 5000)
+    assert accumulator.heading == pytest.approx(180.0, abs=0.01)
+    assert accumulator.speed == pytest.approx(111.2 * 1.94384, rel=1e-2)
+
+
+def test_create_map_tracks_carry_kinematics():
+    _map, (track,), _max_speed, _map_id = create_map(["example-data/track1.gpx"], None, 12.0)
+    kinematics = track['kinematics']
+    assert kinematics.count == len(track['points'])
+    assert kinematics.distance == pytest.approx(track['distances'][-1])
+    assert kinematics.last_time_ms == track['times_ms'][-1]
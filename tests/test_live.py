@@ -0,0 +1,392 @@
+import http.client
+import io
+import json
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from gpx_player.live import (
+    Fix, GpxSource, LiveServer, LiveTrack, LiveTracker, NmeaFileSource, NmeaSocketSource, make_source,
+    parse_nmea_rmc,
+)
+from gpx_player.openseamap import create_map
+from gpx_player.replay import GpxLogWriter, NmeaLogWriter, format_rmc, read_fixes, replay
+
+
+def test_nmea_rmc_round_trip():
+    fix = Fix(-33.5, -70.25, 1700000000123)
+    sentence = format_rmc(fix)
+    assert sentence == "$GPRMC,221320.123,A,3330.0000,S,07015.0000,W,,,141123,,,A*65"
+    assert parse_nmea_rmc(sentence + "\r\n") == fix
+
+    assert parse_nmea_rmc(sentence[:-2] + "00") is None  # wrong checksum
+    assert parse_nmea_rmc(sentence.replace(",A,", ",V,", 1).split("*")[0]) is None  # void fix
+    assert parse_nmea_rmc("$GPGGA,221320.12,3330.0000,S,07015.0000,W,1,08,0.9,0,M,,,,") is None
+    assert parse_nmea_rmc("garbage") is None
+
+
+def test_gpx_source_reads_only_complete_appended_points(tmp_path):
+    path = tmp_path / "boat.gpx"
+    fixes = [Fix(54.0, 10.0 + i / 1000, 1718452800000 + i * 1000) for i in range(3)]
+    buffer = io.StringIO()
+    buffer.close = lambda: None
+    writer = GpxLogWriter(buffer, "Boat")
+    for fix in fixes:
+        writer.write(fix)
+    writer.close()
+    text = buffer.getvalue()
+    split = text.index("<time>", text.index(str(fixes[1].lon)))
+
+    source = make_source(str(path))
+    assert isinstance(source, GpxSource) and source.name == "boat"
+    assert source.read() == []  # not created yet
+    path.write_text(text[:split])
+    assert source.read() == fixes[:1]
+    with path.open("a") as log:
+        log.write(text[split:])
+    assert source.read() == fixes[1:]
+    assert source.read() == []
+
+    # a log that is started again is read from the beginning
+    path.write_text(text[:split])
+    assert source.read() == fixes[:1]
+    source.close()
+
+
+def test_gpx_source_follows_rewritten_closing_tags(tmp_path):
+    # loggers that keep the file well-formed seek back over the closing tags and write them again after each fix
+    path = tmp_path / "boat.gpx"
+    fixes = [Fix(54.0, 10.0 + i / 1000, 1718452800000 + i * 1000) for i in range(3)]
+    buffer = io.StringIO()
+    buffer.close = lambda: None
+    writer = GpxLogWriter(buffer, "Boat")
+    header = buffer.getvalue()
+    points = []
+    for fix in fixes:
+        writer.write(fix)
+        points.append(buffer.getvalue()[len(header) + sum(map(len, points)):])
+    writer.close()
+    footer = buffer.getvalue()[len(header) + sum(map(len, points)):]
+
+    source = GpxSource(path)
+    path.write_text(header + footer)  # no points yet
+    assert source.read() == []
+    with path.open("r+") as log:
+        for i, point in enumerate(points):
+            log.seek(len(header) + sum(map(len, points[:i])))
+            log.write(point + footer)
+            log.flush()
+            assert source.read() == fixes[i:i + 1]
+    assert source.read() == []
+    source.close()
+
+
+def test_nmea_file_source_keeps_incomplete_sentences(tmp_path):
+    path = tmp_path / "boat.nmea"
+    fixes = [Fix(54.0, 10.0, 1718452800000), Fix(54.001, 10.0, 1718452801000)]
+    lines = [format_rmc(fix) + "\r\n" for fix in fixes]
+    path.write_text("$GPGSV,garbage\r\n" + lines[0] + lines[1][:20])
+
+    source = make_source(str(path))
+    assert isinstance(source, NmeaFileSource)
+    assert source.read() == fixes[:1]
+    with path.open("a") as log:
+        log.write(lines[1][20:])
+    assert source.read() == fixes[1:]
+    source.close()
+
+
+def _accept_while_reading(server, source):
+    # the source connects on read(), so keep reading until the server has a client
+    server.settimeout(0.05)
+    for _ in range(100):
+        assert source.read() == []
+        try:
+            return server.accept()[0]
+        except socket.timeout:
+            pass
+    raise AssertionError("the source did not connect")
+
+
+def _read_fixes(source):
+    for _ in range(500):
+        fixes = source.read()
+        if fixes:
+            return fixes
+        time.sleep(0.01)
+    return []
+
+
+def test_nmea_socket_source_reconnects():
+    fixes = [Fix(54.0, 10.0, 1718452800000), Fix(54.001, 10.0, 1718452801000)]
+    lines = [(format_rmc(fix) + "\r\n").encode("ascii") for fix in fixes]
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        source = make_source(f"tcp://127.0.0.1:{server.getsockname()[1]}")
+        assert isinstance(source, NmeaSocketSource)
+        with _accept_while_reading(server, source) as client:
+            client.sendall(lines[0] + b"$GPRMC,1")
+        assert _read_fixes(source) == fixes[:1]
+        # the half-sent sentence is dropped when the connection is made again
+        with _accept_while_reading(server, source) as client:
+            client.sendall(lines[1])
+        assert _read_fixes(source) == fixes[1:]
+        source.close()
+
+
+def test_live_track_matches_create_map(tmp_path):
+    with (tmp_path / "track1.gpx").open("w") as stream:
+        replay([(read_fixes("example-data/track1.gpx"), GpxLogWriter(stream, "track1"))], speed=0)
+    # NMEA positions are rounded to about 0.2 m
+    with (tmp_path / "track1.nmea").open("w") as stream:
+        replay([(read_fixes("example-data/track1.gpx"), NmeaLogWriter(stream))], speed=0)
+
+    tracker = LiveTracker([make_source(str(tmp_path / "track1.gpx")), make_source(str(tmp_path / "track1.nmea"))],
+                          max_speed=12)
+    assert tracker.poll() == 2 * len(read_fixes("example-data/track1.gpx"))
+    _map, (expected,), _max_speed, _map_id = create_map(["example-data/track1.gpx"], None, 12, spike_filter=False)
+    track = tracker.tracks[0]
+    assert track.times_ms == expected['times_ms'].tolist()
+    assert track.point_speeds == pytest.approx(expected['point_speeds'])
+    assert track.distances == pytest.approx(expected['distances'])
+    assert track.avg_speeds == pytest.approx(expected['avg_speeds'])
+    assert track.diagnostics.counts == expected['diagnostics'].counts
+    assert tracker.tracks[1].distances[-1] == pytest.approx(expected['distances'][-1], rel=1e-3)
+    tracker.close()
+
+
+def test_live_track_rejects_fixes_out_of_order():
+    track = LiveTrack("Boat", max_speed=20)
+    assert track.add(Fix(54.0, 10.0, 0))
+    assert track.add(Fix(54.0, 10.001, 10000))
+    assert not track.add(Fix(54.0, 10.002, 10000))
+    assert not track.add(Fix(54.0, 10.002, 5000))
+    assert len(track) == 2 and track.diagnostics.counts["non_positive_time_step"] == 2
+    assert track.distances[1] == pytest.approx(65.5 / 1852, rel=1e-2)
+    assert track.point_speeds[1] == pytest.approx(6.55 * 1.94384, rel=1e-2)
+    assert track.avg_speeds[1] == pytest.approx(track.distances[1] / (10 / 3600))
+
+
+def test_replay_keeps_schedule():
+    now = [100.0]
+    delays = []
+
+    def sleep(seconds):
+        delays.append(round(seconds, 6))
+        now[0] += seconds
+
+    class Writer:
+        def __init__(self):
+            self.fixes = []
+
+        def write(self, fix):
+            self.fixes.append(fix)
+            now[0] += 0.01  # slow writes do not delay the schedule
+
+    a, b = Writer(), Writer()
+    written = replay([([Fix(0, 0, 0), Fix(0, 0, 4000)], a), ([Fix(1, 1, 1000)], b)], speed=2,
+                     shift_ms=500, sleep=sleep, clock=lambda: now[0])
+    assert written == 3
+    assert delays == [0.49, 1.49]
+    assert [fix.time_ms for fix in a.fixes] == [500, 4500] and [fix.time_ms for fix in b.fixes] == [1500]
+
+
+def _read_event(response):
+    fields = {}
+    while True:
+        line = response.fp.readline().decode("utf-8").rstrip("\n")
+        if not line:
+            if fields:
+                return fields
+            continue
+        if line.startswith(":"):
+            continue
+        name, _, value = line.partition(": ")
+        fields[name] = value
+
+
+def test_live_server_pushes_new_fixes(tmp_path):
+    path = tmp_path / "boat.nmea"
+    fixes = [Fix(54.0, 10.0 + i / 1000, 1718452800000 + i * 1000) for i in range(4)]
+    path.write_text("".join(format_rmc(fix) + "\r\n" for fix in fixes[:2]))
+    tracker = LiveTracker([make_source(str(path))], names=["Alpha"], max_speed=12)
+    server = LiveServer(("127.0.0.1", 0), tracker, title="Club race", keepalive=0.2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    port = server.server_address[1]
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        connection.request("GET", "/")
+        assert "Waiting" in connection.getresponse().read().decode()
+
+        tracker.poll()
+        connection.request("GET", "/")
+        page = connection.getresponse().read().decode()
+        assert '"liveUrl": "/events?since=2"' in page and '"liveTrackIds": [0]' in page
+        assert "Club race" in page
+
+        connection.request("GET", "/events?since=x")
+        response = connection.getresponse()
+        assert response.status == 400
+        response.read()
+
+        events = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        events.request("GET", "/events?since=2")
+        response = events.getresponse()
+        assert response.getheader("Content-Type") == "text/event-stream"
+        with path.open("a") as log:
+            log.write("".join(format_rmc(fix) + "\r\n" for fix in fixes[2:]))
+        tracker.poll()
+        event = _read_event(response)
+        assert event["id"] == "4" and event["event"] == "fixes"
+        (delta,) = json.loads(event["data"])
+        assert delta["track"] == 0
+        assert [p["time"] for p in delta["points"]] == [fix.time_ms for fix in fixes[2:]]
+        assert delta["distances"] == tracker.tracks[0].distances[2:]
+        events.close()
+
+        stale = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        stale.request("GET", "/events", headers={"Last-Event-ID": "99"})
+        assert _read_event(stale.getresponse())["event"] == "reload"
+        stale.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        tracker.close()
+
+
+def test_playback_js_appends_live_fixes():
+    if not shutil.which("node"):
+        pytest.skip("node is required for playback JS behavior test")
+
+    asset_path = Path(__file__).resolve().parents[1] / "gpx_player" / "assets" / "animate_tracks.js"
+    playback_js = asset_path.read_text(encoding="utf-8")
+    script = f"""
+const assert = require('assert');
+const layers = new Set();
+const map = {{
+  addLayer(layer) {{ layers.add(layer); }},
+  removeLayer(layer) {{ layers.delete(layer); }},
+  hasLayer(layer) {{ return layers.has(layer); }},
+}};
+function makeElement(tag) {{
+  return {{
+    tagName: tag,
+    style: {{ setProperty(name, value) {{ this[name] = value; }} }},
+    children: [],
+    listeners: {{}},
+    appendChild(child) {{ this.children.push(child); return child; }},
+    setAttribute(name, value) {{ this[name] = value; }},
+    addEventListener(type, handler) {{ this.listeners[type] = handler; }},
+    dispatchEvent(event) {{ if (this.listeners[event.type]) this.listeners[event.type](event); }},
+  }};
+}}
+const sources = [];
+global.EventSource = function EventSource(url) {{
+  this.url = url;
+  this.listeners = {{}};
+  this.addEventListener = (type, handler) => {{ this.listeners[type] = handler; }};
+  sources.push(this);
+}};
+let reloads = 0;
+global.location = {{ reload() {{ reloads += 1; }} }};
+global.Event = function Event(type) {{ this.type = type; }};
+global.window = global;
+global.map_test = map;
+global.document = {{
+  readyState: 'complete',
+  body: makeElement('body'),
+  head: makeElement('head'),
+  createElement: makeElement,
+  createTextNode(text) {{ return {{ textContent: text }}; }},
+  getElementById() {{ return null; }},
+}};
+global.L = {{
+  divIcon(options) {{ return options; }},
+  marker(latlng) {{
+    return {{
+      latlng,
+      addTo(targetMap) {{ targetMap.addLayer(this); return this; }},
+      setLatLng(nextLatLng) {{ this.latlng = nextLatLng; }},
+      setIcon() {{}},
+      getElement() {{ return null; }},
+    }};
+  }},
+  polyline(latlngs) {{
+    return {{
+      latlngs,
+      addTo(targetMap) {{ targetMap.addLayer(this); return this; }},
+      setLatLngs(next) {{ this.latlngs = next; }},
+      addLatLng(latlng) {{ this.latlngs.push(latlng); }},
+    }};
+  }},
+  control() {{ return {{ addTo(targetMap) {{ this.container = this.onAdd(targetMap); return this; }} }}; }},
+  DomUtil: {{ create(_tag, className) {{ const element = makeElement(_tag); element.className = className; return element; }} }},
+  DomEvent: {{ disableClickPropagation() {{}}, disableScrollPropagation() {{}}, on(element, type, handler) {{ element.addEventListener(type, handler); }} }},
+}};
+window.gpxPlayerPlayback = {{
+  map_test: {{
+    mapId: 'map_test',
+    colors: ['blue', 'red'],
+    points: [
+      [{{ lat: 0, lon: 0, time: 0 }}, {{ lat: 0, lon: 1, time: 2000 }}],
+      [{{ lat: 1, lon: 0, time: 1000 }}],
+    ],
+    speeds: [[0, 1], [0]],
+    distances: [[0, 1], [0]],
+    avgSpeeds: [[0, 1], [0]],
+    trackNames: ['Alpha', 'Bravo'],
+    timestamps: [0, 1000, 2000],
+    title: 'Test',
+    sliderId: 'slider',
+    timeLegendId: 'time',
+    playPauseButtonId: 'play',
+    boatLegendId: 'legend',
+    tailPointCount: 2,
+    fullTrackLayerNames: [null, null],
+    liveUrl: '/events?since=3',
+    liveTrackIds: [0, 2],
+  }}
+}};
+{playback_js}
+const state = window.gpxPlayerPlayback.map_test;
+assert.strictEqual(sources.length, 1);
+assert.strictEqual(sources[0].url, '/events?since=3');
+const fullLine = state.fullTrackLayers[0];
+assert.ok(map.hasLayer(fullLine));
+
+function push(deltas) {{ sources[0].listeners.fixes({{ data: JSON.stringify(deltas) }}); }}
+
+// the slider starts at the beginning and stays at the time it shows
+push([{{ track: 0, points: [{{ lat: 0, lon: 2, time: 4000 }}], speeds: [2], distances: [2], avgSpeeds: [1.8] }}]);
+assert.deepStrictEqual(state.timestampValues, [0, 1000, 2000, 4000]);
+assert.strictEqual(state.currentTime, 0);
+assert.deepStrictEqual(fullLine.latlngs, [[0, 0], [0, 1], [0, 2]]);
+
+// at the end, it follows the newest fix; a late fix of another boat is merged into the timeline
+state.slider.value = state.slider.max;
+state.slider.dispatchEvent(new Event('input'));
+push([{{ track: 2, points: [{{ lat: 1, lon: 1, time: 3000 }}, {{ lat: 1, lon: 2, time: 5000 }}],
+         speeds: [3, 3], distances: [1, 2], avgSpeeds: [1, 1] }}]);
+assert.deepStrictEqual(state.timestampValues, [0, 1000, 2000, 3000, 4000, 5000]);
+assert.deepStrictEqual(state.timelinePositions.map((p) => Array.from(p)), [[0, 0, 1, 1, 2, 2], [0, 0, 0, 1, 1, 2]]);
+assert.strictEqual(state.currentTime, 5000);
+assert.deepStrictEqual(state.currentPointIndexes, [2, 2]);
+
+// a boat that is not on the page yet needs the page to be rendered again
+push([{{ track: 1, points: [{{ lat: 2, lon: 0, time: 6000 }}], speeds: [0], distances: [0], avgSpeeds: [0] }}]);
+assert.strictEqual(reloads, 1);
+assert.strictEqual(state.timestampValues.length, 6);
+"""
+    result = subprocess.run(
+        ["node", "-e", script],
+        text=True,
+        capture_output=True,
+        check=False,
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -18,9 +18,13 @@ from gpx_player.openseamap import (
     create_map,
     create_playback_map,
     parse_gpx,
+    calculate_speeds,
     speed_to_color,
     _parse_iso_datetime,
 )
+from gpx_player.diagnostics import (
+    EMPTY_WINDOW, NON_POSITIVE_TIME_STEP, SPEED_OUTLIER, TIMESTAMPS_REPAIRED, DataQualityReport, TrackDiagnostics,
+)
 
 
 def _write_sample_gpx(n_points=6, step_seconds=60, start="2024-06-15T12:00:00Z", track_name="Test Track"):
@@ -303,6 +307,8 @@ def test_add_playback_controls_accepts_custom_track_layer_names():
     rendered = folium_map.get_root().render()
 
     assert '"tailPointCount": 30' in rendered
+    t0 = all_tracks[0]['points'][0]['time']
+    assert f'"timestamps": [{int(t0.timestamp() * 1000)}, ' in rendered
     assert '"fullTrackLayerNames": ["custom_full_track_layer"]' in rendered
 
 
@@ -702,6 +708,8 @@ def test_wheel_includes_playback_assets(tmp_path):
         "gpx_player/assets/speed_legend_template.html",
         "gpx_player/assets/boat_legend_template.html",
         "gpx_player/assets/header_template.html",
+        "gpx_player/schemas/gpx_1.0.xsd",
+        "gpx_player/schemas/gpx_1.1.xsd",
     }
     assert expected_assets <= wheel_files
 
@@ -739,6 +747,19 @@ def test_create_map_keeps_fallback_max_speed_when_no_positive_speed():
     assert max_speed == 0.1
 
 
+def test_create_map_repairs_timestamps():
+    path = "example-data/wrong-timestamp-order.gpx"
+    _map, all_tracks, _max_speed, _map_id = create_map([path], names=None, max_speed=12.0, repair="sort")
+
+    times = [p['time'] for p in all_tracks[0]['points']]
+    assert times == sorted(times)
+    example = all_tracks[0]['diagnostics'].examples[TIMESTAMPS_REPAIRED][0]
+    assert "1 backwards jumps" in example['summary']
+
+    _map, all_tracks, _max_speed, _map_id = create_map([path], names=None, max_speed=12.0, repair="drop")
+    assert len(all_tracks[0]['points']) == 2
+
+
 def test_parse_iso_datetime_variants():
     cases = [
         "2026-04-12T17:01:00+0200",
@@ -779,7 +800,7 @@ def test_create_map_names_stay_aligned_when_track_skipped():
     assert [t['display_name'] for t in all_tracks] == ["Alex", "Cara"]
 
 
-def test_create_map_skips_empty_track(capsys):
+def test_create_map_skips_empty_track(caplog):
     path, t0 = _write_sample_gpx(n_points=4)
     # Window entirely before the track's time range.
     start = t0 - dt.timedelta(hours=2)
@@ -790,6 +811,181 @@ def test_create_map_skips_empty_track(capsys):
     )
 
     assert all_tracks == []
-    captured = capsys.readouterr()
-    assert "no points" in captured.out
-    assert "skipping" in captured.out
+    assert "no points" in caplog.text
+    assert "skipped" in caplog.text
+
+
+def test_calculate_speeds_collects_diagnostics(capsys):
+    t0 = dt.datetime(2024, 6, 15, 12, tzinfo=dt.timezone.utc)
+    points = [{'lat': 54.0, 'lon': 10.0 + 0.01 * i, 'time': t0 + dt.timedelta(seconds=i)} for i in range(200)]
+    points.append(dict(points[-1]))
+    diagnostics = TrackDiagnostics("noisy", max_examples=3)
+
+    speeds = calculate_speeds(points, 12.0, diagnostics)
+
+    assert speeds == [0] * 200
+    assert capsys.readouterr().out == ""
+    assert diagnostics.counts == {SPEED_OUTLIER: 199, NON_POSITIVE_TIME_STEP: 1}
+    # ~1260 kn is more than 10x the limit
+    assert diagnostics.histogram[-1] == 199
+    assert len(diagnostics.examples[SPEED_OUTLIER]) == 3
+    assert diagnostics.to_dict()["outlier_histogram"][">10x"] == 199
+
+
+def test_create_map_reports_data_quality(caplog):
+    path, t0 = _write_sample_gpx(n_points=4, step_seconds=60)
+    report = DataQualityReport()
+    with caplog.at_level("WARNING", logger="gpx_player.diagnostics"):
+        _map, all_tracks, _max_speed, _map_id = create_map(
+            [path], names=["Late"], max_speed=12.0,
+            start_time=t0 + dt.timedelta(days=1), diagnostics=report,
+        )
+    assert all_tracks == []
+    assert report.counts == {EMPTY_WINDOW: 1}
+    assert report.to_dict()["tracks"][0]["track"] == "Late"
+    assert len(caplog.records) == 1 and "Late" in caplog.text
+
+
+def test_create_playback_map_simplifies_and_adds_detail_levels():
+    path = "example-data/osm-demo-Alex.gpx"
+    _map, full, _max_speed, _map_id = create_map([path], names=None, max_speed=12.0)
+    _map, thin, _max_speed, _map_id = create_map([path], names=None, max_speed=12.0,
+                                                 simplify_tolerance=1.0, lod_tolerances=(20, 5))
+
+    track = thin[0]
+    assert 2 < len(track['points']) < len(full[0]['points'])
+    assert len(track['seg_speeds']) == len(track['points']) - 1
+    assert len(track['distances']) == len(track['avg_speeds']) == len(track['point_speeds']) == len(track['points'])
+    assert track['points'][-1] == full[0]['points'][-1]
+    assert track['distances'][-1] == pytest.approx(full[0]['distances'][-1])
+    assert track['lod_tolerances'] == [20, 5] and len(track['lod_layer_names']) == 2
+
+    folium_map = create_playback_map([path], max_speed=12.0, lod_tolerances=(20, 5))
+    rendered = folium_map.get_root().render()
+    assert '"lodTolerances": [[20, 5]]' in rendered
+    assert '"lodLayerNames": [["feature_group_' in rendered
+
+
+def test_playback_js_switches_detail_level_on_zoom():
+    if not shutil.which("node"):
+        pytest.skip("node is required for playback JS behavior test")
+
+    asset_path = Path(__file__).resolve().parents[1] / "gpx_player" / "assets" / "animate_tracks.js"
+    playback_js = asset_path.read_text(encoding="utf-8")
+    script = f"""
+const assert = require('assert');
+const layers = new Set();
+const handlers = {{}};
+let zoom = 16;
+const map = {{
+  addLayer(layer) {{ layers.add(layer); }},
+  removeLayer(layer) {{ layers.delete(layer); }},
+  hasLayer(layer) {{ return layers.has(layer); }},
+  on(type, handler) {{ handlers[type] = handler; }},
+  getZoom() {{ return zoom; }},
+  getCenter() {{ return {{ lat: 0, lng: 0 }}; }},
+}};
+function makeLayer() {{ return {{ addTo(targetMap) {{ targetMap.addLayer(this); return this; }} }}; }}
+const full = makeLayer(), coarse = makeLayer(), coarser = makeLayer();
+layers.add(full);
+function makeElement(tag) {{
+  return {{
+    tagName: tag,
+    style: {{ setProperty(name, value) {{ this[name] = value; }} }},
+    children: [],
+    listeners: {{}},
+    appendChild(child) {{ this.children.push(child); return child; }},
+    setAttribute(name, value) {{ this[name] = value; }},
+    addEventListener(type, handler) {{ this.listeners[type] = handler; }},
+    dispatchEvent(event) {{ if (this.listeners[event.type]) this.listeners[event.type](event); }},
+  }};
+}}
+global.Event = function Event(type) {{ this.type = type; }};
+global.window = global;
+global.map_test = map;
+global.fullLayer = full;
+global.lod5 = coarse;
+global.lod50 = coarser;
+global.document = {{
+  readyState: 'complete',
+  body: makeElement('body'),
+  head: makeElement('head'),
+  createElement: makeElement,
+  createTextNode(text) {{ return {{ textContent: text }}; }},
+  getElementById() {{ return null; }},
+}};
+global.L = {{
+  divIcon(options) {{ return options; }},
+  marker(latlng, options) {{
+    return {{
+      latlng,
+      addTo(targetMap) {{ targetMap.addLayer(this); return this; }},
+      setLatLng(nextLatLng) {{ this.latlng = nextLatLng; }},
+      setIcon() {{}},
+      getElement() {{ return null; }},
+    }};
+  }},
+  polyline(latlngs) {{
+    return {{ latlngs, addTo(targetMap) {{ targetMap.addLayer(this); return this; }}, setLatLngs(next) {{ this.latlngs = next; }} }};
+  }},
+  control() {{ return {{ addTo(targetMap) {{ this.container = this.onAdd(targetMap); return this; }} }}; }},
+  DomUtil: {{ create(_tag, className) {{ const element = makeElement(_tag); element.className = className; return element; }} }},
+  DomEvent: {{ disableClickPropagation() {{}}, disableScrollPropagation() {{}}, on(element, type, handler) {{ element.addEventListener(type, handler); }} }},
+}};
+window.gpxPlayerPlayback = {{
+  map_test: {{
+    mapId: 'map_test',
+    colors: ['blue'],
+    points: [[
+      {{ lat: 0, lon: 0, time: '2024-06-15T12:00:00Z' }},
+      {{ lat: 0, lon: 1, time: '2024-06-15T12:01:00Z' }},
+    ]],
+    speeds: [[0, 1]],
+    distances: [[0, 1]],
+    avgSpeeds: [[0, 1]],
+    trackNames: ['Alpha'],
+    timestamps: ['2024-06-15T12:00:00Z', '2024-06-15T12:01:00Z'],
+    minTime: '2024-06-15T12:00:00Z',
+    maxTime: '2024-06-15T12:01:00Z',
+    timeRange: 60,
+    title: 'Test',
+    sliderId: 'slider',
+    timeLegendId: 'time',
+    playPauseButtonId: 'play',
+    boatLegendId: 'legend',
+    tailPointCount: 2,
+    fullTrackLayerNames: ['fullLayer'],
+    lodTolerances: [[5, 50, 500]],
+    lodLayerNames: [['lod5', 'lod50', 'missingLayer']],
+  }}
+}};
+{playback_js}
+const state = window.gpxPlayerPlayback.map_test;
+// zoom 16 at the equator: ~2.4 m per pixel, too fine for any level
+assert.deepStrictEqual([full, coarse, coarser].map((l) => map.hasLayer(l)), [true, false, false]);
+
+zoom = 12;  // ~38 m per pixel
+handlers.zoomend();
+assert.deepStrictEqual([full, coarse, coarser].map((l) => map.hasLayer(l)), [false, true, false]);
+
+zoom = 5;  // ~4.9 km per pixel; the 500 m level has no layer
+handlers.zoomend();
+assert.deepStrictEqual([full, coarse, coarser].map((l) => map.hasLayer(l)), [false, false, true]);
+
+state.trackModeControls[0].value = 'off';
+state.trackModeControls[0].dispatchEvent(new Event('change'));
+assert.deepStrictEqual([full, coarse, coarser].map((l) => map.hasLayer(l)), [false, false, false]);
+
+zoom = 18;
+state.trackModeControls[0].value = 'full';
+state.trackModeControls[0].dispatchEvent(new Event('change'));
+assert.deepStrictEqual([full, coarse, coarser].map((l) => map.hasLayer(l)), [true, false, false]);
+"""
+    result = subprocess.run(
+        ["node", "-e", script],
+        text=True,
+        capture_output=True,
+        check=False,
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,183 @@
+import weakref
+
+import matplotlib
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from PIL import GifImagePlugin, Image
+
+from gpx_player.render import (
+    ContactSheetSink, FanOutFrameSink, FullRedrawRenderer, OptimizedGifFrameSink, StaticBackgroundRenderer,
+    contact_sheet, fit_frame, parse_output_spec, render_animation,
+)
+
+
+def _figure():
+    fig, ax = plt.subplots(figsize=(2, 2), dpi=50)
+    ax.set_xlim(0, 10)
+    ax.set_ylim(0, 10)
+    ax.plot([1, 9], [9, 1], color='orange')  # static
+    line, = ax.plot([], [], color='blue')
+    text = ax.text(0.1, 0.9, '', transform=ax.transAxes)
+    return fig, line, text
+
+
+def _update(frame, line, text):
+    line.set_data([2, 3 + frame], [2, 6])
+    text.set_text(f'frame {frame}')
+    return [line, text]
+
+
+def test_static_background_renderer_matches_full_redraw():
+    fig, line, text = _figure()
+    full = []
+    for frame in range(3):
+        _update(frame, line, text)
+        full.append(FullRedrawRenderer(fig).render())
+
+    renderer = StaticBackgroundRenderer(fig, [line, text])
+    for frame in range(3):
+        _update(frame, line, text)
+        assert np.array_equal(renderer.render(), full[frame])
+    plt.close(fig)
+
+
+def test_render_animation_writes_gif(tmp_path):
+    fig, line, text = _figure()
+    path = tmp_path / "out.gif"
+
+    count = render_animation(StaticBackgroundRenderer(fig, [line, text]), _update, range(4),
+                             OptimizedGifFrameSink(str(path), fps=10), fargs=[line, text])
+
+    assert count == 4
+    with Image.open(path) as gif:
+        assert gif.n_frames == 4
+        assert gif.size == (100, 100)
+    plt.close(fig)
+
+
+def test_optimized_gif_merges_duplicates_and_keeps_pixels(tmp_path):
+    path = tmp_path / "out.gif"
+    frames = [np.zeros((6, 8, 4), dtype=np.uint8) for _ in range(4)]
+    frames[1] = frames[0].copy()  # duplicate
+    frames[2][1:3, 2:4, 0] = 255
+    frames[3] = frames[2].copy()
+    frames[3][4, 7, 2] = 255
+
+    with OptimizedGifFrameSink(str(path), fps=20) as sink:
+        for frame in frames:
+            sink.write(frame)
+
+    with Image.open(path) as gif:
+        assert gif.n_frames == 3
+        durations, decoded = [], []
+        for i in range(gif.n_frames):
+            gif.seek(i)
+            durations.append(gif.info["duration"])
+            decoded.append(np.asarray(gif.convert("RGB")))
+    assert durations == [100, 50, 50]
+    for image, frame in zip(decoded, [frames[0], frames[2], frames[3]]):
+        assert np.array_equal(image, frame[..., :3])
+
+
+def test_optimized_gif_writes_frames_one_at_a_time(tmp_path, monkeypatch):
+    written = []
+    getdata = GifImagePlugin.getdata
+
+    def spy(frame, offset, **params):
+        # every frame written before must be gone already
+        assert all(ref() is None for ref, _size in written)
+        written.append((weakref.ref(frame), frame.size))
+        return getdata(frame, offset, **params)
+
+    monkeypatch.setattr(GifImagePlugin, "getdata", spy)
+    path = tmp_path / "out.gif"
+    with OptimizedGifFrameSink(str(path), fps=10) as sink:
+        for i in range(6):
+            frame = np.zeros((20, 30, 3), dtype=np.uint8)
+            frame[i, 2 * i:2 * i + 2] = 255
+            sink.write(frame)
+
+    assert [size for _ref, size in written] == [(30, 20)] + [(4, 2)] * 5
+    with Image.open(path) as gif:
+        assert gif.n_frames == 6 and gif.info["loop"] == 0
+        gif.seek(5)
+        assert np.asarray(gif.convert("RGB"))[5, 10:12].tolist() == [[255, 255, 255]] * 2
+
+
+def test_contact_sheet_grid():
+    frames = [np.full((2, 3, 3), i, dtype=np.uint8) for i in range(5)]
+    sheet = contact_sheet(frames, columns=2)
+    assert sheet.shape == (6, 6, 3)
+    assert (sheet[0:2, 3:6] == 1).all()
+    assert (sheet[4:6, 0:3] == 4).all()
+    assert (sheet[4:6, 3:6] == 255).all()  # empty cell
+
+
+def test_contact_sheet_sink_writes_png(tmp_path):
+    path = tmp_path / "sheet.png"
+    with ContactSheetSink(str(path), columns=3) as sink:
+        for i in range(3):
+            sink.write(np.full((4, 5, 4), i, dtype=np.uint8))
+    with Image.open(path) as image:
+        assert image.size == (15, 4)
+
+
+class _ListSink:
+    def __init__(self):
+        self.frames = []
+        self.closed = False
+
+    def write(self, frame):
+        self.frames.append(frame)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("race.mp4", ("race.mp4", None)),
+    ("race.mp4:1920x1080", ("race.mp4", (1920, 1080))),
+    ("C:/videos/race.gif:480x270", ("C:/videos/race.gif", (480, 270))),
+])
+def test_parse_output_spec(spec, expected):
+    assert parse_output_spec(spec) == expected
+
+
+def test_parse_output_spec_rejects_empty_size():
+    with pytest.raises(ValueError):
+        parse_output_spec("race.mp4:0x1080")
+
+
+def test_fit_frame_keeps_aspect_ratio():
+    frame = np.zeros((30, 40, 4), dtype=np.uint8)
+    assert fit_frame(frame, (20, 15)).shape == (15, 20, 4)
+    padded = fit_frame(frame, (20, 20))
+    assert padded.shape == (20, 20, 4)
+    assert (padded[0] == 255).all() and (padded[10] == 0).all()
+
+
+def test_fan_out_sink_scales_once_per_size():
+    full, small, other_small = _ListSink(), _ListSink(), _ListSink()
+    frame = np.zeros((30, 40, 4), dtype=np.uint8)
+    with FanOutFrameSink([(full, None), (small, (20, 15)), (other_small, (20, 15))]) as sink:
+        sink.write(frame)
+
+    assert full.frames[0] is frame
+    assert small.frames[0].shape == (15, 20, 4)
+    assert other_small.frames[0] is small.frames[0]
+    assert full.closed and small.closed and other_small.closed
+
+
+def test_fan_out_sink_closes_every_sink_before_raising():
+    class _FailingSink(_ListSink):
+        def close(self):
+            super().close()
+            raise OSError("disk full")
+
+    first, failing, last = _ListSink(), _FailingSink(), _ListSink()
+    with pytest.raises(OSError, match="disk full"):
+        FanOutFrameSink([(first, None), (failing, None), (last, None)]).close()
+    assert first.closed and failing.closed and last.closed
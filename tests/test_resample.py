@@ -0,0 +1,108 @@
+import datetime as dt
+import json
+import re
+
+import numpy as np
+import pytest
+
+from gpx_player.openseamap import _resample_playback_tracks, create_map, create_playback_map
+from gpx_player.resample import resample_times, uniform_clock
+
+
+def test_uniform_clock_covers_all_tracks():
+    clock = uniform_clock([np.array([103.0, 110.0]), np.array([95.5, 107.0]), np.zeros(0)], 5)
+    assert clock.tolist() == [95.0, 100.0, 105.0, 110.0]
+    assert uniform_clock([], 5).size == 0
+    with pytest.raises(ValueError):
+        uniform_clock([np.array([0.0])], 0)
+
+
+def test_resample_times_interpolates_and_skips_gaps():
+    seconds = np.array([10.0, 12.0, 14.0, 100.0, 102.0])
+    lat = np.array([0.0, 2.0, 4.0, 50.0, 52.0])
+    clock = np.arange(0.0, 110.0)
+
+    sampling = resample_times(seconds, clock)
+    assert sampling.seconds[0] == 10 and sampling.seconds[-1] == 102 and len(sampling) == 93
+    assert sampling.interpolate(lat)[:5].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert sampling.hold(lat)[:5].tolist() == [0.0, 0.0, 2.0, 2.0, 4.0]
+
+    sampling = resample_times(seconds, clock, max_gap=10)
+    assert sampling.seconds.tolist() == [10, 11, 12, 13, 14, 100, 101, 102]
+    assert sampling.interpolate(lat).tolist() == [0, 1, 2, 3, 4, 50, 51, 52]
+
+    assert len(resample_times(np.zeros(0), clock)) == 0
+
+
+def test_resample_times_keeps_sparse_and_single_fix_tracks():
+    clock = uniform_clock([np.array([1000.0, 1120.0, 1240.0]), np.array([1003.0])], 5)
+    assert clock[-1] == 1240.0
+
+    sampling = resample_times([1000.0, 1120.0, 1240.0], clock, max_gap=60)
+    assert sampling.seconds.tolist() == [1000.0, 1120.0, 1240.0]
+    assert sampling.interpolate([0.0, 1.0, 2.0]).tolist() == [0.0, 1.0, 2.0]
+
+    sampling = resample_times([1003.0], clock, max_gap=60)
+    assert sampling.seconds.tolist() == [1005.0]
+    assert sampling.interpolate([54.0]).tolist() == [54.0]
+
+    # off the grid, the tick after a fix holds it instead of interpolating across the gap
+    sampling = resample_times([1001.0, 1121.0], clock, max_gap=60)
+    assert sampling.seconds.tolist() == [1005.0, 1125.0]
+    assert sampling.interpolate([0.0, 1.0]).tolist() == [0.0, 1.0]
+
+
+def test_playback_data_keeps_sparse_and_single_fix_tracks():
+    t0 = dt.datetime(2024, 6, 15, 12, tzinfo=dt.timezone.utc)
+    sparse = {'points': [{'lat': 54.0 + i / 1000, 'lon': 10.0, 'time': t0 + dt.timedelta(seconds=120 * i)}
+                         for i in range(3)],
+              'point_speeds': [0.0, 1.8, 1.8], 'distances': [0.0, 0.06, 0.12]}
+    single = {'points': [{'lat': 55.0, 'lon': 11.0, 'time': t0 + dt.timedelta(seconds=7)}],
+              'point_speeds': [0.0], 'distances': [0.0]}
+    empty = {'points': [], 'point_speeds': [], 'distances': []}
+
+    (sparse_resampled, single_resampled, empty_resampled), _timeline = _resample_playback_tracks(
+        [sparse, single, empty], 5, 60)
+    assert [p['lat'] for p in sparse_resampled['points']] == pytest.approx([54.0, 54.001, 54.002])
+    assert [(p['lat'], p['lon']) for p in single_resampled['points']] == [(55.0, 11.0)]
+    assert empty_resampled is empty
+
+
+def test_resample_longitude_across_antimeridian():
+    sampling = resample_times([0.0, 2.0], [0.0, 1.0, 2.0])
+    assert sampling.interpolate_longitude([179.0, -179.0]).tolist() == pytest.approx([179.0, -180.0, -179.0])
+
+
+def test_playback_data_on_uniform_clock():
+    t0 = dt.datetime(2024, 6, 15, 12, tzinfo=dt.timezone.utc)
+    _map, all_tracks, _max_speed, _map_id = create_map(["example-data/track1.gpx"], names=None, max_speed=12.0)
+    track = all_tracks[0]
+    duration = (track['points'][-1]['time'] - track['points'][0]['time']).total_seconds()
+
+    (resampled,), timeline = _resample_playback_tracks(all_tracks, 10)
+    assert len(timeline) <= duration / 10 + 2
+    assert timeline.dtype == np.int64 and not np.any((timeline - int(t0.timestamp() * 1000)) % 10000)
+    assert len(resampled['points']) == len(resampled['point_speeds']) == len(resampled['distances'])
+    assert resampled['distances'] == sorted(resampled['distances'])
+    assert resampled['distances'][-1] <= track['distances'][-1]
+    assert max(resampled['point_speeds']) <= max(track['point_speeds'])
+
+
+def test_playback_data_holds_stationary_points():
+    t0 = dt.datetime(2024, 6, 15, 12, tzinfo=dt.timezone.utc)
+    points = [{'lat': 54.0, 'lon': 10.0, 'time': t0, 'until': t0 + dt.timedelta(seconds=10)},
+              {'lat': 54.001, 'lon': 10.0, 'time': t0 + dt.timedelta(seconds=20)}]
+    track = {'points': points, 'point_speeds': [0.0, 10.8], 'distances': [0.0, 0.06]}
+
+    (resampled,), timeline = _resample_playback_tracks([track], 5)
+    assert len(timeline) == 5
+    assert [p['lat'] for p in resampled['points']] == pytest.approx([54.0, 54.0, 54.0, 54.0005, 54.001])
+    assert resampled['point_speeds'] == [0.0, 0.0, 0.0, 10.8, 10.8]
+    assert resampled['avg_speeds'][-1] == pytest.approx(0.06 / (20 / 3600))
+
+
+def test_create_playback_map_resamples():
+    folium_map = create_playback_map(["example-data/track1.gpx", "example-data/track2.gpx"], resample_step=5)
+    rendered = folium_map.get_root().render()
+    timestamps = json.loads(re.search(r'"timestamps": (\[[^\]]*\])', rendered).group(1))
+    assert timestamps == list(range(timestamps[0], timestamps[-1] + 1, 5000))
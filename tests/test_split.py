@@ -0,0 +1,144 @@
+import datetime as dt
+import gzip
+
+import gpxpy
+import pytest
+
+from gpx_player.gpx_utils import extract_windows
+from gpx_player.split_gpx import TimeWindow, main, read_schedule, split_gpx_file
+from gpx_player.validator import validate_gpx
+
+UTC = dt.timezone.utc
+
+MULTI_SEGMENT_GPX = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="pytest" xmlns="http://www.topografix.com/GPX/1/1">
+  <metadata><name>Regatta</name></metadata>
+  <wpt lat="1.0" lon="1.0"><name>Mark 1</name></wpt>
+  <trk>
+    <name>Boat A</name>
+    <trkseg>
+      <trkpt lat="0.0" lon="0.0"><time>2024-05-01T10:00:00Z</time></trkpt>
+      <trkpt lat="0.0" lon="0.1"><time>2024-05-01T10:10:00Z</time></trkpt>
+    </trkseg>
+    <trkseg>
+      <trkpt lat="0.0" lon="0.2"><time>2024-05-01T10:20:00Z</time></trkpt>
+      <trkpt lat="0.0" lon="0.3"><time>2024-05-01T10:30:00Z</time></trkpt>
+    </trkseg>
+  </trk>
+  <trk>
+    <name>Boat B</name>
+    <trkseg>
+      <trkpt lat="1.0" lon="0.0"><time>2024-05-01T11:00:00Z</time></trkpt>
+    </trkseg>
+  </trk>
+</gpx>
+"""
+
+
+def _points(path):
+    with open(path) as f:
+        gpx = gpxpy.parse(f)
+    return [[[p.time for p in seg.points] for seg in trk.segments] for trk in gpx.tracks]
+
+
+def test_extract_windows_matches_per_window_filter(tmp_path):
+    src = "example-data/track1.gpx"
+    times = [t for trk in _points(src) for seg in trk for t in seg]
+    windows = [
+        (dt.datetime(2023, 7, 1, 10, 40, tzinfo=UTC), dt.datetime(2023, 7, 1, 11, 0, tzinfo=UTC)),
+        (dt.datetime(2023, 7, 1, 12, 55, tzinfo=dt.timezone(dt.timedelta(hours=2))),
+         dt.datetime(2023, 7, 1, 14, 0, tzinfo=dt.timezone(dt.timedelta(hours=2)))),
+        (dt.datetime(2020, 1, 1, tzinfo=UTC), dt.datetime(2020, 1, 2, tzinfo=UTC)),
+    ]
+    outputs = [tmp_path / f"w{i}.gpx" for i in range(len(windows))]
+
+    counts = extract_windows(src, windows, outputs)
+
+    assert counts == [sum(start <= t <= end for t in times) for start, end in windows]
+    for (start, end), output, count in zip(windows, outputs, counts):
+        validate_gpx(str(output), strict=True)
+        written = [t for trk in _points(output) for seg in trk for t in seg]
+        assert written == [t for t in times if start <= t <= end]
+        assert len(_points(output)) == (1 if count else 0)
+
+
+def test_extract_windows_preserves_segments(tmp_path):
+    src = tmp_path / "race.gpx"
+    src.write_text(MULTI_SEGMENT_GPX)
+    windows = [
+        (dt.datetime(2024, 5, 1, 10, 5, tzinfo=UTC), dt.datetime(2024, 5, 1, 10, 25, tzinfo=UTC)),
+        (dt.datetime(2024, 5, 1, 10, 25, tzinfo=UTC), dt.datetime(2024, 5, 1, 11, 0, tzinfo=UTC)),
+    ]
+    first, second = tmp_path / "first.gpx", tmp_path / "second.gpx.gz"
+
+    assert extract_windows(src, windows, [first, second]) == [2, 2]
+
+    assert _points(first) == [[[dt.datetime(2024, 5, 1, 10, 10, tzinfo=UTC)],
+                               [dt.datetime(2024, 5, 1, 10, 20, tzinfo=UTC)]]]
+    with gzip.open(second, "rt") as f:
+        gpx = gpxpy.parse(f)
+    assert [trk.name for trk in gpx.tracks] == ["Boat A", "Boat B"]
+    assert [len(trk.segments) for trk in gpx.tracks] == [1, 1]
+    assert gpx.name == "Regatta"
+    assert [w.name for w in gpx.waypoints] == ["Mark 1"]
+
+
+def test_extract_windows_rejects_bad_windows(tmp_path):
+    aware = dt.datetime(2024, 5, 1, tzinfo=UTC)
+    with pytest.raises(ValueError):
+        extract_windows("example-data/track1.gpx", [(aware, aware.replace(tzinfo=None))], [tmp_path / "a.gpx"])
+    with pytest.raises(ValueError):
+        extract_windows("example-data/track1.gpx", [(aware, aware - dt.timedelta(1))], [tmp_path / "a.gpx"])
+    with pytest.raises(ValueError):
+        extract_windows("example-data/track1.gpx", [(aware, aware)], [])
+
+
+def test_read_schedule(tmp_path):
+    schedule = tmp_path / "schedule.csv"
+    schedule.write_text(
+        "# race, start, end\n"
+        "Race 1, 2024-05-01T10:00:00+02:00, 2024-05-01T10:15:00+0200\n"
+        "\n"
+        "Race 2,2024-05-01T08:20:00Z,2024-05-01T09:00:00Z\n"
+    )
+    windows = read_schedule(schedule)
+    assert [w.name for w in windows] == ["Race 1", "Race 2"]
+    assert windows[0].start == dt.datetime(2024, 5, 1, 8, 0, tzinfo=UTC)
+    assert windows[1].end == dt.datetime(2024, 5, 1, 9, 0, tzinfo=UTC)
+
+    schedule.write_text("Race 1,2024-05-01T10:00:00,2024-05-01T10:15:00\n")
+    with pytest.raises(ValueError, match="timezone"):
+        read_schedule(schedule)
+
+
+def test_split_gpx_file_names_outputs(tmp_path):
+    src = tmp_path / "race.gpx"
+    src.write_text(MULTI_SEGMENT_GPX)
+    windows = [
+        TimeWindow("Race 1", dt.datetime(2024, 5, 1, 10, tzinfo=UTC), dt.datetime(2024, 5, 1, 10, 15, tzinfo=UTC)),
+        TimeWindow("Race 2", dt.datetime(2024, 5, 1, 10, 15, tzinfo=UTC), dt.datetime(2024, 5, 1, 12, tzinfo=UTC)),
+    ]
+    results = split_gpx_file(src, windows, output_dir=tmp_path / "out")
+    assert results == [(tmp_path / "out" / "race_race-1.gpx", 2), (tmp_path / "out" / "race_race-2.gpx", 3)]
+
+
+def test_split_gpx_file_reads_gzip_input(tmp_path):
+    src = tmp_path / "race.gpx.gz"
+    with gzip.open(src, "wt", encoding="utf-8") as f:
+        f.write(MULTI_SEGMENT_GPX)
+    window = TimeWindow("Race 1", dt.datetime(2024, 5, 1, 10, tzinfo=UTC), dt.datetime(2024, 5, 1, 10, 15, tzinfo=UTC))
+    results = split_gpx_file(src, [window], output_dir=tmp_path / "out")
+    assert results == [(tmp_path / "out" / "race_race-1.gpx", 2)]
+    assert _points(results[0][0]) == [[[dt.datetime(2024, 5, 1, 10, tzinfo=UTC),
+                                        dt.datetime(2024, 5, 1, 10, 10, tzinfo=UTC)]]]
+
+
+def test_split_gpx_cli(tmp_path, capsys):
+    src = tmp_path / "race.gpx"
+    src.write_text(MULTI_SEGMENT_GPX)
+    main([str(src), "-w", "2024-05-01T10:00:00Z", "2024-05-01T10:15:00Z", "--gzip"])
+    assert "01: 2 points" in capsys.readouterr().out
+    assert (tmp_path / "race_01.gpx.gz").exists()
+
+    with pytest.raises(SystemExit):
+        main([str(src)])
@@ -0,0 +1,36 @@
+import numpy as np
+
+from gpx_player.timeline import merge_timeline
+
+
+def test_merge_timeline_positions():
+    timeline = merge_timeline([[1, 3, 5], [2, 3, 9], []])
+
+    assert timeline.times.tolist() == [1, 2, 3, 5, 9]
+    assert timeline.times.dtype == np.int64 and len(timeline) == 5
+    assert timeline.positions.tolist() == [
+        [0, 0, 1, 2, 2],
+        [-1, 0, 1, 1, 2],
+        [-1, -1, -1, -1, -1],
+    ]
+    assert timeline.counts(1).tolist() == [0, 1, 2, 2, 3]
+
+
+def test_merge_timeline_matches_walking_each_track():
+    rng = np.random.default_rng(3)
+    columns = [np.sort(rng.integers(0, 10_000, size)) for size in (50, 200, 1)]
+    columns.append(rng.integers(0, 10_000, 20))  # unsorted: stops at the first later fix
+    timeline = merge_timeline(columns)
+
+    assert timeline.times.tolist() == sorted(set(np.concatenate(columns).tolist()))
+    for track, column in enumerate(columns):
+        for frame, current_time in enumerate(timeline.times):
+            counter = 0
+            while counter < len(column) and column[counter] <= current_time:
+                counter += 1
+            assert timeline.counts(track)[frame] == counter
+
+
+def test_merge_timeline_without_tracks():
+    timeline = merge_timeline([])
+    assert len(timeline) == 0 and timeline.positions.shape == (0, 0)
@@ -1,11 +1,21 @@
 import datetime as dt
+import gzip
 import shutil
 from pathlib import Path
 
+import gpxpy.geo
+import numpy as np
 import pytest
+from lxml import etree
 
-from gpx_player.utils import slug, timedelta_to_hms
-from gpx_player.gpx_utils import remove_extensions_tags, trim_track, trim_tracks
+from gpx_player.utils import (
+    cached_arrow_head_marker, epoch_ms, from_epoch_ms, gen_arrow_head_marker, haversine_distances, segment_speeds,
+    slug, timedelta_to_hms,
+)
+from gpx_player.gpx_utils import (
+    ExtensionStrippingEventWriter, TrackTimeIndex, gpx_writer, remove_extensions_tags, repair_timestamps,
+    repair_track, strip_extensions, time_window, trim_track, trim_tracks,
+)
 
 
 def _make_track(n, start, step=dt.timedelta(minutes=1), extras=None):
@@ -45,6 +55,51 @@ def test_timedelta_to_hms():
         assert timedelta_to_hms(td) == expected_output
 
 
+def test_cached_arrow_head_marker_quantizes_rotation():
+    marker, scale = cached_arrow_head_marker(10.7, resolution=2.0)
+    expected, expected_scale = gen_arrow_head_marker(10.0)
+
+    assert (marker.vertices == expected.vertices).all()
+    assert scale == expected_scale
+    # the same bucket returns the very same objects
+    assert cached_arrow_head_marker(9.4, resolution=2.0)[0] is marker
+    assert cached_arrow_head_marker(11.2, resolution=2.0)[0] is not marker
+    # angles wrap around the full circle
+    assert cached_arrow_head_marker(359.5)[0] is cached_arrow_head_marker(-0.5)[0]
+
+
+def test_cached_arrow_head_marker_rejects_bad_resolution():
+    with pytest.raises(ValueError):
+        cached_arrow_head_marker(0, resolution=0)
+
+
+def test_haversine_distances_matches_gpxpy():
+    lat = [53.54, 53.541, 53.541, 0.0]
+    lon = [9.80, 9.802, 9.802, 179.0]
+    expected = [gpxpy.geo.haversine_distance(lat[i], lon[i], lat[i + 1], lon[i + 1]) for i in range(3)]
+    assert haversine_distances(lat, lon) == pytest.approx(expected)
+
+
+def test_segment_speeds_nullifies_bad_segments():
+    lat = [0.0, 0.0, 0.0, 0.0, 0.0]
+    lon = [0.0, 0.001, 0.002, 0.003, 0.5]
+    seconds = [0, 60, 60, 120, 180]  # zero time step, then a spike
+    speeds = segment_speeds(lat, lon, seconds, max_speed=12)
+    one_step = gpxpy.geo.haversine_distance(0, 0, 0, 0.001) / 60 * 1.94384
+    assert speeds == pytest.approx([one_step, 0.0, one_step, 0.0])
+
+
+def test_epoch_ms_round_trip():
+    berlin = dt.timezone(dt.timedelta(hours=2))
+    times = [dt.datetime(2024, 6, 15, 12, 0, 0, 123000, tzinfo=dt.timezone.utc),
+             dt.datetime(2024, 6, 15, 14, 0, 1, tzinfo=berlin)]
+    ms = epoch_ms(times)
+    assert ms.dtype == np.int64 and ms.tolist() == [1718452800123, 1718452801000]
+    assert from_epoch_ms(ms[0]) == times[0]
+    assert from_epoch_ms(ms[1], berlin) == times[1] and from_epoch_ms(ms[1], berlin).utcoffset() == dt.timedelta(hours=2)
+    assert epoch_ms([]).size == 0
+
+
 def test_remove_extensions_tags(tmp_path):
     src = Path("example-data/track1.gpx")
     tmp_file = tmp_path / src.name
@@ -97,6 +152,70 @@ def test_remove_extensions_tags_overwrite(tmp_path):
         assert "<extensions>" not in f.read()
 
 
+def _without_extensions_in_memory(path):
+    tree = etree.parse(str(path))
+    for node in tree.xpath('//*[local-name()="extensions"]'):
+        node.getparent().remove(node)
+    return etree.tostring(tree, method="c14n")
+
+
+def _strip_extensions_from_events(src, dst):
+    with gpx_writer(dst) as xf:
+        writer = ExtensionStrippingEventWriter(xf)
+        for event, node in etree.iterparse(str(src), events=("start", "end", "comment", "pi")):
+            writer(event, node)
+    return writer.removed
+
+
+@pytest.mark.parametrize("strip", [strip_extensions, _strip_extensions_from_events])
+def test_strip_extensions_matches_tree_removal(tmp_path, strip):
+    src = tmp_path / "mixed.gpx"
+    src.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<gpx xmlns="http://www.topografix.com/GPX/1/1" xmlns:x="urn:x" version="1.1">\n'
+        '  <!-- recorded & exported --><?app keep?>\n'
+        '  <metadata><extensions><x:a>1</x:a></extensions></metadata>\n'
+        '  <trk><name>A &lt; B</name><extensions/>\n'
+        '    <trkseg>\n'
+        '      <trkpt lat="1" lon="2"><time>2024-06-15T14:46:21Z</time>'
+        '<extensions><x:b><extensions>nested</extensions></x:b></extensions>\n'
+        '      </trkpt>\n'
+        '    </trkseg>\n'
+        '  </trk>\n'
+        '</gpx>\n'
+    )
+    removed = strip(src, tmp_path / "out.gpx")
+
+    assert removed == 3
+    assert etree.tostring(etree.parse(str(tmp_path / "out.gpx")), method="c14n") == _without_extensions_in_memory(src)
+
+
+def test_strip_extensions_gzip(tmp_path):
+    src = Path("example-data/track1.gpx")
+    assert strip_extensions(src, tmp_path / "track1.gpx", compress=True) == 511
+    with gzip.open(tmp_path / "track1.gpx") as f:
+        compressed = etree.tostring(etree.parse(f), method="c14n")
+    assert compressed == _without_extensions_in_memory(src)
+
+    # .gz names select compression, and .gz input is read transparently
+    assert strip_extensions(tmp_path / "track1.gpx", tmp_path / "again.gpx.gz") == 0
+    assert gzip.open(tmp_path / "again.gpx.gz").read(5) == b"<?xml"
+
+    cleaned, removed = remove_extensions_tags(str(shutil.copy(src, tmp_path / "c.gpx")), compress=True)
+    assert cleaned == str(tmp_path / "c_noext.gpx.gz") and removed == 511
+    with pytest.raises(ValueError):
+        remove_extensions_tags(cleaned, overwrite=True, compress=True)
+
+
+def test_remove_extensions_tags_keeps_original_on_error(tmp_path):
+    broken = tmp_path / "broken.gpx"
+    broken.write_text("<gpx><trk>")
+    with pytest.raises(etree.XMLSyntaxError):
+        remove_extensions_tags(str(broken), overwrite=True)
+    assert broken.read_text() == "<gpx><trk>"
+    assert [p.name for p in tmp_path.iterdir()] == ["broken.gpx"]
+
+
 def test_trim_track_basic_window():
     t0 = dt.datetime(2024, 6, 15, 12, 0, tzinfo=dt.timezone.utc)
     track = _make_track(5, t0)
@@ -159,3 +278,100 @@ def test_trim_tracks_wrapper():
     assert len(trimmed) == 2
     assert len(trimmed[0]['points']) == 3
     assert trimmed[1]['points'] == []
+
+
+def test_trim_track_open_bounds():
+    t0 = dt.datetime(2024, 6, 15, 12, 0, tzinfo=dt.timezone.utc)
+    track = _make_track(5, t0)
+    assert len(trim_track(track, start_time=t0 + dt.timedelta(minutes=3))['points']) == 2
+    assert len(trim_track(track, end_time=t0 + dt.timedelta(minutes=3))['points']) == 4
+    assert trim_track(track)['points'] == track['points']
+
+
+def test_track_time_index_binary_search_matches_scan():
+    t0 = dt.datetime(2024, 6, 15, 12, 0, tzinfo=dt.timezone.utc)
+    track = _make_track(50, t0)
+    # duplicate timestamps are kept on both sides of the window
+    track['points'][20]['time'] = track['points'][21]['time']
+    shuffled = dict(track, points=track['points'][::-1])
+
+    index = TrackTimeIndex(track)
+    assert index.sorted and not TrackTimeIndex(shuffled).sorted
+    for start, end in [(10, 21), (0, 49), (-5, 3), (49, 60), (21, 21), (30, 29)]:
+        lo, hi = t0 + dt.timedelta(minutes=start), t0 + dt.timedelta(minutes=end)
+        trimmed = index.trim(lo, hi)
+        expected = [p for p in track['points'] if lo <= p['time'] <= hi]
+        assert trimmed['points'] == expected
+        assert trim_track(shuffled, lo, hi)['points'] == expected[::-1]
+    # points are shared with the source track, not copied
+    assert index.trim(t0, t0)['points'][0] is track['points'][0]
+
+
+def test_track_time_index_checks_awareness_once():
+    t0 = dt.datetime(2024, 6, 15, 12, 0, tzinfo=dt.timezone.utc)
+    mixed = _make_track(3, t0)
+    mixed['points'][1]['time'] = mixed['points'][1]['time'].replace(tzinfo=None)
+    with pytest.raises(ValueError, match="timezone-aware or both be naive"):
+        TrackTimeIndex(mixed)
+
+    naive = _make_track(3, t0.replace(tzinfo=None))
+    with pytest.raises(ValueError, match="timezone-aware or both be naive"):
+        TrackTimeIndex(naive).trim(start_time=t0)
+    with pytest.raises(ValueError, match="must be timezone-aware"):
+        TrackTimeIndex(naive).trim(end_time=t0.replace(tzinfo=None))
+    with pytest.raises(ValueError, match="not sorted"):
+        TrackTimeIndex(dict(naive, points=naive['points'][::-1])).window()
+
+
+def test_time_window_on_arrays():
+    times = np.array([0, 10, 10, 20, 30])
+    assert time_window(times, 10, 20) == slice(1, 4)
+    assert time_window(list(times), None, 5) == slice(0, 1)
+    assert time_window(times, 25) == slice(4, 5)
+    assert time_window(times, 40, 50) == slice(5, 5)
+    assert time_window(times, 20, 10) == slice(3, 3)
+
+
+def test_repair_timestamps_policies():
+    seconds = [0, 10, 10, 5, 20, 20, 20, 15, 30]
+
+    by_sort = repair_timestamps(seconds, "sort")
+    assert by_sort.apply(seconds).tolist() == [0, 5, 10, 15, 20, 30]
+    assert by_sort.apply(np.arange(9)).tolist() == [0, 3, 1, 7, 4, 8]
+    assert (by_sort.reordered, by_sort.backward, by_sort.duplicates, by_sort.kept) == (7, 2, 3, 6)
+    assert not by_sort.flagged.any()
+
+    by_drop = repair_timestamps(seconds, "drop")
+    assert by_drop.apply(seconds).tolist() == [0, 10, 20, 30]
+    assert (by_drop.reordered, by_drop.backward, by_drop.duplicates) == (0, 2, 3)
+
+    by_flag = repair_timestamps(seconds, "flag")
+    assert by_flag.apply(seconds).tolist() == [0, 10, 5, 20, 15, 30]
+    assert by_flag.flagged.tolist() == [False, False, True, False, True, False]
+
+    positions = [0.0, 1.0, 3.0, 9.0, 4.0, 5.0, 6.0, 9.0, 7.0]
+    assert by_drop.apply(positions, average=True).tolist() == [0.0, 2.0, 5.0, 7.0]
+    assert repair_timestamps([], "sort").kept == 0
+    with pytest.raises(ValueError):
+        repair_timestamps(seconds, "ignore")
+
+
+def test_repair_track():
+    t0 = dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc)
+    track = _make_track(5, t0)
+    points = track['points']
+    points[2]['time'] = points[1]['time']
+    points[4]['time'] = t0 - dt.timedelta(minutes=1)
+
+    repaired, report = repair_track(track, "drop", duplicates="average")
+    assert [p['lat'] for p in repaired['points']] == [0.0, 1.5, 3.0]
+    assert (report.backward, report.duplicates) == (1, 1)
+    assert track['points'] is points and len(points) == 5
+    assert repaired['name'] == 'T'
+
+    flagged, _report = repair_track(track, "flag")
+    assert [p.get('time_flagged', False) for p in flagged['points']] == [False, False, False, True]
+    assert flagged['points'][0] is points[0]
+
+    clean, report = repair_track(_make_track(3, t0))
+    assert not report.changed and len(clean['points']) == 3
@@ -1,5 +1,11 @@
+import threading
+from datetime import datetime
+
 import pytest
-from gpx_player.validator import validate_gpx, GPXValidationError
+from lxml import etree
+from gpx_player.validator import (get_schema, load_schema, validate_gpx, validate_gpx_streaming, GPXValidationError,
+                                  check_timestamp_consistency, find_timestamp_issues, parse_timestamp,
+                                  expand_gpx_paths, validate_file, validate_files)
 
 def test_validate_gpx_file():
     gpx_file_path = "./example-data/osm-demo-Yury.gpx"
@@ -19,3 +25,169 @@ def test_validate_gpx_file():
     gpx_file_path = "./example-data/wrong-timestamp-order.gpx"
     with pytest.raises(GPXValidationError, match="Timestamps not strictly increasing:") as excinfo:
         validate_gpx(gpx_file_path, strict=True)
+
+
+def test_get_schema_is_compiled_once(monkeypatch):
+    import gpx_player.validator as validator
+
+    monkeypatch.setattr(validator, "_SCHEMA_CACHE", {})
+    calls = []
+    original = validator.load_schema
+
+    def counting_load_schema(version):
+        calls.append(version)
+        return original(version)
+
+    monkeypatch.setattr(validator, "load_schema", counting_load_schema)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_schema("1.1"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["1.1"]
+    assert all(schema is results[0] for schema in results)
+    assert get_schema("1.0") is not results[0]
+
+
+def test_load_schema_rejects_unknown_version():
+    with pytest.raises(GPXValidationError, match="Unsupported GPX version"):
+        load_schema("2.0")
+
+
+def _write_gpx(path, trkpts_per_track):
+    tracks = "".join(
+        "<trk><trkseg>" + "".join(trkpts) + "</trkseg></trk>" for trkpts in trkpts_per_track
+    )
+    path.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<gpx version="1.1" creator="pytest" xmlns="http://www.topografix.com/GPX/1/1">'
+        f"{tracks}</gpx>"
+    )
+    return str(path)
+
+
+def _trkpt(lat, lon, time):
+    return f'<trkpt lat="{lat}" lon="{lon}"><time>{time}</time></trkpt>'
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_validate_gpx_streaming_matches_validate_gpx(strict):
+    assert validate_gpx_streaming("./example-data/osm-demo-Yury.gpx", strict=strict) is True
+    assert validate_gpx_streaming("./example-data/track1.gpx", strict=strict) is True
+
+    with pytest.raises(GPXValidationError, match="Duplicate timestamp found"):
+        validate_gpx_streaming("./example-data/duplicate-timestamps.gpx", strict=strict)
+    with pytest.raises(GPXValidationError, match="Timestamps not strictly increasing:"):
+        validate_gpx_streaming("./example-data/wrong-timestamp-order.gpx", strict=strict)
+
+
+def test_validate_gpx_streaming_checks_each_track_separately(tmp_path):
+    path = _write_gpx(tmp_path / "two.gpx", [
+        [_trkpt(1, 1, "2024-06-15T14:46:21Z"), _trkpt(1, 1, "2024-06-15T14:46:22Z")],
+        [_trkpt(1, 1, "2024-06-15T14:46:21Z"), _trkpt(1, 1, "2024-06-15T14:46:22.500Z")],
+    ])
+    assert validate_gpx_streaming(path) is True
+
+
+def test_validate_gpx_streaming_schema_errors(tmp_path):
+    path = _write_gpx(tmp_path / "range.gpx", [[_trkpt(91, 1, "2024-06-15T14:46:21Z")]])
+    with pytest.raises(GPXValidationError, match="strict mode enabled"):
+        validate_gpx_streaming(path, strict=True)
+    with pytest.raises(GPXValidationError, match="Latitude 91.0 out of range"):
+        validate_gpx_streaming(path)
+
+    broken = tmp_path / "broken.gpx"
+    broken.write_text('<gpx version="1.1"><trk><trkseg>')
+    with pytest.raises(GPXValidationError, match="XML Syntax Error"):
+        validate_gpx_streaming(str(broken))
+
+    missing_version = tmp_path / "noversion.gpx"
+    missing_version.write_text('<gpx><trk/></gpx>')
+    with pytest.raises(GPXValidationError, match="Unsupported or missing GPX version"):
+        validate_gpx_streaming(str(missing_version))
+
+
+@pytest.mark.parametrize("text", [
+    "2024-06-15T14:46:21Z", "2024-06-15T14:46:21.5Z", "2024-06-15T14:46:21.000Z", "2024-06-15T14:46:21.123456Z",
+])
+def test_parse_timestamp_fast_path_matches_strptime(text):
+    fmt = "%Y-%m-%dT%H:%M:%S.%fZ" if "." in text else "%Y-%m-%dT%H:%M:%SZ"
+    assert parse_timestamp(text) == datetime.strptime(text, fmt)
+
+
+@pytest.mark.parametrize("text", ["2024-13-15T14:46:21Z", "2024-06-15 14:46:21", "yesterday"])
+def test_parse_timestamp_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_timestamp(text)
+
+
+def test_timestamp_issues_are_all_reported(tmp_path):
+    times = ["2024-06-15T14:46:2%dZ" % s for s in (1, 2, 2, 1, 3, 3, 4)]
+    path = _write_gpx(tmp_path / "glitches.gpx", [[_trkpt(1, 1, t) for t in times]])
+    root = etree.parse(path).getroot()
+
+    issues, total = find_timestamp_issues(root)
+    assert total == 3
+    assert [issue.point for issue in issues] == [2, 3, 5]
+    # a glitch is skipped, so the next point is compared with the last good one
+    assert issues[1].previous == datetime(2024, 6, 15, 14, 46, 22)
+
+    issues, total = find_timestamp_issues(root, limit=1)
+    assert total == 3 and len(issues) == 1
+
+    with pytest.raises(GPXValidationError, match="Found 3 timestamp errors") as excinfo:
+        check_timestamp_consistency(root)
+    assert "Duplicate timestamp found in track: 2024-06-15 14:46:22 (track 0, point 2)" in str(excinfo.value)
+    assert "not strictly increasing" in str(excinfo.value)
+
+    with pytest.raises(GPXValidationError, match="Found 3 timestamp errors") as excinfo:
+        validate_gpx_streaming(path)
+    assert "(track 0, point 5)" in str(excinfo.value)
+
+
+@pytest.mark.parametrize("validate", [validate_gpx, validate_gpx_streaming])
+def test_validators_raise_instead_of_exiting(tmp_path, validate):
+    bad_time = _write_gpx(tmp_path / "time.gpx", [[_trkpt(1, 1, "2024-06-15T14:46:21+02:00")]])
+    with pytest.raises(GPXValidationError, match="Invalid timestamp format: 2024-06-15T14:46:21\\+02:00"):
+        validate(bad_time)
+
+    no_version = tmp_path / "noversion.gpx"
+    no_version.write_text('<gpx><trk/></gpx>')
+    with pytest.raises(GPXValidationError, match="Unsupported or missing GPX version"):
+        validate(str(no_version))
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_validate_file_report(tmp_path, stream):
+    record = validate_file("./example-data/track1.gpx", stream=stream)
+    assert record["valid"] is True
+    assert (record["version"], record["tracks"], record["points"]) == ("1.1", 1, 511)
+    assert record["errors"] == [] and record["seconds"] >= 0
+
+    empty = _write_gpx(tmp_path / "empty.gpx", [])
+    record = validate_file(empty, stream=stream)
+    assert record["valid"] is True
+    assert record["warnings"] == ["No tracks found in the GPX file."]
+
+    record = validate_file("./example-data/duplicate-timestamps.gpx", stream=stream)
+    assert record["valid"] is False and record["points"] is None
+    assert record["errors"][0].startswith("Duplicate timestamp found")
+
+    record = validate_file(str(tmp_path / "missing.gpx"), stream=stream)
+    assert record["valid"] is False and record["errors"][0].startswith("Cannot read file")
+
+
+def test_validate_files_in_process_pool(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for name in ("b.gpx", "sub/a.gpx"):
+        _write_gpx(tmp_path / name, [[_trkpt(1, 1, "2024-06-15T14:46:21Z")]])
+    (tmp_path / "notes.txt").write_text("not a track")
+    paths = expand_gpx_paths([str(tmp_path), str(tmp_path / "*.gpx"), "./example-data/duplicate-timestamps.gpx"])
+    assert paths == [str(tmp_path / "b.gpx"), str(tmp_path / "sub" / "a.gpx"),
+                     "./example-data/duplicate-timestamps.gpx"]
+
+    records = list(validate_files(paths, jobs=2))
+    assert [record["file"] for record in records] == paths
+    assert [record["valid"] for record in records] == [True, True, False]
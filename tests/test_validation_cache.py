@@ -0,0 +1,114 @@
+import shutil
+
+import pytest
+
+from gpx_player import validator
+from gpx_player.clean_gpx import clean_gpx_file
+from gpx_player.validation_cache import ValidationCache, file_digest
+from gpx_player.validator import GPXValidationError, set_validation_cache, validate_file, validate_gpx
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ValidationCache(tmp_path / "cache" / "validation.sqlite3")
+    set_validation_cache(cache)
+    yield cache
+    set_validation_cache(None)
+    cache.close()
+
+
+@pytest.fixture
+def count_validations(monkeypatch):
+    calls = []
+    original = validator._validate_document
+
+    def counting(file_path, strict):
+        calls.append((file_path, strict))
+        return original(file_path, strict)
+
+    monkeypatch.setattr(validator, "_validate_document", counting)
+    return calls
+
+
+def test_valid_result_is_reused(tmp_path, cache, count_validations):
+    path = shutil.copy("example-data/track1.gpx", tmp_path / "a.gpx")
+    copy = shutil.copy("example-data/track1.gpx", tmp_path / "b.gpx")
+
+    assert validate_gpx(path) is True
+    assert validate_gpx(path) is True
+    # the key is the content, not the path
+    assert validate_file(copy)["points"] == 511
+    assert len(count_validations) == 1
+    # the strict flag is part of the key
+    assert validate_gpx(path, strict=True) is True
+    assert len(count_validations) == 2
+    assert len(cache) == 2
+
+    for _ in range(100):
+        validate_gpx(path)
+    assert len(count_validations) == 2
+
+
+def test_failure_is_replayed(tmp_path, cache, count_validations):
+    path = shutil.copy("example-data/wrong-timestamp-order.gpx", tmp_path / "bad.gpx")
+    for _ in range(2):
+        with pytest.raises(GPXValidationError, match="Timestamps not strictly increasing") as excinfo:
+            validate_gpx(path)
+    assert len(count_validations) == 1
+    assert excinfo.value.errors[0].startswith("Timestamps not strictly increasing")
+
+
+def test_changed_file_is_validated_again(tmp_path, cache, count_validations):
+    path = tmp_path / "track.gpx"
+    shutil.copy("example-data/track1.gpx", path)
+    validate_gpx(str(path))
+    shutil.copy("example-data/duplicate-timestamps.gpx", path)
+    with pytest.raises(GPXValidationError):
+        validate_gpx(str(path))
+    assert len(count_validations) == 2
+
+
+def test_cached_warnings_are_reported(tmp_path, cache):
+    path = tmp_path / "empty.gpx"
+    path.write_text('<gpx version="1.1" creator="pytest" xmlns="http://www.topografix.com/GPX/1/1"></gpx>')
+    assert validate_file(str(path))["warnings"] == ["No tracks found in the GPX file."]
+    assert validate_file(str(path))["warnings"] == ["No tracks found in the GPX file."]
+
+
+def test_clean_gpx_file_uses_cache(tmp_path, cache, count_validations):
+    path = shutil.copy("example-data/track1.gpx", tmp_path / "track1.gpx")
+    validate_gpx(path, strict=True)
+    _cleaned, removed = clean_gpx_file(path)
+    assert removed == 511
+    assert len(count_validations) == 1
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    cache = ValidationCache(tmp_path / "small.sqlite3", max_entries=2)
+    cache.put("a", "1.1", False, {"valid": True})
+    cache.put("b", "1.1", False, {"valid": True})
+    assert cache.get("a", "1.1", False) == {"valid": True}
+    cache.put("c", "1.1", False, {"valid": True})
+    assert len(cache) == 2
+    assert cache.get("b", "1.1", False) is None
+    assert cache.get("a", "1.1", False) is not None
+    assert cache.get("a", "1.1", True) is None
+    cache.close()
+
+    with pytest.raises(ValueError):
+        ValidationCache(":memory:", max_entries=0)
+
+
+def test_cache_persists_and_digests_files(tmp_path):
+    db = tmp_path / "persist.sqlite3"
+    first = ValidationCache(db)
+    digest = first.file_digest("example-data/track1.gpx")
+    assert digest == file_digest("example-data/track1.gpx") and len(digest) == 64
+    first.put(digest, "1.1", False, {"valid": True})
+    first.close()
+
+    second = ValidationCache(db)
+    assert second.get(digest, "1.1", False) == {"valid": True}
+    second.clear()
+    assert len(second) == 0
+    second.close()